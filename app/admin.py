@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Usuario, Direccion, Producto, Carrito, Pedido
+from .models import Usuario, Direccion, Producto, Carrito, Pedido, PedidoArchivado
+from .exportacion import acciones_exportacion
 
 @admin.register(Usuario)
 class UsuarioAdmin(admin.ModelAdmin):
@@ -13,6 +14,7 @@ class DireccionAdmin(admin.ModelAdmin):
     list_display = ('id_direccion', 'id_usuario', 'provincia_direccion', 'canton_direccion', 'predeterminada_direccion')
     list_filter = ('provincia_direccion', 'predeterminada_direccion')
     search_fields = ('id_usuario__nombre_usuario', 'id_usuario__apellido_usuario', 'direccion_detallada_direccion')
+    list_select_related = ('id_usuario',)
 
 @admin.register(Producto)
 class ProductoAdmin(admin.ModelAdmin):
@@ -20,6 +22,7 @@ class ProductoAdmin(admin.ModelAdmin):
     list_filter = ('categoria_producto', 'activo_producto', 'fecha_creacion_producto')
     search_fields = ('nombre_producto', 'codigo_producto', 'descripcion_producto')
     readonly_fields = ('id_producto', 'fecha_creacion_producto', 'fecha_actualizacion_producto')
+    actions = acciones_exportacion('productos')
 
 @admin.register(Carrito)
 class CarritoAdmin(admin.ModelAdmin):
@@ -27,6 +30,7 @@ class CarritoAdmin(admin.ModelAdmin):
     list_filter = ('estado_carrito', 'fecha_creacion_carrito')
     search_fields = ('id_usuario__nombre_usuario', 'id_producto__nombre_producto')
     readonly_fields = ('id_carrito', 'subtotal_carrito', 'fecha_creacion_carrito', 'fecha_actualizacion_carrito')
+    list_select_related = ('id_usuario', 'id_producto')
 
 @admin.register(Pedido)
 class PedidoAdmin(admin.ModelAdmin):
@@ -34,3 +38,29 @@ class PedidoAdmin(admin.ModelAdmin):
     list_filter = ('estado_pedido', 'metodo_pago_pedido', 'fecha_pedido_pedido')
     search_fields = ('id_usuario__nombre_usuario', 'id_producto__nombre_producto', 'referencia_transaccion_pedido')
     readonly_fields = ('id_pedido', 'subtotal_pedido', 'fecha_pedido_pedido')
+    # Usuario y producto en el mismo SELECT que la página, no uno por fila
+    list_select_related = ('id_usuario', 'id_producto')
+    # El COUNT(*) sin filtros sobre T_Pedido es caro; basta con el del filtro actual
+    show_full_result_count = False
+    date_hierarchy = 'fecha_pedido_pedido'
+    actions = acciones_exportacion('pedidos')
+
+@admin.register(PedidoArchivado)
+class PedidoArchivadoAdmin(admin.ModelAdmin):
+    """Historial movido por archivar_pedidos; solo lectura"""
+    list_display = ('id_pedido', 'id_usuario', 'id_producto', 'cantidad_pedido', 'monto_total_pedido', 'metodo_pago_pedido', 'estado_pedido', 'fecha_pedido_pedido')
+    list_filter = ('metodo_pago_pedido', 'fecha_pedido_pedido')
+    search_fields = ('id_usuario__nombre_usuario', 'id_producto__nombre_producto', 'referencia_transaccion_pedido')
+    list_select_related = ('id_usuario', 'id_producto')
+    show_full_result_count = False
+    date_hierarchy = 'fecha_pedido_pedido'
+    actions = acciones_exportacion('pedidos_archivados')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
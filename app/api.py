@@ -0,0 +1,252 @@
+"""
+API JSON de solo lectura para la app móvil: productos, categorías, carrito y pedidos.
+
+- Paginación por cursor (?cursor=&tamano=), igual que el catálogo y mis_pedidos.
+- ?fields=id,nombre,precio elige las columnas: se convierten en un values() con
+  solo esas columnas (y los JOIN que pidan), sin instanciar modelos. Los
+  nombres públicos de cada recurso están en CAMPOS_*; un nombre desconocido
+  responde 400.
+- Las filas se serializan con orjson si está instalado y, si no, con json.
+- ETag en todas las respuestas. Productos y categorías usan la marca del
+  catálogo (ver cache_catalogo.marca_catalogo), así que un 304 no consulta la
+  BD; carrito y pedidos son privados y el ETag es el hash del cuerpo.
+
+Respuesta de las listas: {"resultados": [...], "siguiente_cursor": "..." | null}
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+
+from .busqueda import BusquedaNoDisponible, buscar_productos
+from .cache_catalogo import validadores_catalogo
+from .carrito import obtener_resumen_carrito
+from .categorias import obtener_categorias
+from .historial_pedidos import TAMANO_HISTORIAL, leer_filtros, paginar_historial
+from .models import Carrito, Producto
+from .paginacion import paginar_keyset, tamano_pagina
+from .presupuesto import presupuesto_consultas
+from .reservas import reservado
+
+try:
+    import orjson
+except ImportError:  # dependencia opcional: sin ella se usa json
+    orjson = None
+
+# Nombre público -> campo de values() (los campos con __ se resuelven con JOIN)
+CAMPOS_PRODUCTO = {
+    'id': 'id_producto',
+    'codigo': 'codigo_producto',
+    'nombre': 'nombre_producto',
+    'descripcion': 'descripcion_producto',
+    'categoria': 'categoria_producto',
+    'precio': 'precio_producto',
+    'stock': 'stock_producto',
+    'imagen': 'imagen_producto',
+    'actualizado': 'fecha_actualizacion_producto',
+}
+CAMPOS_PRODUCTO_DEFECTO = ('id', 'nombre', 'categoria', 'precio', 'imagen')
+
+CAMPOS_CARRITO = {
+    'id': 'id_carrito',
+    'id_producto': 'id_producto',
+    'nombre_producto': 'id_producto__nombre_producto',
+    'imagen_producto': 'id_producto__imagen_producto',
+    'cantidad': 'cantidad_carrito',
+    'precio_unitario': 'precio_unitario_carrito',
+    'subtotal': 'subtotal_carrito',
+    # Anotación: stock menos lo reservado por otros carritos
+    'disponible': 'disponible_producto',
+}
+CAMPOS_CARRITO_DEFECTO = ('id', 'id_producto', 'nombre_producto', 'cantidad', 'precio_unitario', 'subtotal')
+
+CAMPOS_PEDIDO = {
+    'id': 'id_pedido',
+    'fecha': 'fecha_pedido_pedido',
+    'estado': 'estado_pedido',
+    'cantidad': 'cantidad_pedido',
+    'monto_total': 'monto_total_pedido',
+    'metodo_pago': 'metodo_pago_pedido',
+    'referencia': 'referencia_transaccion_pedido',
+    'id_producto': 'id_producto',
+    'nombre_producto': 'id_producto__nombre_producto',
+    'imagen_producto': 'id_producto__imagen_producto',
+    'provincia': 'id_direccion__provincia_direccion',
+    'canton': 'id_direccion__canton_direccion',
+    'distrito': 'id_direccion__distrito_direccion',
+    'direccion': 'id_direccion__direccion_detallada_direccion',
+}
+CAMPOS_PEDIDO_DEFECTO = ('id', 'fecha', 'estado', 'cantidad', 'monto_total', 'nombre_producto')
+
+
+class CampoInvalido(ValueError):
+    pass
+
+
+def leer_campos(params, campos, defecto):
+    """[(nombre público, campo)] pedidos en ?fields=, o los de `defecto`"""
+    nombres = [nombre.strip() for nombre in params.get('fields', '').split(',') if nombre.strip()]
+    desconocidos = [nombre for nombre in nombres if nombre not in campos]
+    if desconocidos:
+        raise CampoInvalido(
+            f'Campos desconocidos: {", ".join(desconocidos)}. Disponibles: {", ".join(campos)}'
+        )
+    return [(nombre, campos[nombre]) for nombre in dict.fromkeys(nombres or defecto)]
+
+
+def filas_json(filas, seleccion):
+    """Dicts de values() con los nombres públicos de `seleccion`, en su orden"""
+    return [{nombre: fila[campo] for nombre, campo in seleccion} for fila in filas]
+
+
+def _por_defecto(valor):
+    # Decimal como texto (igual que DjangoJSONEncoder): no perder precisión en montos
+    return str(valor)
+
+
+def serializar(datos):
+    if orjson is not None:
+        return orjson.dumps(datos, default=_por_defecto)
+    return json.dumps(datos, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def _respuesta(request, datos, etag=None, privada=False):
+    """
+    HttpResponse JSON con ETag (por defecto, hash del cuerpo) y 304 si el
+    cliente ya la tiene.
+    """
+    cuerpo = serializar(datos)
+    if etag is None:
+        etag = f'"{hashlib.md5(cuerpo).hexdigest()}"'
+    no_modificada = get_conditional_response(request, etag=etag)
+    response = no_modificada or HttpResponse(cuerpo, content_type='application/json')
+    response['ETag'] = etag
+    if privada:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _error(mensaje, estado):
+    return JsonResponse({'error': mensaje}, status=estado, json_dumps_params={'ensure_ascii': False})
+
+
+def api_vista(vista):
+    """GET/HEAD solamente; CampoInvalido responde 400"""
+    @require_safe
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        try:
+            return vista(request, *args, **kwargs)
+        except CampoInvalido as error:
+            return _error(str(error), 400)
+    return envoltura
+
+
+def api_usuario_requerido(vista):
+    """Como usuario_requerido, pero responde 401 en JSON en lugar de redirigir"""
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if not request.session.get('usuario_id') or not request.usuario:
+            return _error('Se requiere iniciar sesión', 401)
+        return vista(request, *args, **kwargs)
+    return envoltura
+
+
+def _catalogo_no_modificado(request):
+    """(etag, 304 o None) a partir de la marca del catálogo, sin consultar productos"""
+    etag, ultima = validadores_catalogo(request)
+    no_modificada = get_conditional_response(request, etag=etag, last_modified=ultima)
+    if no_modificada is not None:
+        no_modificada['ETag'] = etag
+        patch_cache_control(no_modificada, no_cache=True)
+    return etag, no_modificada
+
+
+@presupuesto_consultas(3)
+@api_vista
+def productos(request):
+    """Productos activos; ?categoria= y ?busqueda= como en el catálogo"""
+    seleccion = leer_campos(request.GET, CAMPOS_PRODUCTO, CAMPOS_PRODUCTO_DEFECTO)
+    etag, no_modificada = _catalogo_no_modificado(request)
+    if no_modificada is not None:
+        return no_modificada
+
+    campos = [campo for _, campo in seleccion]
+    categoria = request.GET.get('categoria')
+    busqueda = request.GET.get('busqueda')
+    cursor = request.GET.get('cursor')
+    tamano = tamano_pagina(request.GET.get('tamano'))
+
+    pagina = None
+    if busqueda:
+        try:
+            pagina = buscar_productos(busqueda, categoria, cursor, tamano, campos=campos)
+        except BusquedaNoDisponible:
+            pass
+    if pagina is None:
+        activos = Producto.objects.filter(activo_producto=True)
+        if categoria:
+            activos = activos.filter(categoria_producto=categoria)
+        if busqueda:
+            activos = activos.filter(Q(nombre_producto__icontains=busqueda) | Q(descripcion_producto__icontains=busqueda))
+        pagina = paginar_keyset(activos.values('id_producto', *campos), ['id_producto'], cursor, tamano)
+
+    return _respuesta(request, {
+        'resultados': filas_json(pagina.items, seleccion),
+        'siguiente_cursor': pagina.siguiente_cursor,
+    }, etag=etag)
+
+
+@presupuesto_consultas(2)
+@api_vista
+def categorias(request):
+    """Categorías con productos activos y su cantidad"""
+    etag, no_modificada = _catalogo_no_modificado(request)
+    if no_modificada is not None:
+        return no_modificada
+    return _respuesta(request, {
+        'resultados': [{'categoria': categoria, 'cantidad': cantidad} for categoria, cantidad in obtener_categorias()],
+    }, etag=etag)
+
+
+@presupuesto_consultas(4)
+@api_vista
+@api_usuario_requerido
+def carrito(request):
+    """Items del carrito activo y su resumen"""
+    seleccion = leer_campos(request.GET, CAMPOS_CARRITO, CAMPOS_CARRITO_DEFECTO)
+    items = Carrito.objects.filter(id_usuario=request.usuario, estado_carrito='activo')
+    if any(campo == 'disponible_producto' for _, campo in seleccion):
+        items = items.annotate(
+            disponible_producto=F('id_producto__stock_producto') - reservado(request.usuario.id_usuario)
+        )
+    items = items.order_by('id_carrito').values(*[campo for _, campo in seleccion])
+    resumen = obtener_resumen_carrito(request.usuario.id_usuario)
+    return _respuesta(request, {
+        'resultados': filas_json(items, seleccion),
+        'cantidad': resumen['cantidad'],
+        'total': resumen['total'],
+    }, privada=True)
+
+
+@presupuesto_consultas(4)
+@api_vista
+@api_usuario_requerido
+def pedidos(request):
+    """Historial de pedidos (incluye el archivo); ?estado=, ?desde=, ?hasta= como en mis_pedidos"""
+    seleccion = leer_campos(request.GET, CAMPOS_PEDIDO, CAMPOS_PEDIDO_DEFECTO)
+    pagina = paginar_historial(
+        request.usuario, leer_filtros(request.GET), request.GET.get('cursor'),
+        tamano_pagina(request.GET.get('tamano'), TAMANO_HISTORIAL), campos=[campo for _, campo in seleccion],
+    )
+    return _respuesta(request, {
+        'resultados': filas_json(pagina.items, seleccion),
+        'siguiente_cursor': pagina.siguiente_cursor,
+    }, privada=True)
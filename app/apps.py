@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        # Registrar las señales y las comprobaciones de `manage.py check`
+        from . import checks, signals  # noqa: F401
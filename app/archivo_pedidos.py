@@ -0,0 +1,116 @@
+"""
+Archivo de pedidos (tabla caliente T_Pedido / tabla fría T_PedidoArchivo).
+
+El comando archivar_pedidos mueve por lotes los pedidos entregados con más de
+PEDIDOS_DIAS_ARCHIVO días a T_PedidoArchivo: cada lote es un INSERT ... SELECT
+y un DELETE por llave primaria dentro de una transacción, así que un pedido
+nunca está en las dos tablas ni en ninguna. T_Pedido queda con los pedidos
+recientes y los que siguen en curso, y sus índices no crecen con el historial.
+
+limite_archivo() es la fecha del pedido archivado más reciente (el MAX real
+del archivo, en la cache compartida): las lecturas de pedidos posteriores no
+necesitan consultar el archivo. No depende de PEDIDOS_DIAS_ARCHIVO, así que
+cambiar ese valor no deja pedidos archivados fuera del historial.
+"""
+import datetime
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Pedido, PedidoArchivado
+from .sql import tabla
+
+PEDIDOS_DIAS_ARCHIVO_DEFECTO = 365
+
+# Solo se archivan pedidos cerrados: los demás todavía pueden cambiar de estado
+ESTADOS_ARCHIVABLES = ('entregado',)
+
+CLAVE_LIMITE_ARCHIVO = 'pedidos:archivo:limite'
+LIMITE_ARCHIVO_TTL = 60 * 60
+
+
+class ArchivoInconsistente(Exception):
+    """El INSERT y el DELETE de un lote no movieron las mismas filas; el lote se revierte"""
+
+
+def dias_archivo():
+    return getattr(settings, 'PEDIDOS_DIAS_ARCHIVO', PEDIDOS_DIAS_ARCHIVO_DEFECTO)
+
+
+def horizonte_archivo(ahora=None):
+    """Fecha antes de la cual archivar_pedidos mueve los pedidos entregados"""
+    return (ahora or timezone.now()) - datetime.timedelta(days=dias_archivo())
+
+
+def limite_archivo():
+    """
+    Fecha del pedido archivado más reciente, o None si el archivo está vacío.
+    Mientras archivar_pedidos corre es una cota superior: nunca es menor que
+    la fecha de un pedido ya archivado.
+    """
+    cache = caches['compartida']
+    guardado = cache.get(CLAVE_LIMITE_ARCHIVO)
+    if guardado is None:
+        # En una tupla, para poder guardar None (archivo vacío)
+        guardado = (PedidoArchivado.objects.aggregate(limite=Max('fecha_pedido_pedido'))['limite'],)
+        # add: no pisa la cota que archivar_pedidos haya guardado mientras tanto
+        if not cache.add(CLAVE_LIMITE_ARCHIVO, guardado, LIMITE_ARCHIVO_TTL):
+            guardado = cache.get(CLAVE_LIMITE_ARCHIVO) or guardado
+    return guardado[0]
+
+
+def _mover_lote(archivables, ids):
+    # El SELECT del INSERT y el DELETE repiten las condiciones de archivables
+    campos = Pedido._meta.concrete_fields
+    seleccion, params = (
+        archivables.filter(id_pedido__in=ids).values_list(*[campo.attname for campo in campos])
+        .query.sql_with_params()
+    )
+    columnas = ', '.join(campo.column for campo in campos)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'INSERT INTO {tabla(PedidoArchivado)} ({columnas}) {seleccion}', params)
+            insertados = cursor.rowcount
+        borrados = archivables.filter(id_pedido__in=ids).delete()[0]
+        if insertados != borrados:
+            raise ArchivoInconsistente(f'Se insertaron {insertados} pedidos en el archivo pero se borraron {borrados}')
+    return borrados
+
+
+def archivar_pedidos(antes_de=None, lote=1000, pausa=0):
+    """
+    Mueve a T_PedidoArchivo los pedidos entregados anteriores a `antes_de`
+    (por defecto horizonte_archivo()), en lotes por id_pedido ascendente.
+    Devuelve el total de pedidos movidos.
+    """
+    if antes_de is None:
+        antes_de = horizonte_archivo()
+    # Antes de mover nada, limite_archivo() pasa a ser una cota de lo que habrá en el
+    # archivo (antes_de); al terminar se borra y la próxima lectura toma el MAX real
+    cache = caches['compartida']
+    actual = limite_archivo()
+    cota = (antes_de if actual is None else max(actual, antes_de),)
+
+    archivables = Pedido.objects.filter(estado_pedido__in=ESTADOS_ARCHIVABLES, fecha_pedido_pedido__lt=antes_de)
+    total = 0
+    ultimo = 0
+    while True:
+        ids = list(
+            archivables.filter(id_pedido__gt=ultimo).order_by('id_pedido')
+            .values_list('id_pedido', flat=True)[:lote]
+        )
+        if not ids:
+            break
+        ultimo = ids[-1]
+        # En cada lote, por si la cache la desalojó entretanto
+        cache.set(CLAVE_LIMITE_ARCHIVO, cota, LIMITE_ARCHIVO_TTL)
+        total += _mover_lote(archivables, ids)
+        if pausa:
+            time.sleep(pausa)
+    if total:
+        cache.delete(CLAVE_LIMITE_ARCHIVO)
+    return total
@@ -0,0 +1,53 @@
+"""
+Trabajo bloqueante (ORM, cache, sesión) desde vistas async.
+
+Con ASGI las vistas async corren en el event loop y cada request en espera no
+ocupa un hilo; las consultas sí bloquean, así que se ejecutan en un pool de
+hilos acotado (settings.ASYNC_DB_HILOS). El tamaño del pool limita cuántas
+conexiones abre el proceso, igual que los hilos de un worker WSGI.
+
+    resumen = await en_hilo_db(obtener_resumen_carrito)(usuario_id)
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+ASYNC_DB_HILOS_DEFECTO = 8
+
+_executor = None
+_lock = threading.Lock()
+
+
+def executor_db():
+    """ThreadPoolExecutor compartido por todas las vistas async del proceso"""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'ASYNC_DB_HILOS', ASYNC_DB_HILOS_DEFECTO),
+                    thread_name_prefix='tienda-db',
+                )
+    return _executor
+
+
+def _ejecutar(funcion, args, kwargs):
+    try:
+        return funcion(*args, **kwargs)
+    finally:
+        # Equivale a request_finished: devuelve la conexión del hilo al pool
+        close_old_connections()
+
+
+def en_hilo_db(funcion):
+    """Versión async de `funcion`, ejecutada en el pool de hilos de BD"""
+    @wraps(funcion)
+    async def envoltura(*args, **kwargs):
+        return await sync_to_async(_ejecutar, thread_sensitive=False, executor=executor_db())(
+            funcion, args, kwargs
+        )
+    return envoltura
@@ -0,0 +1 @@
+# Backends de base de datos con pool de conexiones (ver app/backends/pool.py)
@@ -0,0 +1,10 @@
+from mssql.base import DatabaseWrapper as MSSQLDatabaseWrapper
+
+from ..pool import PoolMixin
+
+
+class DatabaseWrapper(PoolMixin, MSSQLDatabaseWrapper):
+    """SQL Server (mssql-django) con pool de conexiones"""
+
+    # Motor sin pool, para comparar en benchmark_conexiones
+    motor_base = 'mssql'
@@ -0,0 +1,259 @@
+"""
+Pool de conexiones por proceso para los backends de Django.
+
+Django abre una conexión nueva por request (CONN_MAX_AGE = 0) o una por hilo
+(CONN_MAX_AGE > 0). Con SQL Server y autenticación de Windows abrir la conexión
+cuesta más que la consulta, así que estos backends toman conexiones de un pool
+acotado y las devuelven al cerrar:
+
+    DATABASES['default']['ENGINE'] = 'app.backends.mssql'   # o 'app.backends.sqlite3'
+    DATABASES['default']['POOL'] = {'TAMANO_MAXIMO': 10, ...}
+
+Las conexiones se verifican (SELECT 1) si estuvieron inactivas más de
+VERIFICAR_TRAS segundos, se descartan tras TIEMPO_INACTIVO sin uso o VIDA_MAXIMA
+desde que se abrieron, y las estadísticas se consultan con estadisticas_pools().
+El lock del pool solo protege las listas: conectar, verificar, el rollback al
+devolver y cerrar se hacen fuera de él, así que una BD lenta no frena a los
+hilos que solo toman o devuelven.
+"""
+import threading
+import time
+from collections import deque
+
+from django.db import OperationalError
+
+CONFIG_DEFECTO = {
+    'TAMANO_MAXIMO': 10,     # conexiones abiertas como máximo (en uso + libres)
+    'ESPERA_MAXIMA': 5.0,    # segundos esperando una conexión libre antes de fallar
+    'TIEMPO_INACTIVO': 300,  # segundos sin uso tras los que se cierra una conexión libre
+    'VIDA_MAXIMA': 1800,     # segundos de vida máxima de una conexión
+    'VERIFICAR_TRAS': 30,    # segundos de inactividad tras los que se verifica antes de entregarla
+}
+
+
+class _Entrada:
+    __slots__ = ('conexion', 'creada', 'devuelta')
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.creada = self.devuelta = time.monotonic()
+
+
+class PoolConexiones:
+    def __init__(self, alias, conectar, config=None):
+        self.alias = alias
+        self._conectar = conectar
+        self.config = {**CONFIG_DEFECTO, **(config or {})}
+        self._libres = deque()
+        self._en_uso = {}
+        self._creando = 0
+        self._condicion = threading.Condition()
+        self.stats = {
+            'checkouts': 0,
+            'reutilizadas': 0,
+            'creadas': 0,
+            'esperas': 0,
+            'tiempo_espera_total': 0.0,
+            'agotado': 0,
+            'tiempo_conexion_total': 0.0,
+            'rotas': 0,
+            'expiradas': 0,
+        }
+
+    # --- ciclo de vida -------------------------------------------------------
+
+    def tomar(self):
+        """Entrega una conexión libre (verificada) o abre una nueva si hay cupo"""
+        limite = time.monotonic() + self.config['ESPERA_MAXIMA']
+        esperando_desde = None
+        with self._condicion:
+            self.stats['checkouts'] += 1
+        while True:
+            # Bajo el lock solo se toma o reserva la conexión: cerrar, verificar y
+            # conectar son idas a la BD y se hacen sin bloquear a los demás hilos
+            cerrar = []
+            entrada = None
+            agotado = False
+            with self._condicion:
+                while True:
+                    cerrar.extend(self._sacar_expiradas())
+                    if self._libres or self._total() < self.config['TAMANO_MAXIMO']:
+                        break
+                    # Pool lleno: esperar a que otro hilo devuelva una conexión
+                    if esperando_desde is None:
+                        esperando_desde = time.monotonic()
+                        self.stats['esperas'] += 1
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self.stats['agotado'] += 1
+                        agotado = True
+                        break
+                    self._condicion.wait(restante)
+                if esperando_desde is not None:
+                    self.stats['tiempo_espera_total'] += time.monotonic() - esperando_desde
+                    esperando_desde = None
+                if self._libres and not agotado:
+                    entrada = self._libres.pop()  # LIFO: la más reciente, la más "caliente"
+                    # Cuenta como en uso mientras se verifica
+                    self._en_uso[id(entrada.conexion)] = entrada
+                elif not agotado:
+                    # Reservar el cupo antes de conectar
+                    self._creando += 1
+
+            for conexion in cerrar:
+                self._cerrar(conexion)
+            if agotado:
+                raise OperationalError(
+                    f'Pool de conexiones "{self.alias}" agotado '
+                    f'({self.config["TAMANO_MAXIMO"]} conexiones en uso)'
+                )
+            if entrada is None:
+                return self._abrir()
+            if self._verificar(entrada):
+                with self._condicion:
+                    self.stats['reutilizadas'] += 1
+                return entrada.conexion
+            # Rota: ya se cerró; se libera su cupo y se intenta con otra
+            with self._condicion:
+                self._en_uso.pop(id(entrada.conexion), None)
+                self.stats['rotas'] += 1
+                self._condicion.notify()
+
+    def devolver(self, conexion, rota=False):
+        """Devuelve la conexión al pool; las rotas o vencidas se cierran"""
+        with self._condicion:
+            # Sigue en _en_uso (y ocupando su cupo) hasta terminar el rollback
+            entrada = self._en_uso.get(id(conexion)) or _Entrada(conexion)
+        vencida = time.monotonic() - entrada.creada > self.config['VIDA_MAXIMA']
+        if not rota:
+            try:
+                # Nunca devolver una conexión con una transacción abierta
+                conexion.rollback()
+            except Exception:
+                rota = True
+        if rota or vencida:
+            self._cerrar(conexion)
+        with self._condicion:
+            self._en_uso.pop(id(conexion), None)
+            if rota or vencida:
+                self.stats['rotas' if rota else 'expiradas'] += 1
+            else:
+                entrada.devuelta = time.monotonic()
+                self._libres.append(entrada)
+            self._condicion.notify()
+
+    def cerrar_todas(self):
+        with self._condicion:
+            libres = [entrada.conexion for entrada in self._libres]
+            self._libres.clear()
+        for conexion in libres:
+            self._cerrar(conexion)
+
+    # --- internos ------------------------------------------------------------
+
+    def _total(self):
+        return len(self._libres) + len(self._en_uso) + self._creando
+
+    def _abrir(self):
+        """Conecta con el cupo ya reservado en _creando"""
+        inicio = time.monotonic()
+        try:
+            conexion = self._conectar()
+        except Exception:
+            with self._condicion:
+                self._creando -= 1
+                self._condicion.notify()
+            raise
+        with self._condicion:
+            self._creando -= 1
+            self.stats['creadas'] += 1
+            self.stats['tiempo_conexion_total'] += time.monotonic() - inicio
+            self._en_uso[id(conexion)] = _Entrada(conexion)
+        return conexion
+
+    def _verificar(self, entrada):
+        """SELECT 1 si estuvo inactiva VERIFICAR_TRAS segundos; si falla la cierra y devuelve False"""
+        if time.monotonic() - entrada.devuelta < self.config['VERIFICAR_TRAS']:
+            return True
+        try:
+            cursor = entrada.conexion.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            self._cerrar(entrada.conexion)
+            return False
+
+    def _sacar_expiradas(self):
+        """Quita de las libres las inactivas o vencidas y las devuelve, para cerrarlas fuera del lock"""
+        ahora = time.monotonic()
+        vigentes = deque()
+        expiradas = []
+        for entrada in self._libres:
+            if (ahora - entrada.devuelta > self.config['TIEMPO_INACTIVO']
+                    or ahora - entrada.creada > self.config['VIDA_MAXIMA']):
+                self.stats['expiradas'] += 1
+                expiradas.append(entrada.conexion)
+            else:
+                vigentes.append(entrada)
+        self._libres = vigentes
+        return expiradas
+
+    @staticmethod
+    def _cerrar(conexion):
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+    def estadisticas(self):
+        with self._condicion:
+            datos = dict(self.stats)
+            datos['en_uso'] = len(self._en_uso)
+            datos['libres'] = len(self._libres)
+            datos['tamano_maximo'] = self.config['TAMANO_MAXIMO']
+            creadas = datos['creadas'] or 1
+            datos['latencia_conexion_ms'] = datos['tiempo_conexion_total'] * 1000 / creadas
+            return datos
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def obtener_pool(alias, conectar, config=None):
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = PoolConexiones(alias, conectar, config)
+        return pool
+
+
+def estadisticas_pools():
+    """Estadísticas de todos los pools del proceso, por alias de base de datos"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.alias: pool.estadisticas() for pool in pools}
+
+
+class PoolMixin:
+    """
+    Mezclar antes del DatabaseWrapper del motor real. get_new_connection toma del
+    pool y _close devuelve la conexión en lugar de cerrarla.
+    """
+
+    def get_new_connection(self, conn_params):
+        self._pool_conexiones = obtener_pool(
+            self.alias,
+            lambda: super(PoolMixin, self).get_new_connection(conn_params),
+            self.settings_dict.get('POOL'),
+        )
+        return self._pool_conexiones.tomar()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        rota = self.errors_occurred and not self.is_usable()
+        with self.wrap_database_errors:
+            self._pool_conexiones.devolver(self.connection, rota=rota)
@@ -0,0 +1,10 @@
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+
+from ..pool import PoolMixin
+
+
+class DatabaseWrapper(PoolMixin, SQLiteDatabaseWrapper):
+    """SQLite con pool de conexiones (para desarrollo y benchmarks locales)"""
+
+    # Motor sin pool, para comparar en benchmark_conexiones
+    motor_base = 'django.db.backends.sqlite3'
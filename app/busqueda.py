@@ -0,0 +1,279 @@
+"""
+Búsqueda de productos con índice invertido.
+
+El índice vive fuera de la base principal, en un archivo SQLite con FTS5 (BUSQUEDA['RUTA']),
+se actualiza de forma incremental con las señales de Producto (ver app/signals.py)
+y se reconstruye completo con: python manage.py reconstruir_indice_busqueda
+
+Mientras no se haya reconstruido al menos una vez, el índice solo tiene los
+productos que cambiaron desde que existe el archivo: buscar() lanza
+BusquedaNoDisponible y las vistas usan la búsqueda por LIKE.
+"""
+import logging
+import re
+import sqlite3
+import threading
+import unicodedata
+
+from django.conf import settings
+from django.utils.functional import cached_property
+
+from .models import Producto
+from .paginacion import PaginaKeyset, codificar_cursor, decodificar_cursor, TAMANO_PAGINA
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r'\w+')
+# Coincidencias sobre las que se aplican las facetas; por debajo del límite de
+# 2100 parámetros de SQL Server para el id__in del camino por BD
+MAX_COINCIDENCIAS = 1000
+
+
+class BusquedaNoDisponible(Exception):
+    """El índice de búsqueda no se puede usar (no existe, está dañado, etc.)"""
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes: 'Cámara Eléctrica' -> 'camara electrica'"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return texto.lower()
+
+
+def tokenizar(texto):
+    return _TOKEN.findall(normalizar(texto))
+
+
+def documento_producto(producto):
+    """Campos del producto que se indexan"""
+    return {
+        'nombre': producto.nombre_producto or '',
+        'descripcion': producto.descripcion_producto or '',
+        'categoria': producto.categoria_producto or '',
+        'codigo': producto.codigo_producto or '',
+    }
+
+
+class IndiceFTS5:
+    """
+    Índice en SQLite FTS5: tokenizador unicode61 sin diacríticos, búsqueda por
+    prefijo y orden por BM25 (el nombre pesa más que la descripción).
+    Una conexión por hilo; las escrituras usan WAL para no bloquear lecturas.
+    """
+
+    # Pesos BM25 por columna: nombre, descripcion, categoria, codigo
+    PESOS = (10.0, 2.0, 4.0, 8.0)
+
+    SQL_INSERTAR = (
+        'INSERT INTO productos (rowid, nombre, descripcion, categoria, codigo, categoria_exacta) '
+        'VALUES (?, ?, ?, ?, ?, ?)'
+    )
+
+    def __init__(self, ruta):
+        self.ruta = str(ruta)
+        self._local = threading.local()
+        self._esquema_listo = False
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            try:
+                conexion = sqlite3.connect(self.ruta, timeout=5)
+                conexion.execute('PRAGMA journal_mode=WAL')
+                if not self._esquema_listo:
+                    self._crear_esquema(conexion)
+                    self._esquema_listo = True
+            except sqlite3.Error as e:
+                raise BusquedaNoDisponible(str(e)) from e
+            self._local.conexion = conexion
+        return conexion
+
+    def _crear_esquema(self, conexion):
+        # categoria_exacta (no indexada) permite filtrar por categoría con igualdad exacta
+        conexion.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS productos USING fts5(
+                nombre, descripcion, categoria, codigo,
+                categoria_exacta UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+        # Marca de reconstrucción completa: sin ella el índice no tiene todo el catálogo
+        conexion.execute('CREATE TABLE IF NOT EXISTS estado (clave TEXT PRIMARY KEY, valor TEXT)')
+        conexion.commit()
+
+    def _construido(self, conexion):
+        return conexion.execute("SELECT 1 FROM estado WHERE clave = 'construido'").fetchone() is not None
+
+    @cached_property
+    def _expresion_rank(self):
+        return 'bm25(productos, {})'.format(', '.join(str(p) for p in self.PESOS))
+
+    def _filas(self, productos):
+        for producto in productos:
+            doc = documento_producto(producto)
+            yield (producto.id_producto, doc['nombre'], doc['descripcion'],
+                   doc['categoria'], doc['codigo'], producto.categoria_producto or '')
+
+    def indexar(self, productos):
+        conexion = self._conexion()
+        filas = list(self._filas(productos))
+        with conexion:
+            conexion.executemany('DELETE FROM productos WHERE rowid = ?', [(f[0],) for f in filas])
+            conexion.executemany(self.SQL_INSERTAR, filas)
+
+    def eliminar(self, ids_producto):
+        conexion = self._conexion()
+        with conexion:
+            conexion.executemany('DELETE FROM productos WHERE rowid = ?', [(i,) for i in ids_producto])
+
+    def reconstruir(self, productos, lote=1000):
+        """Vacía el índice y lo vuelve a llenar; devuelve el número de productos indexados"""
+        conexion = self._conexion()
+        total = 0
+        with conexion:
+            conexion.execute('DELETE FROM productos')
+            filas = []
+            for fila in self._filas(productos):
+                filas.append(fila)
+                if len(filas) >= lote:
+                    conexion.executemany(self.SQL_INSERTAR, filas)
+                    total += len(filas)
+                    filas = []
+            if filas:
+                conexion.executemany(self.SQL_INSERTAR, filas)
+                total += len(filas)
+            conexion.execute(
+                "INSERT OR REPLACE INTO estado (clave, valor) VALUES ('construido', datetime('now'))"
+            )
+        conexion.execute("INSERT INTO productos (productos) VALUES ('optimize')")
+        conexion.commit()
+        return total
+
+    @staticmethod
+    def _consulta_fts(texto):
+        # Cada término como frase entre comillas con prefijo: "camara"* AND "sony"*
+        tokens = tokenizar(texto)
+        return ' AND '.join(f'"{t}"*' for t in tokens)
+
+    def buscar(self, texto, categoria=None, despues_de=None, limite=TAMANO_PAGINA):
+        """
+        Lista de (id_producto, puntaje) ordenada por relevancia. `despues_de` es el
+        par (puntaje, id_producto) de la última fila de la página anterior.
+        Lanza BusquedaNoDisponible si el índice no se puede consultar o nunca se reconstruyó.
+        """
+        consulta = self._consulta_fts(texto)
+        if not consulta:
+            return []
+
+        sql = f'SELECT rowid, {self._expresion_rank} AS puntaje FROM productos WHERE productos MATCH ?'
+        params = [consulta]
+        if categoria:
+            sql += ' AND categoria_exacta = ?'
+            params.append(categoria)
+        sql = f'SELECT rowid, puntaje FROM ({sql})'
+        if despues_de is not None:
+            sql += ' WHERE puntaje > ? OR (puntaje = ? AND rowid > ?)'
+            params.extend([despues_de[0], despues_de[0], despues_de[1]])
+        sql += ' ORDER BY puntaje, rowid LIMIT ?'
+        params.append(limite)
+
+        conexion = self._conexion()
+        try:
+            if not self._construido(conexion):
+                raise BusquedaNoDisponible(
+                    'El índice nunca se reconstruyó; ejecuta: python manage.py reconstruir_indice_busqueda'
+                )
+            return conexion.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            raise BusquedaNoDisponible(str(e)) from e
+
+
+_indice = None
+_indice_lock = threading.Lock()
+
+
+def indice():
+    """Índice en settings.BUSQUEDA['RUTA'] (se abre una vez por proceso)"""
+    global _indice
+    if _indice is None:
+        with _indice_lock:
+            if _indice is None:
+                config = getattr(settings, 'BUSQUEDA', {})
+                _indice = IndiceFTS5(config.get('RUTA', settings.BASE_DIR / 'busqueda.sqlite3'))
+    return _indice
+
+
+def indexar_producto(producto):
+    """Actualiza un producto en el índice; los inactivos se quitan"""
+    indexar_productos([producto])
+
+
+def indexar_productos(productos):
+    """Como indexar_producto, para un lote (importaciones masivas)"""
+    activos = [p for p in productos if p.activo_producto]
+    inactivos = [p.id_producto for p in productos if not p.activo_producto]
+    try:
+        if activos:
+            indice().indexar(activos)
+        if inactivos:
+            indice().eliminar(inactivos)
+    except (BusquedaNoDisponible, sqlite3.Error) as e:
+        ids = ', '.join(str(p.id_producto) for p in productos[:10])
+        logger.warning('No se pudo actualizar el índice de búsqueda para %s: %s', ids, e)
+
+
+def eliminar_producto(id_producto):
+    try:
+        indice().eliminar([id_producto])
+    except (BusquedaNoDisponible, sqlite3.Error) as e:
+        logger.warning('No se pudo quitar %s del índice de búsqueda: %s', id_producto, e)
+
+
+def reconstruir_indice():
+    """Reindexa todos los productos activos; devuelve cuántos se indexaron"""
+    productos = Producto.objects.filter(activo_producto=True).only(
+        'id_producto', 'nombre_producto', 'descripcion_producto',
+        'categoria_producto', 'codigo_producto'
+    ).iterator(chunk_size=2000)
+    return indice().reconstruir(productos)
+
+
+def buscar_coincidencias(texto):
+    """
+    [(id_producto, puntaje)] de las primeras BUSQUEDA['MAX_COINCIDENCIAS']
+    coincidencias por relevancia: el conjunto sobre el que el catálogo aplica y
+    cuenta las facetas. Lanza BusquedaNoDisponible.
+    """
+    maximo = getattr(settings, 'BUSQUEDA', {}).get('MAX_COINCIDENCIAS', MAX_COINCIDENCIAS)
+    return indice().buscar(texto, limite=maximo)
+
+
+def buscar_productos(texto, categoria=None, cursor=None, tamano=TAMANO_PAGINA, campos=None):
+    """
+    Página de productos ordenados por relevancia, paginada por cursor (puntaje, id).
+    Con `campos` los items son dicts de values() con esos campos (más id_producto)
+    en lugar de objetos Producto. Lanza BusquedaNoDisponible si el índice no se
+    puede consultar.
+    """
+    despues_de = decodificar_cursor(cursor, 2)
+    resultados = indice().buscar(texto, categoria=categoria, despues_de=despues_de, limite=tamano + 1)
+    hay_mas = len(resultados) > tamano
+    resultados = resultados[:tamano]
+
+    ids = [id_producto for id_producto, _ in resultados]
+    activos = Producto.objects.filter(activo_producto=True)
+    if campos:
+        por_id = {
+            fila['id_producto']: fila
+            for fila in activos.filter(id_producto__in=ids).values('id_producto', *campos)
+        }
+    else:
+        por_id = activos.in_bulk(ids)
+    # Conservar el orden de relevancia del índice
+    items = [por_id[i] for i in ids if i in por_id]
+
+    siguiente_cursor = None
+    if hay_mas:
+        ultimo_id, ultimo_puntaje = resultados[-1]
+        siguiente_cursor = codificar_cursor([ultimo_puntaje, ultimo_id])
+    return PaginaKeyset(items, siguiente_cursor, hay_mas)
@@ -0,0 +1,191 @@
+"""
+Cache del catálogo con versión global.
+
+Toda escritura de Producto (vistas CRUD, admin, importaciones masivas) cambia
+la versión del catálogo; las claves de página incluyen la versión, así que las
+páginas viejas simplemente dejan de usarse y expiran solas.
+
+La versión y la marca están en la cache 'compartida', que ven todos los
+workers: una escritura en uno invalida las páginas y validadores de todos. Las
+páginas se guardan en la cache local de cada worker ('default'), con la versión
+en la clave.
+
+Las tarjetas de producto se cachean además por fragmento con la llave
+id_producto + fecha_actualizacion_producto (ver app/includes/productos_cards.html).
+
+Las mismas páginas responden a GET condicionales: ETag y Last-Modified salen de
+la marca del catálogo (versión + última modificación, ver marca_catalogo), que
+está en cache, así que un visitante que repite la página recibe 304 sin que se
+lea la página guardada ni se renderice la plantilla.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib import messages
+from django.core.cache import cache, caches
+from django.db.models import Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from . import miniaturas
+from .async_db import en_hilo_db
+from .models import Producto
+
+# La versión es el time.time_ns() del último cambio: también da el instante
+# para Last-Modified y, a diferencia de incr(), no pierde cambios simultáneos en
+# caches sin incremento atómico (FileBasedCache)
+CLAVE_VERSION = 'catalogo:version'
+
+# Segundos que se conserva una página completa del catálogo
+PAGINA_CATALOGO_TTL = 60 * 10
+
+# Encabezados que no se guardan con la página (son propios de cada respuesta)
+_ENCABEZADOS_EXCLUIDOS = {'set-cookie', 'vary'}
+
+
+def version_catalogo():
+    compartida = caches['compartida']
+    version = compartida.get(CLAVE_VERSION)
+    if version is None:
+        # Cache vacía o reiniciada: cuenta como un cambio ahora
+        compartida.add(CLAVE_VERSION, time.time_ns(), None)
+        version = compartida.get(CLAVE_VERSION)
+    return version
+
+
+def incrementar_version_catalogo():
+    """Invalida todas las páginas del catálogo en cache, en todos los workers"""
+    version = time.time_ns()
+    caches['compartida'].set(CLAVE_VERSION, version, None)
+    return version
+
+
+def marca_catalogo(categoria=None):
+    """
+    (versión, timestamp de la última modificación) del catálogo visto con el
+    filtro de categoría. El MAX(fecha_actualizacion_producto) se calcula una vez
+    por versión y categoría; después sale de cache. La búsqueda no entra en la
+    marca: sus resultados son un subconjunto de la categoría.
+
+    El instante del último cambio de versión también cuenta, porque borrados,
+    desactivaciones e importaciones masivas no siempre mueven el MAX.
+    """
+    compartida = caches['compartida']
+    version = version_catalogo()
+    clave = f'catalogo:marca:{version}:{hashlib.md5((categoria or "").encode()).hexdigest()}'
+    marca = compartida.get(clave)
+    if marca is None:
+        productos = Producto.objects.filter(activo_producto=True)
+        if categoria:
+            productos = productos.filter(categoria_producto=categoria)
+        ultima = productos.aggregate(ultima=Max('fecha_actualizacion_producto'))['ultima']
+        marca = max(ultima.timestamp() if ultima else 0, version / 1e9)
+        compartida.set(clave, marca, PAGINA_CATALOGO_TTL)
+    return version, marca
+
+
+def _es_cacheable(request):
+    """Solo GET/HEAD de visitantes anónimos sin mensajes pendientes"""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if hasattr(request, 'session') and request.session.get('usuario_id'):
+        return False
+    # len() carga los mensajes sin marcarlos como leídos
+    if len(messages.get_messages(request)):
+        return False
+    return True
+
+
+def _clave_pagina(request):
+    ruta = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'catalogo:pagina:{version_catalogo()}:{ruta}'
+
+
+def validadores_catalogo(request):
+    """(etag, last_modified) de la página: distintos por URL (filtros, cursor)"""
+    # Con varias categorías (facetas) la marca es la de todo el catálogo
+    categorias = request.GET.getlist('categoria')
+    version, marca = marca_catalogo(categorias[0] if len(categorias) == 1 else None)
+    estado = f'{version}:{marca}:{miniaturas.manifiesto.version()}:{request.get_full_path()}'
+    return f'"{hashlib.md5(estado.encode()).hexdigest()}"', int(marca)
+
+
+def _poner_validadores(response, validadores):
+    etag, ultima = validadores
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(ultima)
+    # Que el navegador revalide siempre en vez de suponer frescura por Last-Modified
+    patch_cache_control(response, no_cache=True)
+
+
+def _leer_pagina(request):
+    """
+    (clave, validadores, respuesta): la respuesta es un 304 si el cliente ya
+    tiene la página, la página guardada, o None. clave y validadores son None si
+    el request no es cacheable.
+    """
+    if not _es_cacheable(request):
+        return None, None, None
+    validadores = validadores_catalogo(request)
+    etag, ultima = validadores
+    no_modificada = get_conditional_response(request, etag=etag, last_modified=ultima)
+    if no_modificada is not None:
+        if no_modificada.status_code == 304:
+            _poner_validadores(no_modificada, validadores)
+        return None, None, no_modificada
+
+    clave = _clave_pagina(request)
+    guardada = cache.get(clave)
+    if guardada is None:
+        return clave, validadores, None
+    contenido, estado, encabezados = guardada
+    response = HttpResponse(contenido, status=estado, headers=encabezados)
+    _poner_validadores(response, validadores)
+    return clave, validadores, response
+
+
+def _guardar_pagina(clave, validadores, response):
+    if response.status_code == 200 and not response.streaming:
+        _poner_validadores(response, validadores)
+    # Si la respuesta pone cookies (CSRF, sesión) es personal y no se guarda
+    if response.status_code == 200 and not response.cookies and not response.streaming:
+        encabezados = {
+            nombre: valor for nombre, valor in response.items()
+            if nombre.lower() not in _ENCABEZADOS_EXCLUIDOS
+        }
+        cache.set(clave, (response.content, response.status_code, encabezados), PAGINA_CATALOGO_TTL)
+
+
+def cache_pagina_catalogo(vista):
+    """
+    Cachea la respuesta completa de una vista del catálogo para visitantes anónimos
+    y responde 304 a sus GET condicionales. Lo personalizado (carrito, mensajes,
+    formularios con CSRF) solo se muestra a usuarios con sesión, que nunca
+    reciben la página cacheada ni validadores. Acepta vistas sync y async.
+    """
+    if iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envoltura_async(request, *args, **kwargs):
+            clave, validadores, guardada = await en_hilo_db(_leer_pagina)(request)
+            if guardada is not None:
+                return guardada
+            response = await vista(request, *args, **kwargs)
+            if clave is not None:
+                await en_hilo_db(_guardar_pagina)(clave, validadores, response)
+            return response
+        return envoltura_async
+
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        clave, validadores, guardada = _leer_pagina(request)
+        if guardada is not None:
+            return guardada
+        response = vista(request, *args, **kwargs)
+        if clave is not None:
+            _guardar_pagina(clave, validadores, response)
+        return response
+
+    return envoltura
@@ -0,0 +1,130 @@
+import time
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Carrito
+
+# Tiempo (segundos) que se conserva el resumen del carrito en cache
+RESUMEN_CARRITO_TTL = 300
+
+
+def _clave_resumen(usuario_id):
+    return f'carrito:resumen:{usuario_id}'
+
+
+def obtener_resumen_carrito(usuario_id):
+    """
+    Devuelve {'cantidad': int, 'total': Decimal} del carrito activo del usuario.
+    Se calcula con un solo agregado en la base de datos y se guarda en la cache
+    compartida: un cambio atendido por cualquier worker lo invalida para todos.
+    """
+    clave = _clave_resumen(usuario_id)
+    resumen = caches['compartida'].get(clave)
+    if resumen is None:
+        datos = Carrito.objects.filter(
+            id_usuario_id=usuario_id,
+            estado_carrito='activo'
+        ).aggregate(cantidad=Count('id_carrito'), total=Sum('subtotal_carrito'))
+        resumen = {
+            'cantidad': datos['cantidad'] or 0,
+            'total': datos['total'] or Decimal('0.00'),
+        }
+        caches['compartida'].set(clave, resumen, RESUMEN_CARRITO_TTL)
+    return resumen
+
+
+def invalidar_resumen_carrito(usuario_id):
+    """Elimina el resumen en cache; se recalcula en la siguiente lectura"""
+    caches['compartida'].delete(_clave_resumen(usuario_id))
+
+
+class ResumenCarritoPerezoso:
+    """
+    Resumen del carrito que solo consulta cache/BD la primera vez que
+    un template lo usa. Las páginas que no muestran el carrito no pagan nada.
+    """
+
+    def __init__(self, usuario_id):
+        self.usuario_id = usuario_id
+        self._resumen = None
+
+    def _cargar(self):
+        if self._resumen is None:
+            if self.usuario_id:
+                self._resumen = obtener_resumen_carrito(self.usuario_id)
+            else:
+                self._resumen = {'cantidad': 0, 'total': Decimal('0.00')}
+        return self._resumen
+
+    def cantidad(self):
+        return self._cargar()['cantidad']
+
+    def total(self):
+        return self._cargar()['total']
+
+
+def invalidar_resumenes_carrito(usuario_ids):
+    caches['compartida'].delete_many([_clave_resumen(usuario_id) for usuario_id in set(usuario_ids)])
+
+
+def _por_lotes(carritos, lote, pausa, procesar):
+    """
+    Recorre `carritos` por id_carrito ascendente (keyset, sin OFFSET) en lotes
+    de `lote` filas; `procesar(ids, filas)` aplica el cambio con una sentencia
+    corta por llave primaria. Devuelve el total de filas procesadas.
+    """
+    total = 0
+    ultimo = 0
+    while True:
+        filas = list(
+            carritos.filter(id_carrito__gt=ultimo).order_by('id_carrito').values(
+                'id_carrito', 'id_usuario', 'id_producto', 'cantidad_carrito', 'precio_unitario_carrito',
+                'estado_carrito', 'fecha_creacion_carrito', 'fecha_actualizacion_carrito',
+            )[:lote]
+        )
+        if not filas:
+            return total
+        ultimo = filas[-1]['id_carrito']
+        total += procesar([fila['id_carrito'] for fila in filas], filas)
+        if pausa:
+            time.sleep(pausa)
+
+
+def expirar_abandonados(antes_de, lote=500, pausa=0):
+    """
+    Marca como 'cancelado' los carritos activos sin cambios desde `antes_de`.
+    La fecha de actualización pasa a ser la de la cancelación, que es desde
+    donde cuenta la retención de purgar_cerrados.
+    """
+    abandonados = Carrito.objects.filter(estado_carrito='activo', fecha_actualizacion_carrito__lt=antes_de)
+
+    def cancelar(ids, filas):
+        # Se repite la condición: el carrito pudo cambiar entre el SELECT y el UPDATE
+        cancelados = abandonados.filter(id_carrito__in=ids).update(
+            estado_carrito='cancelado', fecha_actualizacion_carrito=timezone.now()
+        )
+        invalidar_resumenes_carrito(fila['id_usuario'] for fila in filas)
+        return cancelados
+
+    return _por_lotes(abandonados, lote, pausa, cancelar)
+
+
+def purgar_cerrados(antes_de, lote=500, pausa=0, archivar=None):
+    """
+    Borra los carritos convertidos o cancelados antes de `antes_de` (los
+    convertidos ya están copiados en T_Pedido). Si se indica, `archivar(filas)`
+    recibe cada lote antes del DELETE.
+    """
+    cerrados = Carrito.objects.filter(
+        estado_carrito__in=['convertido', 'cancelado'], fecha_actualizacion_carrito__lt=antes_de
+    )
+
+    def borrar(ids, filas):
+        if archivar:
+            archivar(filas)
+        return cerrados.filter(id_carrito__in=ids).delete()[0]
+
+    return _por_lotes(cerrados, lote, pausa, borrar)
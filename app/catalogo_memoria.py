@@ -0,0 +1,359 @@
+"""
+Instantánea en memoria de los productos activos, una por proceso (worker).
+
+El catálogo cambia pocas veces por hora y se lee miles de veces por minuto: el
+listado de home, "cargar más", las facetas (ver facetas.py) y el resumen de
+categorías salen de esta copia compacta (registros con __slots__ más índices
+por id, categoría y precio) sin consultar la BD.
+
+Sincronización (a lo sumo cada CATALOGO_MEMORIA['REVISION'] segundos, dentro
+del request que la necesita; la primera carga también):
+- Se leen solo las filas con fecha_actualizacion_producto posterior a la marca
+  (con un margen por transacciones que confirman tarde); con INDICE_CATALOGO
+  es una búsqueda en el índice que casi siempre no devuelve filas. Así se ven
+  también los cambios hechos por otros workers.
+- Si la versión del catálogo (compartida entre workers, ver cache_catalogo)
+  cambió, se sincroniza sin esperar la revisión y se compara además el COUNT
+  de activos para detectar borrados; si no coincide, se leen los ids activos
+  y se quitan los que faltan.
+- Cada RESINCRONIZACION segundos (o si aparecen activos que la fecha no
+  trajo) se recarga todo en un hilo de fondo, sin que ningún request espere;
+  así se ven también los cambios hechos sin señales (UPDATE o DELETE masivos).
+
+Cada sincronización arma una instantánea nueva y la reemplaza de una vez; los
+hilos que están leyendo la anterior nunca la ven a medio cambiar. Con pocos
+cambios la nueva corrige las listas y los bitmaps de facetas de la anterior
+en vez de volver a ordenar todo. Si no hay una
+instantánea al día (todavía cargando, otro hilo sincronizando tras una
+escritura, o la BD falló durante más de MAXIMA_ANTIGUEDAD segundos) vigente()
+devuelve None y las vistas consultan la BD como antes.
+
+El checkout también mueve fecha_actualizacion_producto y la versión del
+catálogo al descontar stock, así que el filtro "con stock" se entera enseguida.
+"""
+import bisect
+import copy
+import datetime
+import logging
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+from .cache_catalogo import version_catalogo
+from .historial_pedidos import IndiceRecomendado
+from .models import Producto
+
+logger = logging.getLogger(__name__)
+
+CATALOGO_MEMORIA_DEFECTO = {
+    'ACTIVO': True,
+    'REVISION': 2,
+    'RESINCRONIZACION': 300,
+    'MAXIMA_ANTIGUEDAD': 60,
+}
+# Las filas confirmadas tarde pueden tener una fecha anterior a la marca
+MARGEN_MARCA = datetime.timedelta(seconds=60)
+# Cambios que se aplican sobre los índices de la instantánea anterior; con más
+# (y más de 1/8 del catálogo) se vuelven a armar
+PARCHE_MAXIMO = 64
+
+# Lo revisa verificar_tablas_django (crear_indice_catalogo.sql)
+INDICE_CATALOGO = IndiceRecomendado(
+    Producto, 'IX_T_Producto_fecha_actualizacion', ('fecha_actualizacion_producto',), ()
+)
+
+# Lo que usan las tarjetas del catálogo (app/includes/productos_cards.html)
+CAMPOS = (
+    'id_producto', 'nombre_producto', 'descripcion_producto', 'categoria_producto',
+    'precio_producto', 'stock_producto', 'imagen_producto', 'fecha_actualizacion_producto',
+)
+
+
+def config():
+    return {**CATALOGO_MEMORIA_DEFECTO, **getattr(settings, 'CATALOGO_MEMORIA', {})}
+
+
+class ProductoCompacto:
+    """Producto de solo lectura con los atributos de CAMPOS"""
+    __slots__ = CAMPOS
+
+    def __init__(self, id_producto, nombre_producto, descripcion_producto, categoria_producto,
+                 precio_producto, stock_producto, imagen_producto, fecha_actualizacion_producto):
+        self.id_producto = id_producto
+        self.nombre_producto = nombre_producto
+        self.descripcion_producto = descripcion_producto
+        # Pocas categorías distintas: una sola copia de cada texto
+        self.categoria_producto = sys.intern(categoria_producto) if categoria_producto else categoria_producto
+        self.precio_producto = precio_producto
+        self.stock_producto = stock_producto
+        self.imagen_producto = imagen_producto
+        self.fecha_actualizacion_producto = fecha_actualizacion_producto
+
+
+class Instantanea:
+    """
+    Productos activos por id e índices derivados. No cambia después de creada:
+    sincronizar devuelve otra instantánea, que comparte lo que no cambió.
+    """
+
+    def __init__(self, productos, version, marca, completa):
+        self.productos = productos
+        self.version = version
+        # Mayor fecha_actualizacion_producto vista
+        self.marca = marca
+        # time.monotonic() de la última recarga completa y de la última sincronización
+        self.completa = completa
+        self.sincronizada = time.monotonic()
+
+        self.ids = sorted(productos)
+        self.por_categoria = {}
+        for id_producto in self.ids:
+            self.por_categoria.setdefault(productos[id_producto].categoria_producto, []).append(id_producto)
+        # Orden por (precio, id), para ordenar por precio sin volver a ordenar en cada request
+        self.por_precio = sorted(self.ids, key=lambda id_producto: (productos[id_producto].precio_producto, id_producto))
+        # Bitmaps de facetas.IndiceFacetas, armados en el primer uso
+        self.facetas = None
+
+    @classmethod
+    def desde_filas(cls, filas, version=None):
+        """Instantánea completa a partir de tuplas con los valores de CAMPOS (+ activo)"""
+        productos = {}
+        marca = None
+        for *valores, activo in filas:
+            producto = ProductoCompacto(*valores)
+            marca = _mayor(marca, producto.fecha_actualizacion_producto)
+            if activo:
+                productos[producto.id_producto] = producto
+        return cls(productos, version, marca, time.monotonic())
+
+    def _sin_cambios(self, producto, activo):
+        actual = self.productos.get(producto.id_producto)
+        if actual is None:
+            return not activo
+        return activo and actual.fecha_actualizacion_producto == producto.fecha_actualizacion_producto
+
+    def con_cambios(self, filas, version):
+        """
+        Nueva instantánea con las filas aplicadas (las inactivas se quitan). Si
+        ninguna cambió (el margen de la marca relee filas ya vistas) comparte
+        todo con esta.
+        """
+        productos = None
+        cambiados = []
+        marca = self.marca
+        for *valores, activo in filas:
+            producto = ProductoCompacto(*valores)
+            marca = _mayor(marca, producto.fecha_actualizacion_producto)
+            if self._sin_cambios(producto, activo):
+                continue
+            if productos is None:
+                productos = dict(self.productos)
+            if activo:
+                productos[producto.id_producto] = producto
+            else:
+                productos.pop(producto.id_producto, None)
+            cambiados.append(producto.id_producto)
+        if productos is None:
+            return self._copia(version=version, marca=marca)
+        return self._aplicar(productos, list(dict.fromkeys(cambiados)), version, marca)
+
+    def sin_productos(self, ids):
+        """Nueva instantánea sin `ids` (borrados de T_Producto, que no dejan filas que leer)"""
+        quitar = set(ids) & self.productos.keys()
+        if not quitar:
+            return self._copia()
+        productos = {
+            id_producto: producto for id_producto, producto in self.productos.items() if id_producto not in quitar
+        }
+        return self._aplicar(productos, sorted(quitar), self.version, self.marca)
+
+    def categorias(self):
+        """Como categorias.obtener_categorias(): [(categoria, activos)] sin vacías"""
+        return sorted((categoria, len(ids)) for categoria, ids in self.por_categoria.items() if categoria)
+
+    def _copia(self, **atributos):
+        copia = copy.copy(self)
+        copia.__dict__.update(atributos, sincronizada=time.monotonic())
+        return copia
+
+    def _aplicar(self, productos, cambiados, version, marca):
+        # Con muchos cambios (importaciones, UPDATE masivos) es más barato ordenar de nuevo
+        if len(cambiados) > max(PARCHE_MAXIMO, len(self.productos) // 8):
+            return Instantanea(productos, version, marca, self.completa)
+
+        ids = list(self.ids)
+        por_precio = list(self.por_precio)
+        por_categoria = dict(self.por_categoria)
+        copiadas = set()
+        movimientos = []
+
+        def de_categoria(categoria):
+            # Solo se copian las listas de las categorías que cambian
+            if categoria not in copiadas:
+                copiadas.add(categoria)
+                por_categoria[categoria] = list(por_categoria.get(categoria, ()))
+            return por_categoria[categoria]
+
+        # Primero se quitan las versiones anteriores (con los precios de esta instantánea)
+        # y después se agregan las nuevas: en medio, las listas solo tienen productos sin
+        # cambios, que valen lo mismo en las dos
+        anteriores = self.productos
+        for id_producto in cambiados:
+            anterior = anteriores.get(id_producto)
+            if anterior is None:
+                continue
+            posicion_id = bisect.bisect_left(ids, id_producto)
+            del ids[posicion_id]
+            posicion_precio = bisect.bisect_left(
+                por_precio, (anterior.precio_producto, id_producto), key=lambda i: (anteriores[i].precio_producto, i)
+            )
+            del por_precio[posicion_precio]
+            categoria = de_categoria(anterior.categoria_producto)
+            del categoria[bisect.bisect_left(categoria, id_producto)]
+            movimientos.append((anterior, False, posicion_id, posicion_precio))
+        for id_producto in cambiados:
+            producto = productos.get(id_producto)
+            if producto is None:
+                continue
+            posicion_id = bisect.bisect_left(ids, id_producto)
+            ids.insert(posicion_id, id_producto)
+            posicion_precio = bisect.bisect_left(
+                por_precio, (producto.precio_producto, id_producto), key=lambda i: (productos[i].precio_producto, i)
+            )
+            por_precio.insert(posicion_precio, id_producto)
+            bisect.insort(de_categoria(producto.categoria_producto), id_producto)
+            movimientos.append((producto, True, posicion_id, posicion_precio))
+        for categoria in copiadas:
+            if not por_categoria[categoria]:
+                del por_categoria[categoria]
+
+        nueva = self._copia(
+            productos=productos, version=version, marca=marca,
+            ids=ids, por_precio=por_precio, por_categoria=por_categoria, facetas=None,
+        )
+        if self.facetas is not None:
+            nueva.facetas = self.facetas.con_cambios(nueva, movimientos)
+        return nueva
+
+
+def _mayor(marca, fecha):
+    if fecha is None:
+        return marca
+    return fecha if marca is None or fecha > marca else marca
+
+
+def _filas(productos):
+    return productos.values_list(*CAMPOS, 'activo_producto').iterator(chunk_size=2000)
+
+
+def _cargar(version):
+    return Instantanea.desde_filas(_filas(Producto.objects.all()), version)
+
+
+def _sincronizar(actual, version, cfg):
+    """Instantánea al día a partir de `actual` (o None)"""
+    if actual is None:
+        return _cargar(version)
+    if time.monotonic() - actual.completa >= cfg['RESINCRONIZACION']:
+        # Mientras se recarga en otro hilo, esta sigue al día con los cambios por fecha
+        _recargar_en_segundo_plano()
+
+    hubo_escritura = actual.version != version
+    cambiados = Producto.objects.all()
+    if actual.marca is not None:
+        cambiados = cambiados.filter(fecha_actualizacion_producto__gte=actual.marca - MARGEN_MARCA)
+    nueva = actual.con_cambios(_filas(cambiados), version)
+    # Los borrados no dejan filas que leer: si no coincide el total, se comparan los ids
+    activos = Producto.objects.filter(activo_producto=True)
+    if hubo_escritura and activos.count() != len(nueva.productos):
+        ids = set(activos.values_list('id_producto', flat=True).iterator(chunk_size=2000))
+        if not ids <= nueva.productos.keys():
+            # Activos que no aparecieron por fecha (UPDATE sin fecha_actualizacion_producto)
+            _recargar_en_segundo_plano()
+        nueva = nueva.sin_productos(nueva.productos.keys() - ids)
+    return nueva
+
+
+_instantanea = None
+_revisada = 0.0
+_lock = threading.Lock()
+# Hilo de la recarga completa en curso y contador de descartar(): una recarga que
+# empezó antes de descartar() no instala su resultado
+_recarga = None
+_generacion = 0
+
+
+def vigente():
+    """La instantánea del proceso si está al día, o None (usar la BD)"""
+    global _instantanea, _revisada
+    cfg = config()
+    if not cfg['ACTIVO']:
+        return None
+
+    actual = _instantanea
+    version = version_catalogo()
+    # Una escritura (en cualquier worker) se aplica enseguida, sin esperar la revisión
+    desactualizada = actual is not None and actual.version != version
+    if desactualizada or time.monotonic() - _revisada >= cfg['REVISION']:
+        if _lock.acquire(blocking=False):
+            try:
+                _revisada = time.monotonic()
+                actual = _instantanea = _sincronizar(actual, version, cfg)
+                desactualizada = False
+            except DatabaseError:
+                logger.warning('No se pudo sincronizar el catálogo en memoria', exc_info=True)
+            finally:
+                _lock.release()
+        if desactualizada:
+            # Otro hilo está aplicando la escritura (o la BD falló): esta copia ya no sirve
+            return None
+
+    if actual is None or time.monotonic() - actual.sincronizada > cfg['MAXIMA_ANTIGUEDAD']:
+        return None
+    return actual
+
+
+def recargar():
+    """
+    Recarga completa, fuera del request: la lee entera de la BD y la instala de
+    una vez. Los cambios que confirmen mientras tanto los toma la próxima
+    sincronización (la versión se lee antes de cargar).
+    """
+    global _instantanea, _revisada
+    generacion = _generacion
+    nueva = _cargar(version_catalogo())
+    with _lock:
+        if generacion == _generacion:
+            _instantanea = nueva
+            _revisada = time.monotonic()
+
+
+def _recargar_hilo():
+    try:
+        recargar()
+    except DatabaseError:
+        logger.warning('No se pudo recargar el catálogo en memoria', exc_info=True)
+    finally:
+        # La conexión es de este hilo: no queda abierta (ni ocupando el pool)
+        connection.close()
+
+
+def _recargar_en_segundo_plano():
+    """Arranca recargar() en un hilo, si no hay una recarga en curso (se llama con _lock tomado)"""
+    global _recarga
+    if _recarga is not None and _recarga.is_alive():
+        return
+    _recarga = threading.Thread(target=_recargar_hilo, name='catalogo-memoria', daemon=True)
+    _recarga.start()
+
+
+def descartar():
+    """Olvida la instantánea del proceso (se recarga en el próximo uso)"""
+    global _instantanea, _revisada, _generacion
+    with _lock:
+        _instantanea = None
+        _revisada = 0.0
+        _generacion += 1
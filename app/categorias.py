@@ -0,0 +1,108 @@
+"""
+Resumen de categorías con el número de productos activos de cada una.
+
+Se guarda en la cache compartida (la ven todos los workers) y se mantiene con
+las señales de Producto (ver app/signals.py): cada alta, edición o baja ajusta
+los contadores en lugar de volver a hacer un GROUP BY / DISTINCT sobre
+T_Producto en cada vista.
+
+Cada categoría tiene su propio contador y se ajusta con cache.incr/decr, que
+son atómicos en memcached: dos workers que guardan productos a la vez no se
+pisan el resumen. La lista de categorías va en otra llave; una categoría
+nueva, un contador que falta o uno negativo invalidan el resumen completo,
+que se recalcula en la próxima lectura.
+"""
+import hashlib
+
+from django.core.cache import caches
+from django.db.models import Count
+
+from .models import Producto
+
+CLAVE_CATEGORIAS = 'catalogo:categorias'
+
+# El resumen se recalcula al menos una vez por hora aunque no haya cambios,
+# para corregir cualquier desfase (p. ej. un UPDATE masivo que no dispara señales)
+CATEGORIAS_TTL = 60 * 60
+
+
+def clave_conteo(categoria):
+    # Las claves de memcached no admiten espacios ni caracteres arbitrarios
+    return f'{CLAVE_CATEGORIAS}:{hashlib.sha256(categoria.encode()).hexdigest()[:32]}'
+
+
+def _calcular_conteos():
+    filas = (
+        Producto.objects.filter(activo_producto=True)
+        .exclude(categoria_producto__isnull=True)
+        .exclude(categoria_producto='')
+        .values('categoria_producto')
+        .annotate(cantidad=Count('id_producto'))
+    )
+    return {fila['categoria_producto']: fila['cantidad'] for fila in filas}
+
+
+def obtener_conteos():
+    """Diccionario {categoria: productos activos}, desde cache si es posible"""
+    cache = caches['compartida']
+    nombres = cache.get(CLAVE_CATEGORIAS)
+    if nombres is not None:
+        claves = {categoria: clave_conteo(categoria) for categoria in nombres}
+        valores = cache.get_many(claves.values())
+        if len(valores) == len(claves):
+            return {categoria: valores[clave] for categoria, clave in claves.items()}
+
+    conteos = _calcular_conteos()
+    cache.set_many({clave_conteo(categoria): cantidad for categoria, cantidad in conteos.items()}, CATEGORIAS_TTL)
+    # La lista va después: nunca apunta a contadores que todavía no existen
+    cache.set(CLAVE_CATEGORIAS, sorted(conteos), CATEGORIAS_TTL)
+    return conteos
+
+
+def obtener_categorias():
+    """Lista ordenada de (categoria, cantidad) sin las categorías vacías"""
+    return sorted(
+        (categoria, cantidad)
+        for categoria, cantidad in obtener_conteos().items()
+        if cantidad > 0
+    )
+
+
+def invalidar_categorias():
+    caches['compartida'].delete(CLAVE_CATEGORIAS)
+
+
+def ajustar_categorias(anterior, nuevo):
+    """
+    Aplica el cambio de un producto al resumen. `anterior` y `nuevo` son
+    pares (categoria, activo) o None si el producto no existía / ya no existe.
+    """
+    if anterior == nuevo:
+        return
+
+    cache = caches['compartida']
+    nombres = cache.get(CLAVE_CATEGORIAS)
+    if nombres is None:
+        # No hay resumen en cache: se calculará completo en la próxima lectura
+        return
+
+    for estado, delta in ((anterior, -1), (nuevo, 1)):
+        if estado is None:
+            continue
+        categoria, activo = estado
+        if not activo or not categoria:
+            continue
+        if categoria not in nombres:
+            # Categoría nueva: no está en la lista de categorías
+            invalidar_categorias()
+            return
+        try:
+            cantidad = cache.incr(clave_conteo(categoria), delta)
+        except ValueError:
+            # El contador expiró o se desalojó antes que la lista
+            invalidar_categorias()
+            return
+        if cantidad < 0:
+            # El resumen se desfasó; mejor recalcularlo
+            invalidar_categorias()
+            return
@@ -0,0 +1,50 @@
+"""
+Comprobaciones de `manage.py check` (también corren con runserver y migrate).
+"""
+import ipaddress
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+from .limites import LIMITE_INTENTOS_DEFECTO
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def caches_compartidas():
+    """Alias de cache que todos los workers deben ver igual"""
+    limites = {**LIMITE_INTENTOS_DEFECTO, **getattr(settings, 'LIMITE_INTENTOS', {})}
+    return list(dict.fromkeys(['compartida', settings.SESSION_CACHE_ALIAS, limites['CACHE']]))
+
+
+@register()
+def revisar_caches_compartidas(app_configs, **kwargs):
+    """Con DEBUG=False (varios workers) las caches compartidas no pueden ser locales al proceso"""
+    if settings.DEBUG:
+        return []
+    return [
+        Error(
+            f"CACHES['{alias}'] es LocMemCache: cada worker tendría su propia copia",
+            hint='Usar archivo o memcached en TIENDA_CACHE_COMPARTIDA / TIENDA_CACHE_SESIONES (ver CACHES en ec/settings.py)',
+            id='app.E001',
+        )
+        for alias in caches_compartidas()
+        if settings.CACHES.get(alias, {}).get('BACKEND') == LOCMEM
+    ]
+
+
+@register()
+def revisar_proxies_confiables(app_configs, **kwargs):
+    """Las entradas de PROXIES_CONFIABLES tienen que ser IPs o redes válidas"""
+    limites = {**LIMITE_INTENTOS_DEFECTO, **getattr(settings, 'LIMITE_INTENTOS', {})}
+    errores = []
+    for red in limites['PROXIES_CONFIABLES']:
+        try:
+            ipaddress.ip_network(red, strict=False)
+        except ValueError:
+            errores.append(Error(
+                f"LIMITE_INTENTOS['PROXIES_CONFIABLES'] tiene una IP o red inválida: {red!r}",
+                hint='Usar direcciones como 10.0.0.5 o redes CIDR como 10.0.0.0/24 (ver TIENDA_PROXIES_CONFIABLES)',
+                id='app.E002',
+            ))
+    return errores
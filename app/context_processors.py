@@ -1,29 +1,20 @@
-from .models import Carrito, Usuario
+from .carrito import ResumenCarritoPerezoso
 
 def cart_context(request):
     """
-    Context processor para agregar información del carrito a todos los templates
+    Context processor para agregar información del carrito a todos los templates.
+    Los valores son perezosos: el template los evalúa solo si los usa y el
+    resumen sale de cache (ver app/carrito.py).
     """
-    cart_count = 0
-    cart_total = 0
-    
+    usuario_id = None
+
     # Si hay un usuario autenticado (usando sesión)
-    if hasattr(request, 'session') and 'usuario_id' in request.session:
+    if hasattr(request, 'session'):
         usuario_id = request.session.get('usuario_id')
-        try:
-            usuario = Usuario.objects.get(id_usuario=usuario_id)
-            carritos = Carrito.objects.filter(
-                id_usuario=usuario,
-                estado_carrito='activo'
-            )
-            cart_count = carritos.count()
-            cart_total = sum(float(carrito.subtotal_carrito) for carrito in carritos)
-        except Usuario.DoesNotExist:
-            pass
-    
-    return {
-        'cart_count': cart_count,
-        'cart_total': cart_total,
-    }
 
+    resumen = ResumenCarritoPerezoso(usuario_id)
 
+    return {
+        'cart_count': resumen.cantidad,
+        'cart_total': resumen.total,
+    }
@@ -0,0 +1,78 @@
+"""
+Hash de contraseñas (login y registro) en un pool de hilos acotado.
+
+Los hashers de Django son caros a propósito. Ejecutados en el hilo del request,
+una ráfaga de logins ocupa todos los hilos del worker y las páginas del
+catálogo esperan detrás. Aquí cada proceso tiene CONTRASENAS['HILOS'] hilos
+para hashear y admite a lo sumo CONTRASENAS['COLA'] trabajos en espera; si
+no hay lugar se lanza PoolContrasenasLleno de inmediato (la vista responde
+429) en vez de encolar sin límite. PBKDF2, Argon2 y bcrypt liberan el GIL
+mientras calculan, así que el resto de los hilos sigue atendiendo.
+
+verificar_contrasena además devuelve el hash nuevo cuando el del usuario se
+creó con otro hasher o con otros parámetros (rehash transparente).
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+CONTRASENAS_DEFECTO = {'HILOS': 2, 'COLA': 8}
+
+
+class PoolContrasenasLleno(Exception):
+    """No hay lugar en la cola del pool de hash; reintentar en unos segundos"""
+
+
+class _PoolHash:
+    def __init__(self, hilos, cola):
+        self._executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='tienda-hash')
+        # Trabajos en ejecución + en espera
+        self._cupos = threading.BoundedSemaphore(hilos + cola)
+
+    def ejecutar(self, funcion, *args):
+        if not self._cupos.acquire(blocking=False):
+            raise PoolContrasenasLleno()
+        try:
+            futuro = self._executor.submit(funcion, *args)
+        except BaseException:
+            self._cupos.release()
+            raise
+        futuro.add_done_callback(lambda _: self._cupos.release())
+        return futuro.result()
+
+
+_pool = None
+_lock = threading.Lock()
+
+
+def pool_hash():
+    """Pool compartido por todos los hilos del proceso"""
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                config = {**CONTRASENAS_DEFECTO, **getattr(settings, 'CONTRASENAS', {})}
+                _pool = _PoolHash(config['HILOS'], config['COLA'])
+    return _pool
+
+
+def _verificar(password, encoded):
+    nuevo = []
+    # check_password llama al setter solo si la contraseña es correcta y el hash está desactualizado
+    valida = check_password(password, encoded, setter=lambda raw: nuevo.append(make_password(raw)))
+    return valida, nuevo[0] if nuevo else None
+
+
+def verificar_contrasena(password, encoded):
+    """
+    (valida, hash_nuevo): hash_nuevo no es None cuando hay que guardar el hash
+    con el hasher y los parámetros actuales. Lanza PoolContrasenasLleno.
+    """
+    return pool_hash().ejecutar(_verificar, password, encoded)
+
+
+def hashear_contrasena(password):
+    """make_password en el pool. Lanza PoolContrasenasLleno."""
+    return pool_hash().ejecutar(make_password, password)
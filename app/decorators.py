@@ -0,0 +1,45 @@
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib import messages
+from django.shortcuts import redirect
+
+from .async_db import en_hilo_db
+
+
+def _rechazo(request, mensaje, redirigir_a):
+    """Redirección si no hay un usuario válido en la sesión, o None"""
+    if not request.session.get('usuario_id'):
+        messages.info(request, mensaje)
+        return redirect(redirigir_a)
+    if not request.usuario:
+        messages.error(request, 'Usuario no encontrado')
+        return redirect('home')
+    return None
+
+
+def usuario_requerido(mensaje='Debes iniciar sesión', redirigir_a='home'):
+    """
+    Exige un usuario con sesión. Si no hay sesión muestra `mensaje` y redirige a
+    `redirigir_a`; si el usuario de la sesión ya no existe redirige al inicio.
+    La vista puede usar request.usuario sin volver a consultarlo; en vistas
+    async la sesión y el usuario se cargan en un hilo de BD.
+    """
+    def decorador(vista):
+        if iscoroutinefunction(vista):
+            @wraps(vista)
+            async def envoltura_async(request, *args, **kwargs):
+                respuesta = await en_hilo_db(_rechazo)(request, mensaje, redirigir_a)
+                if respuesta is not None:
+                    return respuesta
+                return await vista(request, *args, **kwargs)
+            return envoltura_async
+
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            respuesta = _rechazo(request, mensaje, redirigir_a)
+            if respuesta is not None:
+                return respuesta
+            return vista(request, *args, **kwargs)
+        return envoltura
+    return decorador
@@ -0,0 +1,250 @@
+"""
+Estáticos del sitio: iconos, nombres con hash, precompresión y reporte de peso.
+
+- Iconos: en lugar del Font Awesome completo (1.2 MB de JS o la hoja del CDN
+  con sus fuentes) se genera app/css/iconos.css solo con los iconos que usan
+  las plantillas, cada uno como SVG en data URI aplicado con mask-image. La
+  fuente de los trazados es assets/fontawesome/all.min.js, que no se publica.
+- AlmacenEstaticos: ManifestStaticFilesStorage (nombres con hash del contenido)
+  que además escribe variantes .gz y, si está instalado el paquete brotli, .br
+  de cada archivo de texto. El servidor web las entrega tal cual (nginx:
+  gzip_static on; brotli_static on;) y, como el nombre cambia con el contenido,
+  puede servir /static/ con Cache-Control: public, max-age=31536000, immutable.
+- reporte_paginas: bytes de estáticos que descarga cada página (original, gzip
+  y brotli), siguiendo {% extends %} e {% include %}.
+
+Todo se ejecuta con: python manage.py construir_estaticos
+"""
+import gzip
+import json
+import re
+from collections import namedtuple
+from pathlib import Path
+from urllib.parse import quote
+
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, StaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # dependencia opcional: sin ella solo se generan .gz
+    brotli = None
+
+APP_DIR = Path(__file__).resolve().parent
+PLANTILLAS_DIR = APP_DIR / 'templates'
+FUENTE_ICONOS = APP_DIR / 'assets' / 'fontawesome' / 'all.min.js'
+CSS_ICONOS = APP_DIR / 'static' / 'app' / 'css' / 'iconos.css'
+
+EXTENSIONES_COMPRIMIBLES = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map', '.xml')
+# Por debajo de este tamaño la variante comprimida no compensa la petición de más
+TAMANO_MINIMO_COMPRESION = 256
+
+
+def comprimir_gzip(datos):
+    # mtime=0: la misma entrada produce siempre los mismos bytes
+    return gzip.compress(datos, compresslevel=9, mtime=0)
+
+
+def comprimir_brotli(datos):
+    return brotli.compress(datos, quality=11) if brotli else None
+
+
+# --- Iconos -----------------------------------------------------------------
+
+# class="fas fa-plus", class="btn fab fa-facebook"
+_ICONO_PLANTILLA = re.compile(r'\b(fa[srb])\s+fa-([a-z0-9-]+)\b')
+# class="fas fa-{{ icono }}": no se puede resolver sin ejecutar la plantilla
+_ICONO_DINAMICO = re.compile(r'\bfa-(?:\{\{|\{%)')
+
+# Los packs del JS: var f={...};...M("fas",f)
+_PACK = re.compile(r'var f=\{(.*?)\};!function\(c\)\{try\{c\(\)\}catch\(c\)\{if\(!e\)throw c\}\}\(function\(\)\{M\("(fa[srb])",f\)\}\)', re.S)
+# "map-marker-alt":[384,512,[],"f3c5","M172..."] o plus:[448,512,[],"f067","M416..."]
+_ICONO_PACK = re.compile(r'(?:"([a-z0-9-]+)"|([a-z0-9_]+)):\[(\d+),(\d+),\[[^\]]*\],"[0-9a-f]+","([^"]*)"\]')
+
+Icono = namedtuple('Icono', ['ancho', 'alto', 'trazado'])
+
+
+def plantillas(directorio=PLANTILLAS_DIR):
+    return sorted(directorio.rglob('*.html'))
+
+
+def iconos_usados(directorio=PLANTILLAS_DIR):
+    """
+    ({(prefijo, nombre)}, [plantillas con clases dinámicas]). Las clases armadas
+    con variables no se pueden detectar: hay que escribirlas completas.
+    """
+    usados = set()
+    dinamicos = []
+    for ruta in plantillas(directorio):
+        texto = ruta.read_text(encoding='utf-8')
+        usados.update(_ICONO_PLANTILLA.findall(texto))
+        if _ICONO_DINAMICO.search(texto):
+            dinamicos.append(str(ruta.relative_to(directorio)))
+    return usados, dinamicos
+
+
+def leer_iconos(fuente=FUENTE_ICONOS):
+    """{prefijo: {nombre: Icono}} desde el JS de Font Awesome"""
+    texto = fuente.read_text(encoding='utf-8')
+    packs = {}
+    for cuerpo, prefijo in _PACK.findall(texto):
+        packs[prefijo] = {
+            entre_comillas or simple: Icono(int(ancho), int(alto), trazado)
+            for entre_comillas, simple, ancho, alto, trazado in _ICONO_PACK.findall(cuerpo)
+        }
+    return packs
+
+
+def _data_uri(icono):
+    svg = (
+        f"<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 {icono.ancho} {icono.alto}'>"
+        f"<path d='{icono.trazado}'/></svg>"
+    )
+    return 'data:image/svg+xml,' + quote(svg, safe=" '/=:.,-")
+
+
+_CSS_BASE = """\
+/* Generado por: python manage.py construir_estaticos. No editar a mano. */
+/* Iconos: Font Awesome Free 5.15.1 (CC BY 4.0) https://fontawesome.com/license/free */
+.fas,.far,.fab{display:inline-block;width:1em;height:1em;vertical-align:-.125em;background-color:currentColor;\
+-webkit-mask:var(--icono) center/contain no-repeat;mask:var(--icono) center/contain no-repeat}
+"""
+
+
+def generar_css_iconos(usados, packs):
+    """(css, faltantes): faltantes son los (prefijo, nombre) que no existen en la fuente"""
+    reglas = []
+    faltantes = []
+    for prefijo, nombre in sorted(usados):
+        icono = packs.get(prefijo, {}).get(nombre)
+        if icono is None:
+            faltantes.append((prefijo, nombre))
+            continue
+        ancho = f'{icono.ancho / icono.alto:.4f}'.rstrip('0').rstrip('.')
+        reglas.append(f'.{prefijo}.fa-{nombre}{{width:{ancho}em;--icono:url("{_data_uri(icono)}")}}')
+    return _CSS_BASE + '\n'.join(reglas) + '\n', faltantes
+
+
+# --- Almacenamiento -----------------------------------------------------------
+
+class AlmacenEstaticos(ManifestStaticFilesStorage):
+    """
+    Nombres con hash + variantes .gz/.br escritas junto a cada archivo en
+    collectstatic. Sin manifiesto (desarrollo sin collectstatic) las URLs
+    usan el nombre original en vez de fallar.
+    """
+
+    def url(self, name, force=False):
+        if not self.hashed_files and not force:
+            return StaticFilesStorage.url(self, name)
+        return super().url(name, force)
+
+    def post_process(self, paths, dry_run=False, **options):
+        # post_process recorre los CSS varias veces; se comprime una vez cada nombre final
+        finales = {}
+        for nombre, nombre_hash, procesado in super().post_process(paths, dry_run, **options):
+            if nombre_hash and not isinstance(procesado, Exception):
+                finales[nombre] = nombre_hash
+            yield nombre, nombre_hash, procesado
+        if dry_run:
+            return
+        for nombre_hash in finales.values():
+            self.comprimir(nombre_hash)
+
+    def comprimir(self, nombre):
+        """Escribe nombre.gz y nombre.br si son más chicos que el original"""
+        if not nombre.endswith(EXTENSIONES_COMPRIMIBLES):
+            return
+        ruta = Path(self.path(nombre))
+        datos = ruta.read_bytes()
+        if len(datos) < TAMANO_MINIMO_COMPRESION:
+            return
+        for extension, comprimir in (('.gz', comprimir_gzip), ('.br', comprimir_brotli)):
+            comprimido = comprimir(datos)
+            if comprimido is not None and len(comprimido) < len(datos):
+                ruta.with_name(ruta.name + extension).write_bytes(comprimido)
+
+
+# --- Reporte de peso por página -------------------------------------------------
+
+_EXTENDS = re.compile(r"""\{%\s*extends\s+['"]([^'"]+)['"]\s*%\}""")
+_INCLUDE = re.compile(r"""\{%\s*include\s+['"]([^'"]+)['"]""")
+_STATIC = re.compile(r"""\{%\s*static\s+['"]([^'"]+)['"]""")
+# Recursos de otro dominio en <link href> y <script src>
+_EXTERNO = re.compile(r"""<(?:link|script)\b[^>]*?\b(?:href|src)=["'](https?:)?//([^"']+)["']""")
+
+Recurso = namedtuple('Recurso', ['ruta', 'bytes', 'gzip', 'brotli'])
+PesoPagina = namedtuple('PesoPagina', ['plantilla', 'recursos', 'externos'])
+
+
+def _referencias(nombre, vistas=None):
+    """(estáticos, externos) de la plantilla y de las que extiende o incluye"""
+    vistas = set() if vistas is None else vistas
+    if nombre in vistas:
+        return [], []
+    vistas.add(nombre)
+    ruta = PLANTILLAS_DIR / nombre
+    if not ruta.exists():
+        return [], []
+    texto = ruta.read_text(encoding='utf-8')
+    estaticos = _STATIC.findall(texto)
+    externos = ['//' + destino for _, destino in _EXTERNO.findall(texto)]
+    for otra in _EXTENDS.findall(texto) + _INCLUDE.findall(texto):
+        mas_estaticos, mas_externos = _referencias(otra, vistas)
+        estaticos += mas_estaticos
+        externos += mas_externos
+    return estaticos, externos
+
+
+def _es_pagina(ruta):
+    # Las páginas son las plantillas que extienden base.html (no includes ni la base)
+    return bool(_EXTENDS.search(ruta.read_text(encoding='utf-8')))
+
+
+def medir(ruta_estatico):
+    """Recurso con los tamaños original, gzip y brotli (None sin brotli) del estático"""
+    encontrado = finders.find(ruta_estatico)
+    if not encontrado:
+        return Recurso(ruta_estatico, None, None, None)
+    datos = Path(encontrado).read_bytes()
+    comprimible = ruta_estatico.endswith(EXTENSIONES_COMPRIMIBLES)
+    gz = len(comprimir_gzip(datos)) if comprimible else len(datos)
+    br = comprimir_brotli(datos) if comprimible else datos
+    return Recurso(ruta_estatico, len(datos), min(gz, len(datos)), None if br is None else min(len(br), len(datos)))
+
+
+def reporte_paginas():
+    """[PesoPagina] de cada plantilla de página, ordenado por nombre"""
+    medidos = {}
+    paginas = []
+    for ruta in plantillas():
+        if not _es_pagina(ruta):
+            continue
+        nombre = ruta.relative_to(PLANTILLAS_DIR).as_posix()
+        estaticos, externos = _referencias(nombre)
+        recursos = []
+        for estatico in dict.fromkeys(estaticos):
+            if estatico not in medidos:
+                medidos[estatico] = medir(estatico)
+            recursos.append(medidos[estatico])
+        paginas.append(PesoPagina(nombre, recursos, sorted(set(externos))))
+    return paginas
+
+
+def total(pagina, campo):
+    valores = [getattr(recurso, campo) for recurso in pagina.recursos]
+    return None if None in valores else sum(valores)
+
+
+def reporte_json(paginas):
+    return json.dumps([
+        {
+            'plantilla': pagina.plantilla,
+            'bytes': total(pagina, 'bytes'),
+            'gzip': total(pagina, 'gzip'),
+            'brotli': total(pagina, 'brotli'),
+            'recursos': [recurso._asdict() for recurso in pagina.recursos],
+            'externos': pagina.externos,
+        }
+        for pagina in paginas
+    ], indent=2)
@@ -0,0 +1,163 @@
+"""
+Exportación en streaming de pedidos y productos (CSV o JSONL).
+
+Las filas salen de un solo SELECT con los JOIN a usuario, dirección y producto
+(values_list, sin instanciar modelos) leído con iterator(chunk_size), así que
+la memoria no crece con el tamaño de la exportación. Lo usan las acciones del
+admin y el comando exportar.
+"""
+import csv
+import datetime
+import io
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Pedido, PedidoArchivado, Producto
+
+# Filas por lectura a la BD y por bloque escrito en la respuesta
+TAMANO_BLOQUE = 2000
+
+# (encabezado, campo para values_list); los campos con __ se resuelven con JOIN
+COLUMNAS_PEDIDO = (
+    ('id_pedido', 'id_pedido'),
+    ('fecha', 'fecha_pedido_pedido'),
+    ('estado', 'estado_pedido'),
+    ('metodo_pago', 'metodo_pago_pedido'),
+    ('referencia_transaccion', 'referencia_transaccion_pedido'),
+    ('cantidad', 'cantidad_pedido'),
+    ('precio_unitario', 'precio_unitario_pedido'),
+    ('subtotal', 'subtotal_pedido'),
+    ('descuento', 'descuento_pedido'),
+    ('monto_total', 'monto_total_pedido'),
+    ('id_usuario', 'id_usuario_id'),
+    ('nombre_usuario', 'id_usuario__nombre_usuario'),
+    ('apellido_usuario', 'id_usuario__apellido_usuario'),
+    ('email_usuario', 'id_usuario__email_usuario'),
+    ('provincia', 'id_direccion__provincia_direccion'),
+    ('canton', 'id_direccion__canton_direccion'),
+    ('distrito', 'id_direccion__distrito_direccion'),
+    ('direccion', 'id_direccion__direccion_detallada_direccion'),
+    ('id_producto', 'id_producto_id'),
+    ('codigo_producto', 'id_producto__codigo_producto'),
+    ('nombre_producto', 'id_producto__nombre_producto'),
+    ('categoria_producto', 'id_producto__categoria_producto'),
+)
+
+COLUMNAS_PRODUCTO = (
+    ('id_producto', 'id_producto'),
+    ('codigo_producto', 'codigo_producto'),
+    ('nombre_producto', 'nombre_producto'),
+    ('descripcion_producto', 'descripcion_producto'),
+    ('categoria_producto', 'categoria_producto'),
+    ('precio_producto', 'precio_producto'),
+    ('stock_producto', 'stock_producto'),
+    ('imagen_producto', 'imagen_producto'),
+    ('activo_producto', 'activo_producto'),
+    ('fecha_creacion_producto', 'fecha_creacion_producto'),
+    ('fecha_actualizacion_producto', 'fecha_actualizacion_producto'),
+)
+
+# modelo -> (columnas, campo de fecha para filtrar, orden)
+EXPORTACIONES = {
+    'pedidos': (COLUMNAS_PEDIDO, 'fecha_pedido_pedido', ('fecha_pedido_pedido', 'id_pedido')),
+    'pedidos_archivados': (COLUMNAS_PEDIDO, 'fecha_pedido_pedido', ('fecha_pedido_pedido', 'id_pedido')),
+    'productos': (COLUMNAS_PRODUCTO, 'fecha_actualizacion_producto', ('id_producto',)),
+}
+_MODELOS = {'pedidos': Pedido, 'pedidos_archivados': PedidoArchivado, 'productos': Producto}
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def _inicio_del_dia(fecha):
+    return timezone.make_aware(datetime.datetime.combine(fecha, datetime.time.min))
+
+
+def filtrar_fechas(queryset, campo, desde=None, hasta=None):
+    """
+    Filtra por rango de fechas (date) inclusivo. Compara contra el inicio del día
+    en la zona horaria local en lugar de usar __date, para aprovechar el índice.
+    """
+    if desde:
+        queryset = queryset.filter(**{f'{campo}__gte': _inicio_del_dia(desde)})
+    if hasta:
+        queryset = queryset.filter(**{f'{campo}__lt': _inicio_del_dia(hasta + datetime.timedelta(days=1))})
+    return queryset
+
+
+def filas(modelo, queryset=None, desde=None, hasta=None):
+    """Encabezados y generador de tuplas para `modelo` (una clave de EXPORTACIONES)"""
+    columnas, campo_fecha, orden = EXPORTACIONES[modelo]
+    if queryset is None:
+        queryset = _MODELOS[modelo].objects.all()
+    queryset = filtrar_fechas(queryset, campo_fecha, desde, hasta)
+    campos = [campo for _, campo in columnas]
+    encabezados = [encabezado for encabezado, _ in columnas]
+    return encabezados, queryset.order_by(*orden).values_list(*campos).iterator(chunk_size=TAMANO_BLOQUE)
+
+
+def bloques_csv(encabezados, filas_datos, tamano=TAMANO_BLOQUE):
+    """Texto CSV en bloques de `tamano` filas (un write por bloque, no por fila)"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(encabezados)
+    pendientes = 0
+    for fila in filas_datos:
+        escritor.writerow(fila)
+        pendientes += 1
+        if pendientes >= tamano:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pendientes = 0
+    yield buffer.getvalue()
+
+
+def bloques_jsonl(encabezados, filas_datos, tamano=TAMANO_BLOQUE):
+    """Un objeto JSON por línea, en bloques de `tamano` filas"""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    lineas = []
+    for fila in filas_datos:
+        lineas.append(encoder.encode(dict(zip(encabezados, fila))))
+        if len(lineas) >= tamano:
+            yield '\n'.join(lineas) + '\n'
+            lineas = []
+    if lineas:
+        yield '\n'.join(lineas) + '\n'
+
+
+def bloques(formato, encabezados, filas_datos):
+    if formato == 'csv':
+        return bloques_csv(encabezados, filas_datos)
+    if formato == 'jsonl':
+        return bloques_jsonl(encabezados, filas_datos)
+    raise ValueError(f'Formato no soportado: {formato}')
+
+
+def respuesta_exportacion(modelo, formato, queryset=None, desde=None, hasta=None):
+    """StreamingHttpResponse con la exportación como archivo adjunto"""
+    encabezados, filas_datos = filas(modelo, queryset, desde, hasta)
+    response = StreamingHttpResponse(
+        (bloque.encode('utf-8') for bloque in bloques(formato, encabezados, filas_datos)),
+        content_type=FORMATOS[formato],
+    )
+    nombre = f'{modelo}_{timezone.localdate():%Y%m%d}.{formato}'
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return response
+
+
+def acciones_exportacion(modelo):
+    """Acciones de admin (CSV y JSONL) para exportar los registros seleccionados"""
+    def exportar_csv(modeladmin, request, queryset):
+        return respuesta_exportacion(modelo, 'csv', queryset)
+    exportar_csv.short_description = 'Exportar seleccionados a CSV'
+
+    def exportar_jsonl(modeladmin, request, queryset):
+        return respuesta_exportacion(modelo, 'jsonl', queryset)
+    exportar_jsonl.short_description = 'Exportar seleccionados a JSONL'
+
+    return [exportar_csv, exportar_jsonl]
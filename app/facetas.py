@@ -0,0 +1,456 @@
+"""
+Navegación por facetas del catálogo: varias categorías, rangos de precio, solo
+con stock y orden por precio o más recientes.
+
+    /?categoria=Audio&categoria=Vídeo&precio=10000-50000&stock=1&orden=precio
+
+Los conteos salen de bitmaps armados sobre la instantánea en memoria
+(catalogo_memoria): un int de Python por categoría, por rango de precio y para
+"con stock", con un bit por producto. Filtrar es OR/AND de enteros y contar es
+int.bit_count(); no hay GROUP BY sobre T_Producto por request. Los bitmaps se
+arman una vez por instantánea, en dos órdenes de bits (por id y por precio) para
+que la página se lea recorriendo los bits en el orden pedido. Cuando la
+instantánea se sincroniza con pocos cambios, los bitmaps de la anterior se
+corrigen insertando y quitando bits (IndiceFacetas.con_cambios).
+
+El conteo de cada opción usa los filtros de las otras facetas (con "Audio"
+elegida, "Vídeo (12)" dice cuántos productos sumaría marcarla).
+
+Con búsqueda, las facetas se aplican y se cuentan sobre las coincidencias del
+índice (busqueda.buscar_coincidencias): un bitmap más que se combina con los
+de las facetas. Sin orden elegido la página sigue la relevancia.
+
+Si la instantánea no está al día, la página sale de la BD con los mismos
+filtros, orden y cursores (filtrar + ORDENES con paginar_keyset), y los
+conteos de facetas_bd: un GROUP BY por categoría con un COUNT condicional por
+opción, cada uno bajo los filtros de las otras facetas.
+"""
+import bisect
+import threading
+from collections import Counter, namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .paginacion import PaginaKeyset, codificar_cursor, decodificar_cursor
+
+# Límites entre rangos de precio, en colones: [desde, hasta)
+RANGOS_PRECIO_DEFECTO = (10000, 50000, 100000, 250000, 500000)
+
+# ?orden= -> orden de paginar_keyset (el mismo que recorre la instantánea)
+ORDENES = {
+    '': ['id_producto'],
+    'precio': ['precio_producto', 'id_producto'],
+    '-precio': ['-precio_producto', '-id_producto'],
+    'recientes': ['-id_producto'],
+}
+ETIQUETAS_ORDEN = (
+    ('', 'Destacados'),
+    ('recientes', 'Más recientes'),
+    ('precio', 'Precio: menor a mayor'),
+    ('-precio', 'Precio: mayor a menor'),
+)
+
+Rango = namedtuple('Rango', ['clave', 'desde', 'hasta', 'etiqueta'])
+Filtros = namedtuple('Filtros', ['categorias', 'rangos', 'con_stock', 'orden'])
+# Opciones del panel: [(valor, cantidad, elegida)]
+Facetas = namedtuple('Facetas', ['categorias', 'rangos', 'con_stock', 'orden', 'total'])
+
+
+def _colones(valor):
+    return f'₡{valor:,}'.replace(',', '.')
+
+
+def rangos_precio():
+    limites = sorted(getattr(settings, 'FACETAS_RANGOS_PRECIO', RANGOS_PRECIO_DEFECTO))
+    bordes = [None, *limites, None]
+    rangos = []
+    for desde, hasta in zip(bordes, bordes[1:]):
+        if desde is None:
+            etiqueta = f'Menos de {_colones(hasta)}'
+        elif hasta is None:
+            etiqueta = f'{_colones(desde)} o más'
+        else:
+            etiqueta = f'{_colones(desde)} a {_colones(hasta)}'
+        rangos.append(Rango(f'{desde or ""}-{hasta or ""}', desde, hasta, etiqueta))
+    return rangos
+
+
+def leer_filtros(params):
+    """Filtros de las facetas a partir de request.GET; los valores desconocidos se ignoran"""
+    precios = params.getlist('precio')
+    orden = params.get('orden', '')
+    return Filtros(
+        categorias=tuple(dict.fromkeys(categoria for categoria in params.getlist('categoria') if categoria)),
+        rangos=tuple(rango.clave for rango in rangos_precio() if rango.clave in precios),
+        con_stock=params.get('stock') == '1',
+        orden=orden if orden in ORDENES else '',
+    )
+
+
+def leer_cursor(cursor, orden):
+    """Valores del cursor para `orden` con sus tipos, o None si es inválido"""
+    valores = decodificar_cursor(cursor, len(ORDENES[orden]))
+    if valores is None or not isinstance(valores[-1], int):
+        return None
+    if len(valores) == 2:
+        try:
+            valores[0] = Decimal(valores[0])
+        except (InvalidOperation, TypeError, ValueError):
+            return None
+        if not valores[0].is_finite():
+            return None
+    return valores
+
+
+def _condicion_rango(rango):
+    condicion = Q()
+    if rango.desde is not None:
+        condicion &= Q(precio_producto__gte=rango.desde)
+    if rango.hasta is not None:
+        condicion &= Q(precio_producto__lt=rango.hasta)
+    return condicion
+
+
+def _condiciones(filtros):
+    """(categorías, rangos, stock): la condición de cada faceta por separado; Q() si no filtra"""
+    categorias = Q(categoria_producto__in=filtros.categorias) if filtros.categorias else Q()
+    rangos = Q()
+    for rango in rangos_precio():
+        if rango.clave in filtros.rangos:
+            rangos |= _condicion_rango(rango)
+    stock = Q(stock_producto__gt=0) if filtros.con_stock else Q()
+    return categorias, rangos, stock
+
+
+def filtrar(productos, filtros):
+    """Aplica los filtros a un queryset de Producto (camino por BD)"""
+    categorias, rangos, stock = _condiciones(filtros)
+    return productos.filter(categorias & rangos & stock)
+
+
+def _cursor_relevancia(cursor):
+    """(puntaje, id) del cursor de búsqueda, o None si es inválido"""
+    valores = decodificar_cursor(cursor, 2)
+    if valores is None or not isinstance(valores[0], (int, float)) or not isinstance(valores[1], int):
+        return None
+    return tuple(valores)
+
+
+def _ids_relevancia(coincidencias, incluido, cursor, tamano):
+    """
+    (ids, siguiente_cursor, hay_mas) de la página de `coincidencias` [(id, puntaje)]
+    que cumplen `incluido`, en su orden y después de `cursor` (el de buscar_productos).
+    """
+    despues_de = _cursor_relevancia(cursor)
+    elegidas = []
+    for id_producto, puntaje in coincidencias:
+        if despues_de is not None and (puntaje, id_producto) <= despues_de:
+            continue
+        if incluido(id_producto):
+            elegidas.append((id_producto, puntaje))
+            if len(elegidas) > tamano:
+                break
+    hay_mas = len(elegidas) > tamano
+    elegidas = elegidas[:tamano]
+    siguiente_cursor = None
+    if hay_mas:
+        ultimo_id, ultimo_puntaje = elegidas[-1]
+        siguiente_cursor = codificar_cursor([ultimo_puntaje, ultimo_id])
+    return [id_producto for id_producto, _ in elegidas], siguiente_cursor, hay_mas
+
+
+def pagina_relevancia(productos, coincidencias, cursor=None, tamano=24):
+    """Página por relevancia de las `coincidencias` que están en el queryset `productos` (camino por BD)"""
+    validos = set(productos.values_list('id_producto', flat=True))
+    ids, siguiente_cursor, hay_mas = _ids_relevancia(coincidencias, validos.__contains__, cursor, tamano)
+    por_id = productos.in_bulk(ids)
+    return PaginaKeyset([por_id[i] for i in ids if i in por_id], siguiente_cursor, hay_mas)
+
+
+# --- Bitmaps sobre la instantánea ---------------------------------------------------
+
+def _bitmap(posiciones, cantidad):
+    # Armar el int de una vez: con |= (1 << i) cada paso copiaría el entero entero
+    datos = bytearray((cantidad + 7) // 8)
+    for posicion in posiciones:
+        datos[posicion >> 3] |= 1 << (posicion & 7)
+    return int.from_bytes(datos, 'little')
+
+
+def _con_bit(bitmap, posicion, agregado, valor):
+    """`bitmap` con un bit (`valor`) insertado en `posicion`, o quitado de ella; los de arriba se corren"""
+    bajos = bitmap & ((1 << posicion) - 1)
+    if agregado:
+        return bajos | (bitmap >> posicion << (posicion + 1)) | (valor << posicion)
+    return bajos | (bitmap >> (posicion + 1) << posicion)
+
+
+class _Bitmaps:
+    """Bitmaps de cada valor de faceta con el bit i = i-ésimo producto de `orden`"""
+
+    def __init__(self, orden, atributos):
+        self.orden = orden
+        categorias = {}
+        rangos = {}
+        con_stock = []
+        for posicion, id_producto in enumerate(orden):
+            categoria, rango, stock = atributos[id_producto]
+            categorias.setdefault(categoria, []).append(posicion)
+            rangos.setdefault(rango, []).append(posicion)
+            if stock:
+                con_stock.append(posicion)
+        cantidad = len(orden)
+        self.todos = (1 << cantidad) - 1
+        self.categorias = {
+            categoria: _bitmap(posiciones, cantidad)
+            for categoria, posiciones in categorias.items() if categoria
+        }
+        self.rangos = {clave: _bitmap(posiciones, cantidad) for clave, posiciones in rangos.items()}
+        self.con_stock = _bitmap(con_stock, cantidad)
+
+    def con_cambios(self, orden, movimientos):
+        """
+        Copia para el nuevo `orden`, con cada (posición, atributos, agregado) de
+        `movimientos` aplicado en secuencia como en la lista de ids.
+        """
+        categorias = dict(self.categorias)
+        rangos = dict(self.rangos)
+        con_stock = self.con_stock
+        for posicion, (categoria, rango, stock), agregado in movimientos:
+            if agregado:
+                if categoria:
+                    categorias.setdefault(categoria, 0)
+                rangos.setdefault(rango, 0)
+            categorias = {
+                clave: _con_bit(bitmap, posicion, agregado, clave == categoria) for clave, bitmap in categorias.items()
+            }
+            rangos = {clave: _con_bit(bitmap, posicion, agregado, clave == rango) for clave, bitmap in rangos.items()}
+            con_stock = _con_bit(con_stock, posicion, agregado, stock)
+
+        nuevo = _Bitmaps.__new__(_Bitmaps)
+        nuevo.orden = orden
+        nuevo.todos = (1 << len(orden)) - 1
+        # Como al armarlos: sin categorías vacías
+        nuevo.categorias = {categoria: bitmap for categoria, bitmap in categorias.items() if bitmap}
+        nuevo.rangos = rangos
+        nuevo.con_stock = con_stock
+        return nuevo
+
+    def _union(self, bitmaps, claves):
+        if not claves:
+            return self.todos
+        resultado = 0
+        for clave in claves:
+            resultado |= bitmaps.get(clave, 0)
+        return resultado
+
+    def mascaras(self, filtros):
+        """(categorías, rangos, stock): la máscara de cada faceta por separado"""
+        return (
+            self._union(self.categorias, filtros.categorias),
+            self._union(self.rangos, filtros.rangos),
+            self.con_stock if filtros.con_stock else self.todos,
+        )
+
+
+class IndiceFacetas:
+    """Bitmaps de una instantánea: por id (orden por defecto y recientes) y por precio"""
+
+    def __init__(self, instantanea, rangos):
+        self.productos = instantanea.productos
+        self.rangos = rangos
+        self._limites = [rango.desde for rango in rangos[1:]]
+        # Los atributos de cada producto, para los dos órdenes
+        atributos = {
+            id_producto: self._atributos(producto) for id_producto, producto in instantanea.productos.items()
+        }
+        self.por_id = _Bitmaps(instantanea.ids, atributos)
+        self.por_precio = _Bitmaps(instantanea.por_precio, atributos)
+
+    def _atributos(self, producto):
+        """(categoría, rango de precio, con stock)"""
+        return (
+            producto.categoria_producto,
+            self.rangos[bisect.bisect_right(self._limites, producto.precio_producto)].clave,
+            producto.stock_producto > 0,
+        )
+
+    def con_cambios(self, instantanea, movimientos):
+        """
+        Índice de `instantanea`, que es la de este con `movimientos` aplicados:
+        [(producto, agregado, posición por id, posición por precio)], en el
+        orden en que se quitaron y agregaron en sus listas.
+        """
+        nuevo = IndiceFacetas.__new__(IndiceFacetas)
+        nuevo.productos = instantanea.productos
+        nuevo.rangos = self.rangos
+        nuevo._limites = self._limites
+        atributos = [self._atributos(producto) for producto, _, _, _ in movimientos]
+        nuevo.por_id = self.por_id.con_cambios(instantanea.ids, [
+            (posicion, valores, agregado) for (_, agregado, posicion, _), valores in zip(movimientos, atributos)
+        ])
+        nuevo.por_precio = self.por_precio.con_cambios(instantanea.por_precio, [
+            (posicion, valores, agregado) for (_, agregado, _, posicion), valores in zip(movimientos, atributos)
+        ])
+        return nuevo
+
+    def _clave_precio(self, id_producto):
+        return (self.productos[id_producto].precio_producto, id_producto)
+
+    def _coincidencias(self, bitmaps, coincidencias):
+        """Bitmap (en el orden de `bitmaps`) de las coincidencias de búsqueda activas; todos sin búsqueda"""
+        if coincidencias is None:
+            return bitmaps.todos
+        ids = [id_producto for id_producto, _ in coincidencias if id_producto in self.productos]
+        if bitmaps is self.por_precio:
+            posiciones = (
+                bisect.bisect_left(bitmaps.orden, self._clave_precio(id_producto), key=self._clave_precio)
+                for id_producto in ids
+            )
+        else:
+            posiciones = (bisect.bisect_left(bitmaps.orden, id_producto) for id_producto in ids)
+        return _bitmap(posiciones, len(bitmaps.orden))
+
+    def pagina(self, filtros, cursor=None, tamano=24, coincidencias=None):
+        """
+        Como paginar_keyset(filtrar(...), ORDENES[filtros.orden]); mismos cursores.
+        Con `coincidencias` de búsqueda, solo entre ellas y, sin orden elegido,
+        por relevancia (como pagina_relevancia).
+        """
+        if coincidencias is not None and not filtros.orden:
+            categorias, rangos, stock = self.por_id.mascaras(filtros)
+            mascara = categorias & rangos & stock
+            ids = self.por_id.orden
+
+            def incluido(id_producto):
+                posicion = bisect.bisect_left(ids, id_producto)
+                return posicion < len(ids) and ids[posicion] == id_producto and mascara >> posicion & 1
+
+            ids_pagina, siguiente_cursor, hay_mas = _ids_relevancia(coincidencias, incluido, cursor, tamano)
+            return PaginaKeyset([self.productos[i] for i in ids_pagina], siguiente_cursor, hay_mas)
+
+        descendente = filtros.orden in ('-precio', 'recientes')
+        por_precio = filtros.orden in ('precio', '-precio')
+        bitmaps = self.por_precio if por_precio else self.por_id
+        categorias, rangos, stock = bitmaps.mascaras(filtros)
+        mascara = categorias & rangos & stock & self._coincidencias(bitmaps, coincidencias)
+
+        # Quitar de la máscara lo que queda antes del cursor (en el orden pedido)
+        valores = leer_cursor(cursor, filtros.orden)
+        if valores is not None:
+            if por_precio:
+                posicion = (bisect.bisect_left if descendente else bisect.bisect_right)(
+                    bitmaps.orden, tuple(valores), key=self._clave_precio
+                )
+            else:
+                posicion = (bisect.bisect_left if descendente else bisect.bisect_right)(bitmaps.orden, valores[0])
+            if descendente:
+                mascara &= (1 << posicion) - 1
+            else:
+                mascara &= ~((1 << posicion) - 1)
+
+        posiciones = []
+        while mascara and len(posiciones) <= tamano:
+            if descendente:
+                posicion = mascara.bit_length() - 1
+            else:
+                posicion = (mascara & -mascara).bit_length() - 1
+            mascara ^= 1 << posicion
+            posiciones.append(posicion)
+
+        hay_mas = len(posiciones) > tamano
+        productos = [self.productos[bitmaps.orden[posicion]] for posicion in posiciones[:tamano]]
+        siguiente_cursor = None
+        if hay_mas:
+            ultimo = productos[-1]
+            siguiente_cursor = codificar_cursor(
+                [ultimo.precio_producto, ultimo.id_producto] if por_precio else [ultimo.id_producto]
+            )
+        return PaginaKeyset(productos, siguiente_cursor, hay_mas)
+
+    def facetas(self, filtros, coincidencias=None):
+        """
+        Facetas con el conteo de cada opción bajo los filtros de las otras
+        facetas (y, con búsqueda, entre sus `coincidencias`)
+        """
+        bitmaps = self.por_id
+        categorias, rangos, stock = bitmaps.mascaras(filtros)
+        base = self._coincidencias(bitmaps, coincidencias)
+        return Facetas(
+            categorias=_opciones_categorias(
+                {
+                    categoria: (bitmap & rangos & stock & base).bit_count()
+                    for categoria, bitmap in bitmaps.categorias.items() if bitmap & base
+                },
+                filtros,
+            ),
+            rangos=[
+                (rango, (bitmaps.rangos.get(rango.clave, 0) & categorias & stock & base).bit_count(),
+                 rango.clave in filtros.rangos)
+                for rango in self.rangos
+            ],
+            con_stock=((bitmaps.con_stock & categorias & rangos & base).bit_count(), filtros.con_stock),
+            orden=filtros.orden,
+            total=(categorias & rangos & stock & base).bit_count(),
+        )
+
+
+_lock = threading.Lock()
+
+
+def indice(instantanea):
+    """IndiceFacetas de la instantánea; se arma en el primer uso y queda guardado en ella"""
+    rangos = rangos_precio()
+    actual = getattr(instantanea, 'facetas', None)
+    if actual is not None and actual.rangos == rangos:
+        return actual
+    with _lock:
+        actual = getattr(instantanea, 'facetas', None)
+        if actual is None or actual.rangos != rangos:
+            actual = instantanea.facetas = IndiceFacetas(instantanea, rangos)
+    return actual
+
+
+def _opciones_categorias(conteos, filtros):
+    """Las categorías con productos (en la búsqueda, si hay) más las elegidas, para poder desmarcarlas"""
+    return [
+        (categoria, conteos.get(categoria, 0), categoria in filtros.categorias)
+        for categoria in sorted(conteos.keys() | set(filtros.categorias))
+    ]
+
+
+def _contar(condicion):
+    return Count('pk', filter=condicion) if condicion else Count('pk')
+
+
+def facetas_bd(filtros, productos):
+    """
+    Facetas sin instantánea, contadas sobre el queryset `productos` (activos o,
+    con búsqueda, sus coincidencias) con los mismos criterios que los bitmaps:
+    cada faceta bajo los filtros de las otras. Una consulta, agrupada por
+    categoría y con un COUNT condicional por opción.
+    """
+    rangos = rangos_precio()
+    categorias, precio, stock = _condiciones(filtros)
+    filas = productos.order_by().values('categoria_producto').annotate(
+        cantidad=_contar(precio & stock),
+        con_stock=_contar(categorias & precio & Q(stock_producto__gt=0)),
+        total=_contar(categorias & precio & stock),
+        **{f'rango_{i}': _contar(categorias & stock & _condicion_rango(rango)) for i, rango in enumerate(rangos)},
+    )
+    conteos = {}
+    sumas = Counter()
+    for fila in filas:
+        categoria = fila.pop('categoria_producto')
+        if categoria:
+            conteos[categoria] = fila['cantidad']
+        sumas.update(fila)
+    return Facetas(
+        categorias=_opciones_categorias(conteos, filtros),
+        rangos=[(rango, sumas[f'rango_{i}'], rango.clave in filtros.rangos) for i, rango in enumerate(rangos)],
+        con_stock=(sumas['con_stock'], filtros.con_stock),
+        orden=filtros.orden,
+        total=sumas['total'],
+    )
@@ -0,0 +1,116 @@
+"""
+Historial de pedidos de un usuario (mis_pedidos), paginado por cursor.
+
+Orden: fecha_pedido_pedido DESC, id_pedido DESC, sin OFFSET; cada página es un
+SELECT de tamano + 1 filas con producto y dirección en el mismo JOIN, así que
+el costo depende del tamaño de página y no del largo del historial. Con el
+índice INDICE_HISTORIAL la búsqueda por usuario y fecha no lee la tabla base.
+
+Las páginas recientes salen solo de T_Pedido. El archivo (T_PedidoArchivo) se
+consulta únicamente cuando la página llega hasta limite_archivo() (el pedido
+archivado más reciente), y sus filas se mezclan con las de T_Pedido en el
+mismo orden.
+"""
+import datetime
+from collections import namedtuple
+
+from .archivo_pedidos import ESTADOS_ARCHIVABLES, limite_archivo
+from .exportacion import filtrar_fechas
+from .models import Pedido, PedidoArchivado
+from .paginacion import PaginaKeyset, codificar_cursor, paginar_keyset, valor_campo
+
+ORDEN = ['-fecha_pedido_pedido', '-id_pedido']
+TAMANO_HISTORIAL = 20
+
+# Índices recomendados (los revisa verificar_tablas_django): clave por usuario y
+# fecha, más las columnas que muestra la página para no volver a la tabla base
+IndiceRecomendado = namedtuple('IndiceRecomendado', ['modelo', 'nombre', 'clave', 'incluidas'])
+_INCLUIDAS = (
+    'estado_pedido', 'id_producto', 'id_direccion', 'cantidad_pedido',
+    'monto_total_pedido', 'metodo_pago_pedido', 'referencia_transaccion_pedido',
+)
+INDICE_HISTORIAL = IndiceRecomendado(
+    Pedido, 'IX_T_Pedido_usuario_fecha', ('id_usuario', 'fecha_pedido_pedido'), _INCLUIDAS
+)
+INDICES_RECOMENDADOS = (
+    INDICE_HISTORIAL,
+    IndiceRecomendado(
+        PedidoArchivado, 'IX_T_PedidoArchivo_usuario_fecha', ('id_usuario', 'fecha_pedido_pedido'), ()
+    ),
+)
+
+# Filtros aplicados, normalizados desde los parámetros GET
+Filtros = namedtuple('Filtros', ['estado', 'desde', 'hasta'])
+
+
+def _fecha(valor):
+    try:
+        return datetime.date.fromisoformat(valor) if valor else None
+    except ValueError:
+        return None
+
+
+def leer_filtros(params):
+    """Filtros de estado y rango de fechas (AAAA-MM-DD); los valores inválidos se ignoran"""
+    estado = params.get('estado')
+    if estado not in dict(Pedido.ESTADO_CHOICES):
+        estado = None
+    return Filtros(estado, _fecha(params.get('desde')), _fecha(params.get('hasta')))
+
+
+# Columnas que muestra mis_pedidos.html; las de T_Pedido están en el índice
+CAMPOS_PAGINA = (
+    'id_pedido', 'fecha_pedido_pedido', 'estado_pedido', 'cantidad_pedido', 'monto_total_pedido',
+    'metodo_pago_pedido', 'referencia_transaccion_pedido',
+    'id_producto__nombre_producto', 'id_producto__imagen_producto',
+    'id_direccion__direccion_detallada_direccion', 'id_direccion__distrito_direccion',
+    'id_direccion__canton_direccion', 'id_direccion__provincia_direccion',
+)
+
+
+def _filtrar(modelo, usuario, filtros, campos=None):
+    pedidos = modelo.objects.filter(id_usuario=usuario)
+    if campos:
+        pedidos = pedidos.values(*campos)
+    else:
+        pedidos = pedidos.select_related('id_producto', 'id_direccion').only(*CAMPOS_PAGINA)
+    if filtros.estado:
+        pedidos = pedidos.filter(estado_pedido=filtros.estado)
+    return filtrar_fechas(pedidos, 'fecha_pedido_pedido', filtros.desde, filtros.hasta)
+
+
+def paginar_historial(usuario, filtros, cursor=None, tamano=TAMANO_HISTORIAL, campos=None):
+    """
+    Página del historial (T_Pedido + archivo) después de `cursor`. Con `campos`
+    los items son dicts de values() con esos campos más los del orden.
+    """
+    if campos:
+        campos = tuple(dict.fromkeys([*campos, 'fecha_pedido_pedido', 'id_pedido']))
+    recientes = paginar_keyset(_filtrar(Pedido, usuario, filtros, campos), ORDEN, cursor, tamano)
+
+    if filtros.estado and filtros.estado not in ESTADOS_ARCHIVABLES:
+        return recientes
+    # Todo lo archivado es de limite_archivo() o antes: si la página está llena y su
+    # última fila es posterior, ninguna fila del archivo puede entrar en ella
+    limite = limite_archivo()
+    if limite is None:
+        return recientes
+    if recientes.hay_mas and valor_campo(recientes.items[-1], 'fecha_pedido_pedido') > limite:
+        return recientes
+
+    archivados = paginar_keyset(_filtrar(PedidoArchivado, usuario, filtros, campos), ORDEN, cursor, tamano)
+    if not archivados.items:
+        return recientes
+
+    combinados = sorted(
+        recientes.items + archivados.items,
+        key=lambda pedido: (valor_campo(pedido, 'fecha_pedido_pedido'), valor_campo(pedido, 'id_pedido')),
+        reverse=True,
+    )
+    items = combinados[:tamano]
+    hay_mas = len(combinados) > tamano or recientes.hay_mas or archivados.hay_mas
+    siguiente_cursor = None
+    if hay_mas:
+        ultimo = items[-1]
+        siguiente_cursor = codificar_cursor([valor_campo(ultimo, 'fecha_pedido_pedido'), valor_campo(ultimo, 'id_pedido')])
+    return PaginaKeyset(items, siguiente_cursor, hay_mas)
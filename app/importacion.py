@@ -0,0 +1,233 @@
+"""
+Importación masiva de productos (upsert por codigo_producto).
+
+Lee feeds CSV o JSONL fila por fila (memoria constante), valida cada fila y
+aplica los cambios por lotes: un SELECT por lote para saber qué códigos ya
+existen, bulk_create para los nuevos y bulk_update para los que cambiaron.
+bulk_create/bulk_update no disparan señales, así que al confirmar cada lote
+se actualizan aquí el índice de búsqueda y la cache del catálogo.
+
+Lo usa el comando importar_productos.
+"""
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from .busqueda import indexar_productos
+from .cache_catalogo import incrementar_version_catalogo
+from .categorias import invalidar_categorias
+from .models import Producto
+
+# Nombres cortos aceptados en los encabezados de los feeds de proveedores
+ALIAS = {
+    'codigo': 'codigo_producto',
+    'sku': 'codigo_producto',
+    'nombre': 'nombre_producto',
+    'descripcion': 'descripcion_producto',
+    'categoria': 'categoria_producto',
+    'precio': 'precio_producto',
+    'stock': 'stock_producto',
+    'imagen': 'imagen_producto',
+    'activo': 'activo_producto',
+}
+
+CAMPOS = (
+    'nombre_producto', 'descripcion_producto', 'categoria_producto', 'precio_producto',
+    'stock_producto', 'imagen_producto', 'activo_producto',
+)
+
+# Obligatorios solo para crear: una actualización puede traer únicamente precio o stock
+OBLIGATORIOS_NUEVO = ('nombre_producto', 'precio_producto')
+
+_VERDADERO = {'1', 'true', 'si', 'sí', 'yes', 's', 'y', 'activo'}
+_FALSO = {'0', 'false', 'no', 'n', 'inactivo'}
+
+
+class FilaInvalida(ValueError):
+    """La fila del feed no se puede importar; el mensaje explica por qué"""
+
+
+def leer_filas(archivo, formato):
+    """Genera (numero_fila, dict) desde un archivo de texto abierto, sin cargarlo completo"""
+    if formato == 'csv':
+        for numero, fila in enumerate(csv.DictReader(archivo), start=1):
+            yield numero, fila
+    elif formato == 'jsonl':
+        for numero, linea in enumerate(archivo, start=1):
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                datos = json.loads(linea)
+            except json.JSONDecodeError as e:
+                yield numero, FilaInvalida(f'JSON inválido: {e.msg}')
+                continue
+            yield numero, datos if isinstance(datos, dict) else FilaInvalida('Se esperaba un objeto JSON')
+    else:
+        raise ValueError(f'Formato no soportado: {formato}')
+
+
+def _texto(valor, campo, obligatorio=False):
+    valor = '' if valor is None else str(valor).strip()
+    if not valor:
+        if obligatorio:
+            raise FilaInvalida(f'{campo} es obligatorio')
+        return None
+    maximo = Producto._meta.get_field(campo).max_length
+    if maximo and len(valor) > maximo:
+        raise FilaInvalida(f'{campo} supera {maximo} caracteres')
+    return valor
+
+
+def _precio(valor):
+    try:
+        precio = Decimal(str(valor).strip().replace(',', '.'))
+    except InvalidOperation:
+        raise FilaInvalida(f'precio_producto inválido: {valor!r}') from None
+    if not precio.is_finite() or precio < 0:
+        raise FilaInvalida(f'precio_producto inválido: {valor!r}')
+    precio = precio.quantize(Decimal('0.01'))
+    campo = Producto._meta.get_field('precio_producto')
+    if len(precio.as_tuple().digits) > campo.max_digits:
+        raise FilaInvalida(f'precio_producto fuera de rango: {valor!r}')
+    return precio
+
+
+def _stock(valor):
+    try:
+        stock = int(str(valor).strip())
+    except ValueError:
+        raise FilaInvalida(f'stock_producto inválido: {valor!r}') from None
+    if stock < 0:
+        raise FilaInvalida('stock_producto no puede ser negativo')
+    return stock
+
+
+def _activo(valor):
+    if isinstance(valor, bool):
+        return valor
+    texto = str(valor).strip().lower()
+    if texto in _VERDADERO:
+        return True
+    if texto in _FALSO:
+        return False
+    raise FilaInvalida(f'activo_producto inválido: {valor!r}')
+
+
+def validar_fila(datos):
+    """
+    Convierte una fila del feed en {campo: valor} con el código y solo los
+    campos que trae con valor. Lanza FilaInvalida si algún valor no es válido.
+    """
+    if isinstance(datos, FilaInvalida):
+        raise datos
+    fila = {}
+    for clave, valor in datos.items():
+        if clave is None:
+            raise FilaInvalida('La fila tiene más columnas que el encabezado')
+        clave = clave.strip().lower()
+        fila[ALIAS.get(clave, clave)] = valor
+
+    resultado = {'codigo_producto': _texto(fila.get('codigo_producto'), 'codigo_producto', obligatorio=True)}
+    for campo in CAMPOS:
+        valor = fila.get(campo)
+        # Columna ausente o celda vacía: el valor actual no se modifica
+        if valor is None or str(valor).strip() == '':
+            continue
+        if campo == 'precio_producto':
+            resultado[campo] = _precio(valor)
+        elif campo == 'stock_producto':
+            resultado[campo] = _stock(valor)
+        elif campo == 'activo_producto':
+            resultado[campo] = _activo(valor)
+        else:
+            resultado[campo] = _texto(valor, campo)
+    return resultado
+
+
+class ResultadoLote:
+    def __init__(self):
+        self.insertados = 0
+        self.actualizados = 0
+        self.sin_cambios = 0
+        self.rechazados = []  # (numero_fila, codigo, motivo)
+
+
+def aplicar_lote(filas, simular=False, nuevos_simulados=None):
+    """
+    Upsert de un lote de filas validadas [(numero_fila, datos)].
+    Con simular=True solo clasifica (nuevos, cambiados, sin cambios) sin escribir.
+    Como en la simulación los nuevos no llegan a la BD, `nuevos_simulados`
+    ({codigo: datos}, el mismo dict para todos los lotes) los recuerda: si el
+    código vuelve a aparecer en otro lote se compara contra esos datos en lugar
+    de contarlo como nuevo otra vez.
+    """
+    resultado = ResultadoLote()
+    # Un código repetido dentro del lote se combina: la última fila gana
+    por_codigo = {}
+    for numero, datos in filas:
+        anterior = por_codigo.get(datos['codigo_producto'])
+        por_codigo[datos['codigo_producto']] = (numero, {**anterior[1], **datos} if anterior else datos)
+
+    existentes = Producto.objects.in_bulk(list(por_codigo), field_name='codigo_producto')
+    if nuevos_simulados:
+        for codigo in por_codigo.keys() & nuevos_simulados.keys():
+            existentes.setdefault(codigo, Producto(**nuevos_simulados[codigo]))
+    ahora = timezone.now()
+    nuevos = []
+    cambiados = []
+    campos_cambiados = set()
+
+    for codigo, (numero, datos) in por_codigo.items():
+        producto = existentes.get(codigo)
+        if producto is None:
+            faltantes = [campo for campo in OBLIGATORIOS_NUEVO if datos.get(campo) is None]
+            if faltantes:
+                resultado.rechazados.append((numero, codigo, f'Producto nuevo sin {", ".join(faltantes)}'))
+                continue
+            nuevos.append(Producto(**datos))
+            continue
+
+        cambios = [campo for campo, valor in datos.items() if getattr(producto, campo) != valor]
+        if not cambios:
+            resultado.sin_cambios += 1
+            continue
+        for campo in cambios:
+            setattr(producto, campo, datos[campo])
+        # bulk_update no aplica auto_now; la fecha forma parte de la llave del fragmento en cache
+        producto.fecha_actualizacion_producto = ahora
+        campos_cambiados.update(cambios)
+        cambiados.append(producto)
+
+    resultado.insertados = len(nuevos)
+    resultado.actualizados = len(cambiados)
+    if simular:
+        if nuevos_simulados is not None:
+            # Sin id: nuevos de este lote o de uno anterior de la simulación
+            for producto in nuevos + cambiados:
+                if producto.id_producto is None:
+                    nuevos_simulados[producto.codigo_producto] = {
+                        campo: getattr(producto, campo) for campo in ('codigo_producto',) + CAMPOS
+                    }
+        return resultado
+    if not (nuevos or cambiados):
+        return resultado
+
+    with transaction.atomic():
+        if nuevos:
+            Producto.objects.bulk_create(nuevos)
+        if cambiados:
+            Producto.objects.bulk_update(cambiados, sorted(campos_cambiados) + ['fecha_actualizacion_producto'])
+
+    # Recargar por código: no todos los motores devuelven los ids de bulk_create
+    codigos = [p.codigo_producto for p in nuevos] + [p.codigo_producto for p in cambiados]
+    indexar_productos(list(Producto.objects.filter(codigo_producto__in=codigos).only(
+        'id_producto', 'nombre_producto', 'descripcion_producto',
+        'categoria_producto', 'codigo_producto', 'activo_producto'
+    )))
+    invalidar_categorias()
+    incrementar_version_catalogo()
+    return resultado
@@ -0,0 +1,106 @@
+"""
+Límite de intentos de login y registro por token bucket.
+
+Cada email y cada IP tiene un bucket de `capacidad` tokens que se recarga a un
+token cada `segundos`; cada intento consume uno y sin tokens el intento se
+rechaza con 429 antes de consultar la BD o hashear la contraseña. Los buckets
+viven en la cache LIMITE_INTENTOS['CACHE'] (por defecto la de sesiones, que
+en producción es compartida entre workers).
+
+La IP es REMOTE_ADDR, salvo que la conexión venga de uno de
+LIMITE_INTENTOS['PROXIES_CONFIABLES'] (IPs o redes del balanceador o proxy
+inverso): entonces se toma de X-Forwarded-For (ver ip_cliente).
+
+La lectura y escritura del bucket no son atómicas: con intentos simultáneos
+sobre la misma clave pueden pasar uno o dos de más, lo que no cambia el
+efecto contra una ráfaga.
+"""
+import hashlib
+import ipaddress
+import math
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+LIMITE_INTENTOS_DEFECTO = {
+    'CACHE': 'sesiones',
+    # (capacidad, segundos por token)
+    'EMAIL': (5, 60),
+    'IP': (20, 3),
+    # IPs o redes (CIDR) de los proxies cuyo X-Forwarded-For se acepta
+    'PROXIES_CONFIABLES': (),
+}
+
+# permitido: bool; reintentar: segundos hasta el próximo token (0 si está permitido)
+Resultado = namedtuple('Resultado', ['permitido', 'reintentar'])
+
+
+def _config():
+    return {**LIMITE_INTENTOS_DEFECTO, **getattr(settings, 'LIMITE_INTENTOS', {})}
+
+
+def _tokens(estado, capacidad, segundos, ahora):
+    """Tokens disponibles ahora según el estado guardado (tokens, momento)"""
+    tokens, ultimo = estado or (capacidad, ahora)
+    return min(capacidad, tokens + (ahora - ultimo) / segundos)
+
+
+def clave_email(email):
+    # Las claves de memcached no admiten espacios ni caracteres arbitrarios
+    return hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+
+
+def consumir_intento(accion, ip, email=None):
+    """
+    Consume un token del bucket de la IP y, si se indica, del email para
+    `accion` ('login', 'registro'). Si alguno está vacío devuelve
+    Resultado(False, segundos) sin consumir del otro.
+    """
+    config = _config()
+    cache = caches[config['CACHE']]
+    ahora = time.time()
+    buckets = [(f'limite:{accion}:ip:{ip}', *config['IP'])]
+    if email:
+        buckets.append((f'limite:{accion}:email:{clave_email(email)}', *config['EMAIL']))
+
+    # Primero se revisan todos, para no gastar un token de la IP si el email está bloqueado
+    estados = cache.get_many([clave for clave, _, _ in buckets])
+    disponibles = []
+    for clave, capacidad, segundos in buckets:
+        tokens = _tokens(estados.get(clave), capacidad, segundos, ahora)
+        if tokens < 1:
+            return Resultado(False, math.ceil((1 - tokens) * segundos))
+        disponibles.append(tokens)
+
+    for (clave, capacidad, segundos), tokens in zip(buckets, disponibles):
+        # La entrada expira cuando el bucket ya estaría lleno otra vez
+        cache.set(clave, (tokens - 1, ahora), math.ceil((capacidad - tokens + 1) * segundos))
+    return Resultado(True, 0)
+
+
+def _confiable(ip, redes):
+    try:
+        direccion = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(direccion in red for red in redes)
+
+
+def ip_cliente(request):
+    """
+    IP del cliente. Si REMOTE_ADDR es un proxy confiable, la última dirección de
+    X-Forwarded-For que no sea otro proxy confiable: las anteriores las puede
+    escribir el propio cliente.
+    """
+    remota = request.META.get('REMOTE_ADDR') or 'desconocida'
+    redes = [ipaddress.ip_network(red, strict=False) for red in _config()['PROXIES_CONFIABLES']]
+    if not redes or not _confiable(remota, redes):
+        return remota
+    saltos = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+    for ip in reversed(saltos):
+        if not _confiable(ip, redes):
+            return ip
+    # Solo proxies confiables (o sin cabecera): el más lejano es lo más cercano al cliente
+    return saltos[0] if saltos else remota
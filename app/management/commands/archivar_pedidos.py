@@ -0,0 +1,48 @@
+"""
+Comando para mover los pedidos entregados antiguos de T_Pedido a T_PedidoArchivo.
+Ejecuta: python manage.py archivar_pedidos
+Como proceso de fondo: python manage.py archivar_pedidos --continuo --intervalo 86400
+
+Cada lote se mueve en su propia transacción (INSERT ... SELECT + DELETE por
+llave primaria), con pausas entre lotes para no bloquear T_Pedido.
+"""
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.archivo_pedidos import archivar_pedidos, dias_archivo
+
+
+class Command(BaseCommand):
+    help = 'Mueve por lotes los pedidos entregados antiguos a la tabla de archivo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int,
+                            help='Antigüedad mínima en días (por defecto settings.PEDIDOS_DIAS_ARCHIVO)')
+        parser.add_argument('--lote', type=int, default=1000, help='Pedidos por lote (por defecto 1000)')
+        parser.add_argument('--pausa', type=float, default=0.1, help='Segundos de espera entre lotes')
+        parser.add_argument('--continuo', action='store_true', help='Repetir el archivado indefinidamente')
+        parser.add_argument('--intervalo', type=int, default=86400, help='Segundos entre ejecuciones en modo continuo')
+
+    def handle(self, *args, **options):
+        dias = options['dias'] or dias_archivo()
+        if dias < 1:
+            raise CommandError('--dias debe ser mayor que 0')
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+
+        while True:
+            inicio = time.monotonic()
+            antes_de = timezone.now() - datetime.timedelta(days=dias)
+            movidos = archivar_pedidos(antes_de, options['lote'], options['pausa'])
+            duracion = time.monotonic() - inicio
+            velocidad = movidos / duracion if duracion else movidos
+            self.stdout.write(self.style.SUCCESS(
+                f'[OK] {movidos} pedidos anteriores a {timezone.localtime(antes_de):%Y-%m-%d} archivados '
+                f'en {duracion:.2f}s ({velocidad:.0f} filas/s)'
+            ))
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,181 @@
+"""
+Compara WSGI y ASGI sirviendo las vistas de lectura con el mismo número de hilos
+(la misma memoria): muchos clientes concurrentes con latencia de red simulada.
+
+Con WSGI cada request ocupa uno de los --hilos mientras el cliente envía y recibe;
+con ASGI la espera del cliente no ocupa hilos y los --hilos solo ejecutan las
+consultas (app/async_db.py).
+
+Ejecuta: TIENDA_DB=sqlite python manage.py benchmark_asgi --clientes 64 --hilos 8 --latencia 20
+Rutas con sesión: --usuario <id_usuario>
+"""
+import asyncio
+import io
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from app.medicion import Muestreo, percentil
+from app.models import Usuario
+from app.sesiones import SessionStore
+
+RUTAS_ANONIMAS = ['/']
+RUTAS_USUARIO = ['/', '/carrito/', '/mis-pedidos/', '/perfil/']
+
+
+class Command(BaseCommand):
+    help = 'Compara la concurrencia de WSGI y ASGI en las vistas de lectura con los mismos hilos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Requests por modo')
+        parser.add_argument('--clientes', type=int, default=64, help='Clientes concurrentes')
+        parser.add_argument('--hilos', type=int, default=getattr(settings, 'ASYNC_DB_HILOS', 8),
+                            help='Hilos del servidor WSGI y del pool de BD de ASGI')
+        parser.add_argument('--latencia', type=float, default=20.0,
+                            help='Latencia de red simulada por request (ms)')
+        parser.add_argument('--usuario', type=int, help='id_usuario para las rutas con sesión')
+
+    def handle(self, *args, **options):
+        self.latencia = options['latencia'] / 1000
+        self.host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '')), 'localhost').lstrip('.')
+        self.cookie = ''
+        rutas = RUTAS_ANONIMAS
+        if options['usuario']:
+            self.cookie = self._sesion(options['usuario'])
+            rutas = RUTAS_USUARIO
+
+        modos = (
+            ('WSGI', self._medir_wsgi, 'ec.urls'),
+            ('ASGI', self._medir_asgi, 'ec.urls_asgi'),
+        )
+        for nombre, medir, urlconf in modos:
+            with override_settings(ROOT_URLCONF=urlconf, ASYNC_DB_HILOS=options['hilos']):
+                with Muestreo() as muestreo:
+                    inicio = time.perf_counter()
+                    tiempos, errores = asyncio.run(
+                        self._clientes(medir, rutas, options['requests'], options['clientes'], options['hilos'])
+                    )
+                    duracion = time.perf_counter() - inicio
+                self._reportar(nombre, tiempos, errores, duracion, muestreo)
+
+    def _sesion(self, usuario_id):
+        usuario = Usuario.objects.filter(id_usuario=usuario_id).first()
+        if usuario is None:
+            raise CommandError(f'No existe el usuario {usuario_id}')
+        sesion = SessionStore()
+        sesion['usuario_id'] = usuario.id_usuario
+        sesion['usuario_nombre'] = f'{usuario.nombre_usuario} {usuario.apellido_usuario}'
+        sesion['usuario_rol'] = usuario.rol_usuario
+        sesion.create()
+        return f'{settings.SESSION_COOKIE_NAME}={sesion.session_key}'
+
+    async def _clientes(self, medir, rutas, total, clientes, hilos):
+        """Clientes en lazo cerrado: cada uno pide la siguiente ruta al terminar la anterior"""
+        tiempos = []
+        errores = {}
+        pendientes = iter(range(total))
+        servidor = medir(hilos)
+
+        async def cliente():
+            for numero in pendientes:
+                ruta = rutas[numero % len(rutas)]
+                inicio = time.perf_counter()
+                estado = await servidor(ruta)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+                if estado != 200:
+                    errores[estado] = errores.get(estado, 0) + 1
+
+        await asyncio.gather(*(cliente() for _ in range(clientes)))
+        return tiempos, errores
+
+    def _medir_wsgi(self, hilos):
+        handler = WSGIHandler()
+        # Servidor WSGI con hilos: la latencia del cliente ocupa el hilo
+        servidor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='wsgi')
+
+        def atender(ruta):
+            time.sleep(self.latencia)
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': ruta,
+                'SCRIPT_NAME': '',
+                'QUERY_STRING': '',
+                'SERVER_NAME': self.host,
+                'SERVER_PORT': '80',
+                'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': self.host,
+                'HTTP_COOKIE': self.cookie,
+                'wsgi.input': io.BytesIO(b''),
+                'wsgi.errors': io.StringIO(),
+                'wsgi.url_scheme': 'http',
+                'wsgi.version': (1, 0),
+                'wsgi.multithread': True,
+                'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            estado = []
+            response = handler(environ, lambda status, headers, exc_info=None: estado.append(status))
+            try:
+                b''.join(response)
+            finally:
+                response.close()
+            return int(estado[0].split()[0])
+
+        async def servir(ruta):
+            return await asyncio.get_running_loop().run_in_executor(servidor, atender, ruta)
+        return servir
+
+    def _medir_asgi(self, hilos):
+        # Las vistas async usan el pool de BD de settings.ASYNC_DB_HILOS hilos
+        handler = ASGIHandler()
+
+        async def servir(ruta):
+            estado = []
+
+            async def receive():
+                if not estado:
+                    estado.append(None)
+                    await asyncio.sleep(self.latencia)
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # El handler espera la desconexión y cancela esta espera al responder
+                await asyncio.Event().wait()
+
+            async def send(mensaje):
+                if mensaje['type'] == 'http.response.start':
+                    estado.append(mensaje['status'])
+
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': ruta,
+                'raw_path': ruta.encode(),
+                'root_path': '',
+                'query_string': b'',
+                'headers': [(b'host', self.host.encode()), (b'cookie', self.cookie.encode())],
+                'client': ('127.0.0.1', 0),
+                'server': (self.host, 80),
+            }
+            await handler(scope, receive, send)
+            return estado[-1]
+        return servir
+
+    def _reportar(self, nombre, tiempos, errores, duracion, muestreo):
+        if not tiempos:
+            raise CommandError('No se completó ningún request')
+        self.stdout.write(
+            f'{nombre}: {len(tiempos)} requests en {duracion:.2f} s | {len(tiempos) / duracion:.1f} req/s | '
+            f'p50 {percentil(tiempos, 50):.1f} ms | p95 {percentil(tiempos, 95):.1f} ms | '
+            f'p99 {percentil(tiempos, 99):.1f} ms | media {statistics.mean(tiempos):.1f} ms | '
+            f'RSS máx {muestreo.rss_max:.1f} MB | hilos máx {muestreo.hilos_max}'
+        )
+        if errores:
+            self.stdout.write(self.style.WARNING(f'  respuestas distintas de 200: {errores}'))
@@ -0,0 +1,71 @@
+"""
+Compara la latencia de abrir conexión + SELECT 1 + cerrar, con y sin pool.
+Ejecuta: python manage.py benchmark_conexiones --iteraciones 500 --hilos 4
+Local (SQLite): TIENDA_DB=sqlite python manage.py benchmark_conexiones
+"""
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+from app.backends.pool import estadisticas_pools
+from app.medicion import percentil
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia de conexión a la base de datos con y sin pool de conexiones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--iteraciones', type=int, default=200, help='Ciclos por hilo')
+        parser.add_argument('--hilos', type=int, default=1)
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        settings_dict = connections[alias].settings_dict
+        clase_pool = type(connections[alias])
+        motor_base = getattr(clase_pool, 'motor_base', None)
+        if motor_base is None:
+            raise CommandError(
+                f'La base "{alias}" no usa un backend con pool (app.backends.*): ENGINE={settings_dict["ENGINE"]}'
+            )
+        clase_sin_pool = load_backend(motor_base).DatabaseWrapper
+
+        for nombre, clase in (('sin pool', clase_sin_pool), ('con pool', clase_pool)):
+            tiempos = self._medir(clase, settings_dict, alias, options['iteraciones'], options['hilos'])
+            self.stdout.write(
+                f'{nombre:>9}: {len(tiempos)} ciclos | '
+                f'p50 {percentil(tiempos, 50):.2f} ms | p95 {percentil(tiempos, 95):.2f} ms | '
+                f'p99 {percentil(tiempos, 99):.2f} ms | media {statistics.mean(tiempos):.2f} ms'
+            )
+
+        self.stdout.write('\nEstadísticas del pool:')
+        for nombre, valor in estadisticas_pools().get(alias, {}).items():
+            self.stdout.write(f'  {nombre}: {valor}')
+
+    def _medir(self, clase, settings_dict, alias, iteraciones, hilos):
+        tiempos = []
+        lock = threading.Lock()
+
+        def trabajador():
+            propios = []
+            for _ in range(iteraciones):
+                conexion = clase(dict(settings_dict), alias)
+                inicio = time.perf_counter()
+                with conexion.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchall()
+                conexion.close()
+                propios.append((time.perf_counter() - inicio) * 1000)
+            with lock:
+                tiempos.extend(propios)
+
+        hilos_activos = [threading.Thread(target=trabajador) for _ in range(hilos)]
+        for hilo in hilos_activos:
+            hilo.start()
+        for hilo in hilos_activos:
+            hilo.join()
+        return tiempos
@@ -0,0 +1,517 @@
+"""
+Benchmark de carga de todas las rutas de app/urls.py sobre una base SQLite sembrada.
+
+Siembra usuarios, direcciones, productos, carritos y pedidos; luego ejecuta cada
+ruta con el cliente de pruebas de Django desde --concurrencia hilos (cada hilo
+con su propio usuario y sesión) y reporta por ruta p50/p95/p99, throughput,
+consultas SQL por request y memoria residente máxima.
+
+Ejecuta:
+    TIENDA_DB=sqlite TIENDA_SQLITE=benchmark.sqlite3 python manage.py benchmark_tienda --salida base.json
+Comparar contra una corrida anterior (p. ej. la del commit base):
+    TIENDA_DB=sqlite TIENDA_SQLITE=benchmark.sqlite3 python manage.py benchmark_tienda --comparar base.json
+"""
+import json
+import random
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from app.busqueda import BusquedaNoDisponible, reconstruir_indice
+from app.cache_catalogo import incrementar_version_catalogo
+from app.categorias import invalidar_categorias
+from app.historial_pedidos import INDICE_HISTORIAL
+from app.medicion import Muestreo, percentil
+from app.models import Carrito, Direccion, Pedido, PedidoArchivado, Producto, Reserva, Usuario
+from app.presupuesto import contar_consultas
+from app.sesiones import SessionStore
+from app.sql import tabla
+from app.urls import urlpatterns
+
+CATEGORIAS = ['Audio', 'Vídeo', 'Computación', 'Hogar', 'Juegos', 'Telefonía', 'Oficina', 'Accesorios']
+PALABRAS = ['cámara', 'portátil', 'inalámbrico', 'teclado', 'monitor', 'parlante', 'cargador', 'lámpara']
+CONTRASENA = 'benchmark'
+
+# Columnas calculadas como en SQL Server (subtotal = cantidad * precio)
+DDL_CARRITO = """
+    CREATE TABLE IF NOT EXISTS {tabla} (
+        id_carrito INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_usuario INTEGER NOT NULL,
+        id_producto INTEGER NOT NULL,
+        cantidad_carrito INTEGER NOT NULL,
+        precio_unitario_carrito DECIMAL NOT NULL,
+        subtotal_carrito DECIMAL GENERATED ALWAYS AS (cantidad_carrito * precio_unitario_carrito) VIRTUAL,
+        estado_carrito VARCHAR(50) NOT NULL DEFAULT 'activo',
+        fecha_creacion_carrito DATETIME DEFAULT CURRENT_TIMESTAMP,
+        fecha_actualizacion_carrito DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+DDL_PEDIDO = """
+    CREATE TABLE IF NOT EXISTS {tabla} (
+        id_pedido INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_usuario INTEGER NOT NULL,
+        id_direccion INTEGER NOT NULL,
+        id_producto INTEGER NOT NULL,
+        cantidad_pedido INTEGER NOT NULL,
+        precio_unitario_pedido DECIMAL NOT NULL,
+        subtotal_pedido DECIMAL GENERATED ALWAYS AS (cantidad_pedido * precio_unitario_pedido) VIRTUAL,
+        descuento_pedido DECIMAL DEFAULT 0,
+        monto_total_pedido DECIMAL NOT NULL,
+        metodo_pago_pedido VARCHAR(50),
+        referencia_transaccion_pedido VARCHAR(100),
+        fecha_pedido_pedido DATETIME DEFAULT CURRENT_TIMESTAMP,
+        estado_pedido VARCHAR(50) DEFAULT 'pendiente'
+    )
+"""
+
+
+def _insertar_carrito(usuario_id, producto_id, precio, cantidad=1):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {tabla(Carrito)} (id_usuario, id_producto, cantidad_carrito, precio_unitario_carrito) '
+            'VALUES (%s, %s, %s, %s)',
+            [usuario_id, producto_id, cantidad, precio],
+        )
+        return cursor.lastrowid
+
+
+class _Trabajador:
+    """Estado de un hilo de carga: su usuario, su sesión y su generador aleatorio"""
+
+    def __init__(self, comando, usuario, direccion_id, semilla):
+        self.usuario_id = usuario.id_usuario
+        self.direccion_id = direccion_id
+        self.azar = random.Random(semilla)
+        self.cliente = comando.cliente(usuario)
+
+
+class Command(BaseCommand):
+    help = 'Siembra una base SQLite y mide latencia, consultas y memoria de todas las rutas de la tienda'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=100)
+        parser.add_argument('--productos', type=int, default=1000)
+        parser.add_argument('--carritos', type=int, default=3, help='Items de carrito activos por usuario')
+        parser.add_argument('--pedidos', type=int, default=5, help='Pedidos por usuario')
+        parser.add_argument('--iteraciones', type=int, default=50, help='Requests por ruta')
+        parser.add_argument('--concurrencia', type=int, default=4, help='Hilos de carga simultáneos')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--sin-sembrar', action='store_true', help='Usar los datos que ya tiene la base')
+        parser.add_argument('--reiniciar', action='store_true', help='Borrar los datos existentes antes de sembrar')
+        parser.add_argument('--salida', help='Archivo JSON con los resultados ("-" = salida estándar)')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior para mostrar las diferencias')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                'benchmark_tienda siembra y modifica la base: úsalo solo con SQLite '
+                '(TIENDA_DB=sqlite TIENDA_SQLITE=benchmark.sqlite3)'
+            )
+        if options['concurrencia'] > options['usuarios']:
+            raise CommandError('--concurrencia no puede ser mayor que --usuarios (un usuario por hilo)')
+
+        self.host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '')), 'localhost').lstrip('.')
+        self.azar = random.Random(options['semilla'])
+        self.verbosidad = options['verbosity']
+
+        self._preparar_esquema()
+        if not options['sin_sembrar']:
+            self._sembrar(options)
+
+        # Se mide el costo de cada vista: todos los logins salen de la misma IP
+        # y repiten emails, así que el límite de intentos no debe intervenir
+        sin_limite = {'EMAIL': (10 ** 9, 1), 'IP': (10 ** 9, 1)}
+        with override_settings(LIMITE_INTENTOS={**getattr(settings, 'LIMITE_INTENTOS', {}), **sin_limite}):
+            resultados = self._ejecutar(options)
+        informe = {
+            'configuracion': {
+                clave: options[clave]
+                for clave in ('usuarios', 'productos', 'carritos', 'pedidos', 'iteraciones', 'concurrencia', 'semilla')
+            },
+            'rutas': resultados,
+        }
+
+        if options['salida'] == '-':
+            self.stdout.write(json.dumps(informe, indent=2, ensure_ascii=False))
+        else:
+            self._mostrar(resultados)
+            if options['salida']:
+                with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                    json.dump(informe, archivo, indent=2, ensure_ascii=False)
+                self.stdout.write(self.style.SUCCESS(f'[OK] Resultados guardados en {options["salida"]}'))
+        if options['comparar']:
+            self._comparar(options['comparar'], resultados)
+
+    # Esquema y datos
+
+    def _preparar_esquema(self):
+        call_command('migrate', verbosity=0)
+        existentes = set(connection.introspection.table_names())
+        with connection.schema_editor() as editor:
+            for modelo in (Usuario, Direccion, Producto, Reserva, PedidoArchivado):
+                if modelo._meta.db_table not in existentes:
+                    editor.create_model(modelo)
+        with connection.cursor() as cursor:
+            cursor.execute(DDL_CARRITO.format(tabla=tabla(Carrito)))
+            cursor.execute(DDL_PEDIDO.format(tabla=tabla(Pedido)))
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {connection.ops.quote_name(INDICE_HISTORIAL.nombre)} '
+                f'ON {tabla(Pedido)} ({", ".join(INDICE_HISTORIAL.clave)})'
+            )
+
+    def _sembrar(self, options):
+        if Producto.objects.exists() or Usuario.objects.exists():
+            if not options['reiniciar']:
+                raise CommandError('La base ya tiene datos: usa --reiniciar para borrarlos o --sin-sembrar para usarlos')
+            for modelo in (Reserva, PedidoArchivado, Pedido, Carrito, Direccion, Producto, Usuario):
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DELETE FROM {tabla(modelo)}')
+
+        inicio = time.perf_counter()
+        # Un solo hash para todos: hashear miles de contraseñas dominaría la siembra
+        contrasena = make_password(CONTRASENA)
+        Usuario.objects.bulk_create(
+            Usuario(
+                nombre_usuario=f'Usuario{i}', apellido_usuario='Benchmark',
+                email_usuario=f'usuario{i}@benchmark.local', contraseña_usuario=contrasena,
+                rol_usuario='admin' if i == 0 else 'cliente',
+            )
+            for i in range(options['usuarios'])
+        )
+        usuarios = list(Usuario.objects.values_list('id_usuario', flat=True))
+        Direccion.objects.bulk_create(
+            Direccion(
+                id_usuario_id=usuario_id, provincia_direccion='San José', canton_direccion='Central',
+                distrito_direccion='Carmen', direccion_detallada_direccion=f'Casa {usuario_id}',
+                predeterminada_direccion=True,
+            )
+            for usuario_id in usuarios
+        )
+        direcciones = dict(Direccion.objects.values_list('id_usuario_id', 'id_direccion'))
+
+        Producto.objects.bulk_create(
+            (
+                Producto(
+                    nombre_producto=f'{self.azar.choice(PALABRAS).capitalize()} {self.azar.choice(PALABRAS)} {i}',
+                    descripcion_producto=' '.join(self.azar.choices(PALABRAS, k=8)),
+                    categoria_producto=self.azar.choice(CATEGORIAS),
+                    precio_producto=Decimal(self.azar.randint(500, 500000)) / 100,
+                    stock_producto=10000,
+                    codigo_producto=f'BENCH-{i:06d}',
+                    activo_producto=self.azar.random() > 0.05,
+                )
+                for i in range(options['productos'])
+            ),
+            batch_size=500,
+        )
+        productos = list(Producto.objects.filter(activo_producto=True).values_list('id_producto', 'precio_producto'))
+
+        carritos = []
+        pedidos = []
+        for usuario_id in usuarios:
+            for producto_id, precio in self.azar.sample(productos, min(options['carritos'], len(productos))):
+                carritos.append((usuario_id, producto_id, 1, precio))
+            for _ in range(options['pedidos']):
+                producto_id, precio = self.azar.choice(productos)
+                cantidad = self.azar.randint(1, 3)
+                pedidos.append((
+                    usuario_id, direcciones[usuario_id], producto_id, cantidad, precio,
+                    precio * cantidad, 'tarjeta', self.azar.choice(['pendiente', 'pagado', 'enviado', 'entregado']),
+                ))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {tabla(Carrito)} (id_usuario, id_producto, cantidad_carrito, precio_unitario_carrito) '
+                'VALUES (%s, %s, %s, %s)',
+                carritos,
+            )
+            cursor.executemany(
+                f'INSERT INTO {tabla(Pedido)} (id_usuario, id_direccion, id_producto, cantidad_pedido, '
+                'precio_unitario_pedido, monto_total_pedido, metodo_pago_pedido, estado_pedido) '
+                'VALUES (%s, %s, %s, %s, %s, %s, %s, %s)',
+                pedidos,
+            )
+
+        # bulk_create no dispara señales: actualizar cache e índice a mano
+        invalidar_categorias()
+        incrementar_version_catalogo()
+        try:
+            reconstruir_indice()
+        except BusquedaNoDisponible as e:
+            self.stdout.write(self.style.WARNING(f'[AVISO] Índice de búsqueda no disponible: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'[OK] Sembrados {len(usuarios)} usuarios, {options["productos"]} productos, '
+            f'{len(carritos)} items de carrito y {len(pedidos)} pedidos en {time.perf_counter() - inicio:.1f} s'
+        ))
+
+    # Carga
+
+    def cliente(self, usuario=None):
+        """Cliente de pruebas; con `usuario` lleva una sesión iniciada (sin pasar por login)"""
+        cliente = Client(HTTP_HOST=self.host)
+        if usuario is not None:
+            sesion = SessionStore()
+            sesion['usuario_id'] = usuario.id_usuario
+            sesion['usuario_nombre'] = f'{usuario.nombre_usuario} {usuario.apellido_usuario}'
+            sesion['usuario_rol'] = usuario.rol_usuario
+            sesion.create()
+            cliente.cookies[settings.SESSION_COOKIE_NAME] = sesion.session_key
+        return cliente
+
+    def _escenarios(self):
+        """
+        (nombre, url_name, preparar). preparar(trabajador) hace lo que no se mide
+        (crear el item a eliminar, elegir el producto) y devuelve el request a medir.
+        """
+        productos = list(Producto.objects.filter(activo_producto=True).values_list('id_producto', 'precio_producto'))
+        if not productos:
+            raise CommandError('No hay productos activos: siembra la base primero')
+        categoria = self.azar.choice(CATEGORIAS)
+        termino = self.azar.choice(PALABRAS)[:4]
+
+        def producto(t):
+            return t.azar.choice(productos)
+
+        def agregar(t):
+            producto_id, _ = producto(t)
+            return lambda: t.cliente.post(reverse('agregar_al_carrito', args=[producto_id]), {'cantidad': 1})
+
+        def actualizar(t):
+            carrito_id = _insertar_carrito(t.usuario_id, *producto(t))
+            return lambda: t.cliente.post(reverse('actualizar_carrito', args=[carrito_id]), {'cantidad': 2})
+
+        def eliminar(t):
+            carrito_id = _insertar_carrito(t.usuario_id, *producto(t))
+            return lambda: t.cliente.get(reverse('eliminar_del_carrito', args=[carrito_id]))
+
+        def checkout_post(t):
+            _insertar_carrito(t.usuario_id, *producto(t))
+            return lambda: t.cliente.post(reverse('checkout'), {
+                'direccion_id': t.direccion_id, 'metodo_pago': 'tarjeta', 'referencia_transaccion': 'BENCH',
+            })
+
+        def checkout_get(t):
+            _insertar_carrito(t.usuario_id, *producto(t))
+            return lambda: t.cliente.get(reverse('checkout'))
+
+        def registro(t):
+            datos = {
+                'nombre_usuario': 'Nuevo', 'apellido_usuario': 'Benchmark',
+                'email_usuario': f'{uuid.uuid4().hex}@benchmark.local', 'contraseña_usuario': CONTRASENA,
+            }
+            return lambda: self.cliente().post(reverse('registro'), datos)
+
+        def login(t):
+            datos = {'email_usuario': f'usuario{t.azar.randrange(self.usuarios)}@benchmark.local',
+                     'contraseña_usuario': CONTRASENA}
+            return lambda: self.cliente().post(reverse('login'), datos)
+
+        def logout(t):
+            cliente = self.cliente(Usuario.objects.get(id_usuario=t.usuario_id))
+            return lambda: cliente.get(reverse('logout'))
+
+        def crear_producto(t):
+            datos = {
+                'nombre_producto': 'Producto benchmark', 'categoria_producto': categoria,
+                'precio_producto': '100.00', 'stock_producto': 10,
+                'codigo_producto': f'BENCH-{uuid.uuid4().hex[:12]}', 'activo_producto': 'on',
+            }
+            return lambda: t.cliente.post(reverse('crear_producto'), datos)
+
+        def editar_producto(t):
+            producto_id, _ = producto(t)
+            actual = Producto.objects.values().get(id_producto=producto_id)
+            datos = {
+                'nombre_producto': actual['nombre_producto'], 'descripcion_producto': actual['descripcion_producto'] or '',
+                'categoria_producto': actual['categoria_producto'] or '', 'precio_producto': actual['precio_producto'],
+                'stock_producto': actual['stock_producto'], 'codigo_producto': actual['codigo_producto'] or '',
+                'imagen_producto': actual['imagen_producto'] or '', 'activo_producto': 'on',
+            }
+            return lambda: t.cliente.post(reverse('editar_producto', args=[producto_id]), datos)
+
+        def eliminar_producto(t):
+            nuevo = Producto.objects.create(
+                nombre_producto='Producto a eliminar', precio_producto='1.00',
+                codigo_producto=f'BENCH-{uuid.uuid4().hex[:12]}',
+            )
+            return lambda: t.cliente.post(reverse('eliminar_producto', args=[nuevo.id_producto]))
+
+        def direccion(t):
+            datos = {'provincia_direccion': 'Heredia', 'canton_direccion': 'Central', 'distrito_direccion': 'Mercedes',
+                     'direccion_detallada_direccion': 'Oficina'}
+            return lambda: t.cliente.post(reverse('agregar_direccion'), datos)
+
+        def get(url_name, *args, anonimo=False, **query):
+            def preparar(t):
+                cliente = self.cliente() if anonimo else t.cliente
+                return lambda: cliente.get(reverse(url_name, args=args), query)
+            return preparar
+
+        def home_condicional(t):
+            # Visitante que repite la página: If-None-Match con el ETag recibido
+            cliente = self.cliente()
+            etag = cliente.get(reverse('home'))['ETag']
+            return lambda: cliente.get(reverse('home'), HTTP_IF_NONE_MATCH=etag)
+
+        producto_fijo = productos[0][0]
+        return [
+            ('home (anónimo)', 'home', get('home', anonimo=True)),
+            ('home (304)', 'home', home_condicional),
+            ('home', 'home', get('home')),
+            ('home ?categoria', 'home', get('home', categoria=categoria)),
+            ('home ?busqueda', 'home', get('home', busqueda=termino)),
+            ('home ?facetas', 'home', get('home', categoria=list(CATEGORIAS[:2]), precio='-10000', stock='1', orden='precio')),
+            ('productos_mas', 'productos_mas', get('productos_mas', anonimo=True, categoria=categoria)),
+            ('registro (GET)', 'registro', get('registro', anonimo=True)),
+            ('registro', 'registro', registro),
+            ('login (GET)', 'login', get('login', anonimo=True)),
+            ('login', 'login', login),
+            ('logout', 'logout', logout),
+            ('perfil', 'perfil', get('perfil')),
+            ('agregar_direccion', 'agregar_direccion', direccion),
+            ('ver_carrito', 'ver_carrito', get('ver_carrito')),
+            ('agregar_al_carrito', 'agregar_al_carrito', agregar),
+            ('actualizar_carrito', 'actualizar_carrito', actualizar),
+            ('eliminar_del_carrito', 'eliminar_del_carrito', eliminar),
+            ('checkout (GET)', 'checkout', checkout_get),
+            ('checkout', 'checkout', checkout_post),
+            ('mis_pedidos', 'mis_pedidos', get('mis_pedidos')),
+            ('api_productos', 'api_productos', get('api_productos', anonimo=True, fields='id,nombre,precio')),
+            ('api_categorias', 'api_categorias', get('api_categorias', anonimo=True)),
+            ('api_carrito', 'api_carrito', get('api_carrito')),
+            ('api_pedidos', 'api_pedidos', get('api_pedidos')),
+            ('listar_productos', 'listar_productos', get('listar_productos')),
+            ('crear_producto (GET)', 'crear_producto', get('crear_producto')),
+            ('crear_producto', 'crear_producto', crear_producto),
+            ('editar_producto (GET)', 'editar_producto', get('editar_producto', producto_fijo)),
+            ('editar_producto', 'editar_producto', editar_producto),
+            ('eliminar_producto', 'eliminar_producto', eliminar_producto),
+        ]
+
+    def _ejecutar(self, options):
+        self.usuarios = Usuario.objects.count()
+        escenarios = self._escenarios()
+
+        cubiertas = {url_name for _, url_name, _ in escenarios}
+        faltantes = sorted(p.name for p in urlpatterns if p.name and p.name not in cubiertas)
+        if faltantes:
+            self.stdout.write(self.style.WARNING(f'[AVISO] Rutas sin escenario: {", ".join(faltantes)}'))
+
+        # Un usuario (con su dirección) por hilo de carga, para que los carritos no choquen
+        usuarios = list(Usuario.objects.order_by('id_usuario')[:options['concurrencia']])
+        direcciones = dict(Direccion.objects.filter(id_usuario__in=usuarios).values_list('id_usuario_id', 'id_direccion'))
+        asignados = iter(range(len(usuarios)))
+        local = threading.local()
+        lock = threading.Lock()
+
+        def trabajador():
+            if not hasattr(local, 'trabajador'):
+                with lock:
+                    indice = next(asignados)
+                usuario = usuarios[indice]
+                local.trabajador = _Trabajador(
+                    self, usuario, direcciones.get(usuario.id_usuario), options['semilla'] + indice
+                )
+            return local.trabajador
+
+        def medir(escenario):
+            url_name, preparar = escenario
+            t = trabajador()
+            request = preparar(t)
+            with contar_consultas() as contador:
+                inicio = time.perf_counter()
+                try:
+                    response = request()
+                    estado = response.status_code
+                    if response.resolver_match is None or response.resolver_match.url_name != url_name:
+                        # La URL la atendió otra vista (p. ej. un patrón que la oculta)
+                        estado = 'otra_vista'
+                except Exception as e:
+                    estado = type(e).__name__
+                duracion = (time.perf_counter() - inicio) * 1000
+            # Como al terminar un request: devolver la conexión del hilo al pool
+            close_old_connections()
+            return duracion, contador.consultas, estado
+
+        # El hilo principal no debe retener una conexión del pool durante la carga
+        connection.close()
+        resultados = {}
+        with ThreadPoolExecutor(max_workers=options['concurrencia'], thread_name_prefix='benchmark') as pool:
+            for nombre, url_name, preparar in escenarios:
+                # Calentamiento: plantillas compiladas, cache de categorías, conexiones del pool
+                list(pool.map(medir, [(url_name, preparar)] * options['concurrencia']))
+
+                with Muestreo() as muestreo:
+                    inicio = time.perf_counter()
+                    mediciones = list(pool.map(medir, [(url_name, preparar)] * options['iteraciones']))
+                    duracion = time.perf_counter() - inicio
+
+                tiempos = [m[0] for m in mediciones]
+                consultas = [m[1] for m in mediciones]
+                errores = {}
+                for _, _, estado in mediciones:
+                    if not isinstance(estado, int) or estado >= 400:
+                        errores[str(estado)] = errores.get(str(estado), 0) + 1
+                resultados[nombre] = {
+                    'url_name': url_name,
+                    'requests': len(mediciones),
+                    'errores': errores,
+                    'p50_ms': round(percentil(tiempos, 50), 2),
+                    'p95_ms': round(percentil(tiempos, 95), 2),
+                    'p99_ms': round(percentil(tiempos, 99), 2),
+                    'media_ms': round(statistics.mean(tiempos), 2),
+                    'throughput_rps': round(len(mediciones) / duracion, 1),
+                    'consultas_promedio': round(statistics.mean(consultas), 2),
+                    'consultas_max': max(consultas),
+                    'rss_max_mb': round(muestreo.rss_max, 1),
+                }
+                if self.verbosidad > 1:
+                    self.stdout.write(f'  {nombre}: {resultados[nombre]}')
+        return resultados
+
+    # Reporte
+
+    def _mostrar(self, resultados):
+        self.stdout.write(
+            f'\n{"ruta":<24} {"req":>5} {"p50":>8} {"p95":>8} {"p99":>8} {"req/s":>8} {"consultas":>10} {"RSS MB":>8}'
+        )
+        for nombre, fila in resultados.items():
+            self.stdout.write(
+                f'{nombre:<24} {fila["requests"]:>5} {fila["p50_ms"]:>8.1f} {fila["p95_ms"]:>8.1f} '
+                f'{fila["p99_ms"]:>8.1f} {fila["throughput_rps"]:>8.1f} '
+                f'{fila["consultas_promedio"]:>6.1f}/{fila["consultas_max"]:<3} {fila["rss_max_mb"]:>8.1f}'
+            )
+            if fila['errores']:
+                self.stdout.write(self.style.WARNING(f'  errores: {fila["errores"]}'))
+
+    def _comparar(self, ruta, resultados):
+        with open(ruta, encoding='utf-8') as archivo:
+            anteriores = json.load(archivo)['rutas']
+        self.stdout.write(f'\nDiferencias contra {ruta} (p95 y consultas promedio):')
+        for nombre, fila in resultados.items():
+            anterior = anteriores.get(nombre)
+            if anterior is None:
+                self.stdout.write(f'  {nombre:<24} (nueva)')
+                continue
+            cambio_p95 = (fila['p95_ms'] - anterior['p95_ms']) / anterior['p95_ms'] * 100 if anterior['p95_ms'] else 0
+            cambio_consultas = fila['consultas_promedio'] - anterior['consultas_promedio']
+            linea = (
+                f'  {nombre:<24} p95 {anterior["p95_ms"]:.1f} -> {fila["p95_ms"]:.1f} ms ({cambio_p95:+.0f}%) | '
+                f'consultas {anterior["consultas_promedio"]:.1f} -> {fila["consultas_promedio"]:.1f}'
+            )
+            # Más consultas siempre es regresión; la latencia tolera el ruido de la máquina
+            if cambio_consultas > 0 or cambio_p95 > 20:
+                self.stdout.write(self.style.WARNING(linea))
+            else:
+                self.stdout.write(linea)
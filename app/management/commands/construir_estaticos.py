@@ -0,0 +1,84 @@
+"""
+Comando para construir los estáticos: iconos, collectstatic con hash y
+precompresión, y reporte de bytes por página.
+Ejecuta: python manage.py construir_estaticos
+En CI (no escribe nada; falla si iconos.css está desactualizado o una página
+supera el límite): python manage.py construir_estaticos --verificar --limite 30
+"""
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from app import estaticos
+
+
+def _kb(valor):
+    return '-' if valor is None else f'{valor / 1024:.1f}'
+
+
+class Command(BaseCommand):
+    help = 'Genera iconos.css, ejecuta collectstatic (hash + .gz/.br) e informa el peso de cada página'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true',
+                            help='No escribir nada: comprobar iconos.css y el límite de peso')
+        parser.add_argument('--limite', type=float,
+                            help='KB gzip máximos de estáticos por página (por defecto settings.ESTATICOS_LIMITE_KB)')
+        parser.add_argument('--json', action='store_true', help='Reporte en JSON')
+
+    def handle(self, *args, **options):
+        errores = self.iconos(options['verificar'])
+
+        if not options['verificar']:
+            call_command('collectstatic', interactive=False, verbosity=0)
+            self.stdout.write(self.style.SUCCESS(f'[OK] collectstatic en {settings.STATIC_ROOT}'))
+            if estaticos.brotli is None:
+                self.stdout.write(self.style.WARNING('[AVISO] Paquete brotli no instalado: solo se generaron .gz'))
+
+        limite = options['limite'] if options['limite'] is not None else getattr(settings, 'ESTATICOS_LIMITE_KB', None)
+        errores += self.reporte(limite, options['json'])
+
+        if errores:
+            raise CommandError('\n'.join(errores))
+
+    def iconos(self, verificar):
+        usados, dinamicos = estaticos.iconos_usados()
+        css, faltantes = estaticos.generar_css_iconos(usados, estaticos.leer_iconos())
+        errores = [f'Icono inexistente en Font Awesome: {prefijo} fa-{nombre}' for prefijo, nombre in faltantes]
+        errores += [f'Clase de icono dinámica en {plantilla}: escribir la clase completa' for plantilla in dinamicos]
+
+        actual = estaticos.CSS_ICONOS.read_text(encoding='utf-8') if estaticos.CSS_ICONOS.exists() else None
+        if actual == css:
+            self.stdout.write(f'[OK] iconos.css al día ({len(usados)} iconos, {len(css) / 1024:.1f} KB)')
+        elif verificar:
+            errores.append('iconos.css no corresponde a las plantillas: ejecutar construir_estaticos')
+        else:
+            estaticos.CSS_ICONOS.write_text(css, encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(
+                f'[OK] iconos.css generado ({len(usados)} iconos, {len(css) / 1024:.1f} KB)'
+            ))
+        return errores
+
+    def reporte(self, limite, como_json):
+        paginas = estaticos.reporte_paginas()
+        if como_json:
+            self.stdout.write(estaticos.reporte_json(paginas))
+        else:
+            self.stdout.write(f'\n{"Página":<45} {"KB":>8} {"gzip":>8} {"brotli":>8}')
+            for pagina in paginas:
+                self.stdout.write(
+                    f'{pagina.plantilla:<45} {_kb(estaticos.total(pagina, "bytes")):>8} '
+                    f'{_kb(estaticos.total(pagina, "gzip")):>8} {_kb(estaticos.total(pagina, "brotli")):>8}'
+                )
+
+        errores = []
+        for pagina in paginas:
+            for recurso in pagina.recursos:
+                if recurso.bytes is None:
+                    errores.append(f'{pagina.plantilla}: no existe el estático {recurso.ruta}')
+            for externo in pagina.externos:
+                errores.append(f'{pagina.plantilla}: recurso externo {externo} (servirlo desde /static/)')
+            peso = estaticos.total(pagina, 'gzip')
+            if limite is not None and peso is not None and peso > limite * 1024:
+                errores.append(f'{pagina.plantilla}: {_kb(peso)} KB gzip supera el límite de {limite} KB')
+        return errores
@@ -0,0 +1,100 @@
+"""
+Comando para generar las miniaturas de imagen_producto de todo el catálogo.
+Ejecuta: python manage.py generar_miniaturas
+Como proceso de fondo (toma las imágenes nuevas): python manage.py generar_miniaturas --continuo --intervalo 300
+
+Las imágenes se procesan en paralelo en un pool de procesos (decodificar y
+redimensionar usa CPU); el manifiesto se actualiza solo desde este proceso.
+Un error en una imagen se registra y no detiene las demás.
+"""
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import miniaturas
+from app.models import Producto
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Genera en paralelo las miniaturas (WebP/JPEG) de las imágenes de los productos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1,
+                            help='Procesos del pool (por defecto, uno por CPU)')
+        parser.add_argument('--forzar', action='store_true',
+                            help='Regenerar también las imágenes que ya están en el manifiesto')
+        parser.add_argument('--podar', action='store_true',
+                            help='Quitar del manifiesto y del disco las imágenes que ya no usa ningún producto')
+        parser.add_argument('--continuo', action='store_true', help='Repetir indefinidamente')
+        parser.add_argument('--intervalo', type=int, default=300, help='Segundos entre ejecuciones en modo continuo')
+
+    def handle(self, *args, **options):
+        if miniaturas.Image is None:
+            raise CommandError('Pillow no está instalado (pip install Pillow): no se pueden generar miniaturas')
+        if options['procesos'] < 1:
+            raise CommandError('--procesos debe ser mayor que 0')
+
+        while True:
+            self.generar(options['procesos'], options['forzar'], options['podar'])
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
+
+    def generar(self, procesos, forzar, podar):
+        inicio = time.monotonic()
+        origenes = set(
+            Producto.objects.exclude(imagen_producto__isnull=True).exclude(imagen_producto='')
+            .values_list('imagen_producto', flat=True).distinct()
+        )
+        entradas = miniaturas.leer_manifiesto()
+        pendientes = sorted(origenes if forzar else origenes - entradas.keys())
+
+        generadas = 0
+        errores = 0
+        config = miniaturas.config_generacion()
+        try:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                futuros = {pool.submit(miniaturas.generar, origen, config): origen for origen in pendientes}
+                for futuro in as_completed(futuros):
+                    try:
+                        origen, entrada = futuro.result()
+                    except miniaturas.ImagenNoDisponible as error:
+                        errores += 1
+                        self.stdout.write(self.style.WARNING(f'[AVISO] {error}'))
+                        continue
+                    except Exception as error:
+                        # Un original que rompe Pillow (o el proceso hijo) no detiene el resto
+                        errores += 1
+                        origen = futuros[futuro]
+                        logger.exception('No se pudieron generar las miniaturas de %s', origen)
+                        self.stdout.write(self.style.WARNING(f'[AVISO] {origen}: {error!r}'))
+                        continue
+                    entradas[origen] = entrada
+                    generadas += 1
+        finally:
+            # También si se interrumpe: lo generado hasta ahí queda registrado
+            if podar:
+                self.podar(entradas, origenes)
+            miniaturas.escribir_manifiesto(entradas)
+
+        duracion = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'[OK] {generadas} imágenes procesadas, {errores} con error, '
+            f'{len(origenes) - len(pendientes)} ya estaban en {duracion:.2f}s ({procesos} procesos)'
+        ))
+
+    def podar(self, entradas, origenes):
+        for origen in entradas.keys() - origenes:
+            del entradas[origen]
+        usados = {entrada['hash'] for entrada in entradas.values()}
+        borrados = 0
+        for ruta in miniaturas.directorio().glob('*/*'):
+            if ruta.name.split('-')[0] not in usados:
+                ruta.unlink()
+                borrados += 1
+        self.stdout.write(f'[OK] {borrados} archivos de miniaturas sin uso eliminados')
@@ -0,0 +1,156 @@
+"""
+Importa o actualiza productos desde un feed CSV o JSONL (upsert por codigo_producto).
+Ejecuta: python manage.py importar_productos proveedor.csv --lote 1000
+Solo validar: python manage.py importar_productos proveedor.csv --simular
+Continuar una importación interrumpida: python manage.py importar_productos proveedor.csv --reanudar
+
+Encabezados: codigo_producto (o codigo/sku), nombre_producto, descripcion_producto,
+categoria_producto, precio_producto, stock_producto, imagen_producto, activo_producto
+(también sin el sufijo _producto). Las columnas ausentes o vacías no se modifican.
+"""
+import csv
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.importacion import FilaInvalida, aplicar_lote, leer_filas, validar_fila
+
+# Rechazos que se muestran en consola (el resto va al archivo de --rechazos)
+MAX_RECHAZOS_MOSTRADOS = 10
+
+
+class Command(BaseCommand):
+    help = 'Importa productos por lotes desde CSV/JSONL, creando o actualizando por codigo_producto'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo')
+        parser.add_argument('--formato', choices=['csv', 'jsonl'], help='Por defecto según la extensión')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por lote (por defecto 1000)')
+        parser.add_argument('--simular', action='store_true', help='Validar y clasificar sin escribir en la BD')
+        parser.add_argument('--checkpoint', help='Archivo de progreso (por defecto <archivo>.checkpoint.json)')
+        parser.add_argument('--reanudar', action='store_true', help='Continuar desde el checkpoint')
+        parser.add_argument('--rechazos', help='CSV donde escribir las filas rechazadas')
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        ruta = os.path.abspath(options['archivo'])
+        if not os.path.isfile(ruta):
+            raise CommandError(f'No existe el archivo {ruta}')
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+        formato = options['formato'] or ('jsonl' if ruta.endswith(('.jsonl', '.ndjson')) else 'csv')
+        ruta_checkpoint = options['checkpoint'] or ruta + '.checkpoint.json'
+        simular = options['simular']
+
+        progreso = self._progreso_inicial(ruta, ruta_checkpoint, options['reanudar'], simular)
+        saltar = progreso['filas']
+        if saltar:
+            self.stdout.write(f'Reanudando después de la fila {saltar}...')
+
+        archivo_rechazos = None
+        escritor_rechazos = None
+        if options['rechazos']:
+            archivo_rechazos = open(options['rechazos'], 'a' if saltar else 'w', newline='', encoding='utf-8')
+            escritor_rechazos = csv.writer(archivo_rechazos)
+            if not saltar:
+                escritor_rechazos.writerow(['fila', 'codigo_producto', 'motivo'])
+
+        self.rechazos_mostrados = 0
+        # Productos nuevos que la simulación ya contó (no llegan a la BD)
+        self.nuevos_simulados = {} if simular else None
+        inicio = time.monotonic()
+        procesadas = 0
+        try:
+            with open(ruta, encoding=options['encoding'], newline='') as archivo:
+                lote = []
+                # Rechazos de filas del lote en curso: se registran al confirmar el lote,
+                # para no contarlos dos veces si la importación se reanuda
+                rechazos = []
+                for numero, datos in leer_filas(archivo, formato):
+                    if numero <= saltar:
+                        continue
+                    procesadas += 1
+                    try:
+                        lote.append((numero, validar_fila(datos)))
+                    except FilaInvalida as e:
+                        codigo = datos.get('codigo_producto') or datos.get('codigo') if isinstance(datos, dict) else None
+                        rechazos.append((numero, codigo, str(e)))
+                    # Las filas rechazadas también cuentan para el tamaño del lote; el
+                    # checkpoint se escribe solo al confirmar un lote
+                    if len(lote) + len(rechazos) >= options['lote']:
+                        self._aplicar(lote, rechazos, progreso, escritor_rechazos, simular)
+                        lote, rechazos = [], []
+                        progreso['filas'] = numero
+                        self._guardar_checkpoint(ruta_checkpoint, progreso, simular)
+                if lote or rechazos:
+                    self._aplicar(lote, rechazos, progreso, escritor_rechazos, simular)
+        except Exception:
+            if not simular:
+                self.stderr.write(
+                    f'Importación interrumpida; el checkpoint quedó en la fila {progreso["filas"]}. '
+                    'Corrige el problema y vuelve a ejecutar con --reanudar.'
+                )
+            raise
+        finally:
+            if archivo_rechazos:
+                archivo_rechazos.close()
+
+        if not simular and os.path.exists(ruta_checkpoint):
+            os.remove(ruta_checkpoint)
+
+        duracion = time.monotonic() - inicio
+        velocidad = procesadas / duracion if duracion else procesadas
+        prefijo = '[SIMULACIÓN] ' if simular else '[OK] '
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefijo}{progreso["insertados"]} insertados, {progreso["actualizados"]} actualizados, '
+            f'{progreso["sin_cambios"]} sin cambios, {progreso["rechazados"]} rechazados | '
+            f'{procesadas} filas en {duracion:.2f}s ({velocidad:.0f} filas/s)'
+        ))
+
+    def _progreso_inicial(self, ruta, ruta_checkpoint, reanudar, simular):
+        vacio = {
+            'archivo': ruta, 'tamano': os.path.getsize(ruta), 'filas': 0,
+            'insertados': 0, 'actualizados': 0, 'sin_cambios': 0, 'rechazados': 0,
+        }
+        existe = os.path.exists(ruta_checkpoint)
+        if not reanudar:
+            if existe and not simular:
+                raise CommandError(
+                    f'Hay una importación incompleta ({ruta_checkpoint}): usa --reanudar o borra el checkpoint'
+                )
+            return vacio
+        if not existe:
+            raise CommandError(f'No hay checkpoint en {ruta_checkpoint}')
+        with open(ruta_checkpoint, encoding='utf-8') as archivo:
+            progreso = json.load(archivo)
+        if progreso.get('archivo') != ruta or progreso.get('tamano') != vacio['tamano']:
+            raise CommandError('El checkpoint es de otro archivo o el archivo cambió desde la importación anterior')
+        return progreso
+
+    def _guardar_checkpoint(self, ruta_checkpoint, progreso, simular):
+        if simular:
+            return
+        temporal = ruta_checkpoint + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump(progreso, archivo)
+        os.replace(temporal, ruta_checkpoint)
+
+    def _aplicar(self, lote, rechazos, progreso, escritor_rechazos, simular):
+        if lote:
+            resultado = aplicar_lote(lote, simular=simular, nuevos_simulados=self.nuevos_simulados)
+            progreso['insertados'] += resultado.insertados
+            progreso['actualizados'] += resultado.actualizados
+            progreso['sin_cambios'] += resultado.sin_cambios
+            rechazos = sorted(rechazos + resultado.rechazados)
+        for numero, codigo, motivo in rechazos:
+            self._rechazar(progreso, escritor_rechazos, numero, codigo, motivo)
+
+    def _rechazar(self, progreso, escritor_rechazos, numero, codigo, motivo):
+        progreso['rechazados'] += 1
+        if escritor_rechazos:
+            escritor_rechazos.writerow([numero, codigo or '', motivo])
+        if self.rechazos_mostrados < MAX_RECHAZOS_MOSTRADOS:
+            self.stderr.write(f'Fila {numero} ({codigo or "sin código"}): {motivo}')
+            self.rechazos_mostrados += 1
@@ -0,0 +1,31 @@
+"""
+Comando para borrar las reservas de stock vencidas de T_Reserva en lotes pequeños.
+Ejecuta: python manage.py liberar_reservas
+Como proceso de fondo: python manage.py liberar_reservas --continuo --intervalo 60
+
+Las reservas vencidas ya no cuentan como reservadas aunque sigan en la tabla;
+este comando solo la mantiene pequeña.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.reservas import liberar_vencidas
+
+
+class Command(BaseCommand):
+    help = 'Borra las reservas de stock vencidas por lotes, con pausas para no bloquear la tabla'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='Reservas por DELETE (por defecto 500)')
+        parser.add_argument('--pausa', type=float, default=0.1, help='Segundos de espera entre lotes')
+        parser.add_argument('--continuo', action='store_true', help='Repetir la limpieza indefinidamente')
+        parser.add_argument('--intervalo', type=int, default=60, help='Segundos entre limpiezas en modo continuo')
+
+    def handle(self, *args, **options):
+        while True:
+            liberadas = liberar_vencidas(options['lote'], options['pausa'])
+            self.stdout.write(self.style.SUCCESS(f'[OK] {liberadas} reservas vencidas liberadas'))
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
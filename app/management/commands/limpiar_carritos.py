@@ -0,0 +1,81 @@
+"""
+Comando para cancelar carritos abandonados y borrar los cerrados antiguos de T_Carrito.
+Ejecuta: python manage.py limpiar_carritos
+Guardando lo borrado: python manage.py limpiar_carritos --archivar carritos.jsonl
+Como proceso de fondo: python manage.py limpiar_carritos --continuo --intervalo 3600
+
+Trabaja en lotes cortos por id_carrito (keyset) con pausas entre lotes, para no
+mantener bloqueos largos sobre la tabla en horario de atención.
+"""
+import datetime
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from app.carrito import expirar_abandonados, purgar_cerrados
+
+
+class Command(BaseCommand):
+    help = 'Cancela los carritos activos abandonados y borra por lotes los convertidos/cancelados antiguos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias-abandono', type=int, default=getattr(settings, 'CARRITO_DIAS_ABANDONO', 30),
+                            help='Días sin cambios para cancelar un carrito activo')
+        parser.add_argument('--dias-retencion', type=int, default=getattr(settings, 'CARRITO_DIAS_RETENCION', 90),
+                            help='Días que se conservan los carritos convertidos o cancelados')
+        parser.add_argument('--lote', type=int, default=500, help='Filas por sentencia (por defecto 500)')
+        parser.add_argument('--pausa', type=float, default=0.1, help='Segundos de espera entre lotes')
+        parser.add_argument('--archivar', help='Archivo JSONL donde agregar los carritos antes de borrarlos')
+        parser.add_argument('--continuo', action='store_true', help='Repetir la limpieza indefinidamente')
+        parser.add_argument('--intervalo', type=int, default=3600, help='Segundos entre limpiezas en modo continuo')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+        if options['dias_abandono'] < 1 or options['dias_retencion'] < 1:
+            raise CommandError('--dias-abandono y --dias-retencion deben ser mayores que 0')
+
+        while True:
+            self.limpiar(options)
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
+
+    def limpiar(self, options):
+        ahora = timezone.now()
+
+        inicio = time.monotonic()
+        cancelados = expirar_abandonados(
+            ahora - datetime.timedelta(days=options['dias_abandono']), options['lote'], options['pausa']
+        )
+        self._reportar(f'{cancelados} carritos abandonados cancelados', cancelados, inicio)
+
+        archivo = open(options['archivar'], 'a', encoding='utf-8') if options['archivar'] else None
+        try:
+            inicio = time.monotonic()
+            borrados = purgar_cerrados(
+                ahora - datetime.timedelta(days=options['dias_retencion']), options['lote'], options['pausa'],
+                archivar=self._archivador(archivo) if archivo else None,
+            )
+        finally:
+            if archivo:
+                archivo.close()
+        self._reportar(f'{borrados} carritos cerrados borrados', borrados, inicio)
+
+    def _archivador(self, archivo):
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+        def archivar(filas):
+            archivo.write(''.join(encoder.encode(fila) + '\n' for fila in filas))
+            # Lo archivado debe estar en disco antes del DELETE
+            archivo.flush()
+
+        return archivar
+
+    def _reportar(self, mensaje, filas, inicio):
+        duracion = time.monotonic() - inicio
+        velocidad = filas / duracion if duracion else filas
+        self.stdout.write(self.style.SUCCESS(f'[OK] {mensaje} en {duracion:.2f}s ({velocidad:.0f} filas/s)'))
@@ -0,0 +1,122 @@
+"""
+Comando para medir la memoria de la instantánea del catálogo (app/catalogo_memoria.py).
+Ejecuta (productos sintéticos, sin BD): python manage.py medir_catalogo_memoria --productos 100000
+Con los productos de la BD: python manage.py medir_catalogo_memoria --bd
+
+Informa bytes por producto y por 100.000 productos (medidos con tracemalloc:
+registros, textos, Decimal, fechas e índices), el tiempo de armar la
+instantánea y sus bitmaps de facetas, y el de servir una página con sus conteos.
+"""
+import datetime
+import random
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import catalogo_memoria, facetas
+from app.models import Producto
+from app.paginacion import TAMANO_PAGINA
+
+CATEGORIAS = ('Electrónica', 'Hogar', 'Ropa', 'Deportes', 'Libros', 'Juguetes', 'Belleza', 'Alimentos')
+
+
+def filas_sinteticas(cantidad, semilla=1):
+    """Tuplas como las de catalogo_memoria._filas, con textos de largo típico"""
+    aleatorio = random.Random(semilla)
+    base = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    for id_producto in range(1, cantidad + 1):
+        yield (
+            id_producto,
+            f'Producto {id_producto} {"x" * aleatorio.randint(10, 40)}',
+            'Descripción ' + 'y' * aleatorio.randint(60, 240),
+            aleatorio.choice(CATEGORIAS),
+            Decimal(aleatorio.randint(100, 500000)) / 100,
+            aleatorio.randint(0, 500),
+            f'https://imagenes.ejemplo.com/productos/{id_producto}.jpg',
+            base + datetime.timedelta(seconds=id_producto),
+            True,
+        )
+
+
+class Command(BaseCommand):
+    help = 'Mide memoria y tiempos de la instantánea del catálogo en memoria'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=100000, help='Productos sintéticos a generar')
+        parser.add_argument('--bd', action='store_true', help='Medir con los productos de la BD')
+
+    def handle(self, *args, **options):
+        if not options['bd'] and options['productos'] < 1:
+            raise CommandError('--productos debe ser mayor que 0')
+
+        if options['bd']:
+            def filas():
+                return catalogo_memoria._filas(Producto.objects.all())
+        else:
+            def filas():
+                return filas_sinteticas(options['productos'])
+
+        # Las filas se consumen de a una mientras se traza: queda lo que retiene
+        # la instantánea (los textos y valores que comparte con ellas incluidos)
+        tracemalloc.start()
+        antes = tracemalloc.get_traced_memory()[0]
+        instantanea = catalogo_memoria.Instantanea.desde_filas(filas())
+        retenido = tracemalloc.get_traced_memory()[0] - antes
+        tracemalloc.stop()
+
+        # El tiempo, sin tracemalloc ni la lectura de las filas
+        leidas = list(filas())
+        inicio = time.perf_counter()
+        catalogo_memoria.Instantanea.desde_filas(leidas)
+        armado = time.perf_counter() - inicio
+        del leidas
+
+        cantidad = len(instantanea.productos)
+        if not cantidad:
+            raise CommandError('No hay productos activos que medir')
+
+        tracemalloc.start()
+        antes = tracemalloc.get_traced_memory()[0]
+        indice = facetas.indice(instantanea)
+        retenido_facetas = tracemalloc.get_traced_memory()[0] - antes
+        tracemalloc.stop()
+        inicio = time.perf_counter()
+        facetas.IndiceFacetas(instantanea, facetas.rangos_precio())
+        armado_facetas = time.perf_counter() - inicio
+
+        categorias = [categoria for categoria, _ in instantanea.categorias()]
+        rangos = facetas.rangos_precio()
+        filtros = [
+            ('sin filtros', facetas.Filtros((), (), False, '')),
+            ('2 categorías + precio + stock, por precio', facetas.Filtros(
+                tuple(categorias[:2]), (rangos[0].clave, rangos[1].clave), True, 'precio',
+            )),
+        ]
+
+        por_producto = retenido / cantidad
+        self.stdout.write(f'Productos activos:      {cantidad}')
+        self.stdout.write(f'Memoria retenida:       {retenido / 1024 / 1024:.1f} MB')
+        self.stdout.write(f'Por producto:           {por_producto:.0f} bytes')
+        self.stdout.write(self.style.SUCCESS(
+            f'Por 100.000 productos:  {por_producto * 100000 / 1024 / 1024:.1f} MB'
+        ))
+        self.stdout.write(f'Armar la instantánea:   {armado * 1000:.0f} ms')
+        self.stdout.write(
+            f'Bitmaps de facetas:     {retenido_facetas / 1024 / 1024:.1f} MB, {armado_facetas * 1000:.0f} ms'
+        )
+        for nombre, filtro in filtros:
+            pagina = _medir(lambda: indice.pagina(filtro, None, TAMANO_PAGINA))
+            conteos = _medir(lambda: indice.facetas(filtro))
+            self.stdout.write(
+                f'{nombre}: página de {TAMANO_PAGINA} en {pagina * 1000000:.0f} µs, '
+                f'conteos de facetas en {conteos * 1000000:.0f} µs'
+            )
+
+
+def _medir(funcion, repeticiones=200):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones
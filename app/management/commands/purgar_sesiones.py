@@ -0,0 +1,44 @@
+"""
+Comando para eliminar sesiones expiradas de dbo.django_session en lotes pequeños.
+Ejecuta: python manage.py purgar_sesiones
+Como proceso de fondo: python manage.py purgar_sesiones --continuo --intervalo 600
+"""
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Elimina las sesiones expiradas por lotes, con pausas para no bloquear la tabla'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='Sesiones por DELETE (por defecto 500)')
+        parser.add_argument('--pausa', type=float, default=0.1, help='Segundos de espera entre lotes')
+        parser.add_argument('--continuo', action='store_true', help='Repetir la purga indefinidamente')
+        parser.add_argument('--intervalo', type=int, default=600, help='Segundos entre purgas en modo continuo')
+
+    def handle(self, *args, **options):
+        while True:
+            eliminadas = self.purgar(options['lote'], options['pausa'])
+            self.stdout.write(self.style.SUCCESS(f'[OK] {eliminadas} sesiones expiradas eliminadas'))
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
+
+    def purgar(self, lote, pausa):
+        ahora = timezone.now()
+        total = 0
+        while True:
+            # Cada lote es un DELETE corto por llave primaria (usa el índice de expire_date para buscar)
+            claves = list(
+                Session.objects.filter(expire_date__lt=ahora)
+                .values_list('session_key', flat=True)[:lote]
+            )
+            if not claves:
+                return total
+            eliminadas, _ = Session.objects.filter(session_key__in=claves).delete()
+            total += eliminadas
+            if pausa:
+                time.sleep(pausa)
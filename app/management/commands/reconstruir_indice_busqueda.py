@@ -0,0 +1,25 @@
+"""
+Comando para reconstruir el índice de búsqueda de productos.
+Ejecuta: python manage.py reconstruir_indice_busqueda
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.busqueda import BusquedaNoDisponible, reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero el índice de búsqueda de productos activos'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Reconstruyendo índice de búsqueda...')
+        inicio = time.monotonic()
+        try:
+            total = reconstruir_indice()
+        except BusquedaNoDisponible as e:
+            raise CommandError(f'No se pudo abrir el índice de búsqueda: {e}')
+        duracion = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'[OK] {total} productos indexados en {duracion:.2f}s'
+        ))
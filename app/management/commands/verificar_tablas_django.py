@@ -5,9 +5,13 @@ Ejecuta: python manage.py verificar_tablas_django
 from django.core.management.base import BaseCommand
 from django.db import connection
 
+from app.catalogo_memoria import INDICE_CATALOGO
+from app.historial_pedidos import INDICES_RECOMENDADOS
+from app.sql import tabla
+
 
 class Command(BaseCommand):
-    help = 'Verifica que las tablas del sistema de Django existan'
+    help = 'Verifica que las tablas del sistema de Django y los índices recomendados existan'
 
     def handle(self, *args, **options):
         self.stdout.write('Verificando tablas del sistema de Django...\n')
@@ -84,4 +88,53 @@ class Command(BaseCommand):
                     self.stdout.write(f'  - {row[1]} (schema: {row[0]})')
             else:
                 self.stdout.write(self.style.WARNING('  No se encontraron tablas django_*'))
+            
+            self._verificar_indices(cursor)
 
+    def _indices(self, cursor, modelo):
+        """{nombre: (columnas clave en orden, columnas incluidas)} de la tabla del modelo"""
+        if connection.vendor != 'microsoft':
+            restricciones = connection.introspection.get_constraints(cursor, modelo._meta.db_table)
+            return {nombre: (datos['columns'], set()) for nombre, datos in restricciones.items() if datos['index']}
+        cursor.execute("""
+            SELECT i.name, c.name, ic.is_included_column
+            FROM sys.indexes i
+            INNER JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+            INNER JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+            WHERE i.object_id = OBJECT_ID(%s)
+            ORDER BY i.name, ic.is_included_column, ic.key_ordinal
+        """, [modelo._meta.db_table])
+        indices = {}
+        for nombre, columna, incluida in cursor.fetchall():
+            clave, incluidas = indices.setdefault(nombre, ([], set()))
+            if incluida:
+                incluidas.add(columna)
+            else:
+                clave.append(columna)
+        return indices
+
+    def _verificar_indices(self, cursor):
+        self.stdout.write('\nÍndices recomendados:')
+        for indice in (*INDICES_RECOMENDADOS, INDICE_CATALOGO):
+            # Sirve cualquier índice cuyas primeras columnas sean las de la clave recomendada
+            existentes = self._indices(cursor, indice.modelo)
+            encontrado = next(
+                (nombre for nombre, (clave, _) in existentes.items()
+                 if tuple(clave[:len(indice.clave)]) == indice.clave),
+                None,
+            )
+            if encontrado is None:
+                incluir = f' INCLUDE ({", ".join(indice.incluidas)})' if indice.incluidas else ''
+                self.stdout.write(self.style.ERROR(
+                    f'[ERROR] {indice.modelo._meta.db_table} sin índice por ({", ".join(indice.clave)}). Crear con:\n'
+                    f'    CREATE INDEX {indice.nombre} ON {tabla(indice.modelo)} ({", ".join(indice.clave)}){incluir}'
+                ))
+                continue
+            faltantes = set(indice.incluidas) - set(existentes[encontrado][0]) - existentes[encontrado][1]
+            if faltantes and connection.vendor == 'microsoft':
+                self.stdout.write(self.style.WARNING(
+                    f'[AVISO] {encontrado} no cubre {", ".join(sorted(faltantes))}: '
+                    'la consulta tendrá que leer la tabla base'
+                ))
+            else:
+                self.stdout.write(f'[OK] {indice.modelo._meta.db_table}: {encontrado}')
@@ -0,0 +1,49 @@
+"""
+Utilidades compartidas por los comandos benchmark_*: percentiles y muestreo de
+memoria residente e hilos mientras se ejecuta una medición.
+"""
+import threading
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def rss_mb():
+    """Memoria residente actual del proceso en MB (pico histórico si no hay /proc)"""
+    try:
+        with open('/proc/self/statm') as archivo:
+            paginas = int(archivo.read().split()[1])
+        return paginas * 4096 / 1024 / 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Muestreo:
+    """Pico de memoria residente y de hilos mientras dura el bloque"""
+
+    def __init__(self, intervalo=0.05):
+        self.intervalo = intervalo
+        self.rss_max = 0.0
+        self.hilos_max = 0
+        self._fin = threading.Event()
+
+    def _muestrear(self):
+        while not self._fin.is_set():
+            self.rss_max = max(self.rss_max, rss_mb())
+            self.hilos_max = max(self.hilos_max, threading.active_count())
+            self._fin.wait(self.intervalo)
+
+    def __enter__(self):
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._fin.set()
+        self._hilo.join()
+        # Una última muestra por si el bloque duró menos que el intervalo
+        self.rss_max = max(self.rss_max, rss_mb())
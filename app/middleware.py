@@ -0,0 +1,91 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .presupuesto import ContadorConsultas, PresupuestoExcedido, contador_actual, estadisticas, obtener_presupuesto
+from .usuarios import obtener_usuario_actual
+
+logger = logging.getLogger(__name__)
+
+
+class PresupuestoConsultasMiddleware:
+    """
+    Cuenta las consultas SQL y el tiempo en BD de cada request, los acumula por
+    nombre de URL y compara contra el presupuesto declarado de la vista.
+    Funciona con WSGI y ASGI: el contador viaja en una ContextVar.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        contador = ContadorConsultas()
+        token = contador_actual.set(contador)
+        try:
+            response = self.get_response(request)
+        finally:
+            contador_actual.reset(token)
+        return self._registrar(request, response, contador)
+
+    async def __acall__(self, request):
+        contador = ContadorConsultas()
+        token = contador_actual.set(contador)
+        try:
+            response = await self.get_response(request)
+        finally:
+            contador_actual.reset(token)
+        return self._registrar(request, response, contador)
+
+    def _registrar(self, request, response, contador):
+        match = getattr(request, 'resolver_match', None)
+        if match is None or not match.url_name:
+            return response
+
+        presupuesto = obtener_presupuesto(match.url_name, match.func)
+        estadisticas.registrar(match.url_name, contador.consultas, contador.tiempo_db, presupuesto)
+
+        if settings.DEBUG:
+            response['Server-Timing'] = (
+                f'db;dur={contador.tiempo_db * 1000:.1f};desc="{contador.consultas} consultas"'
+            )
+
+        if presupuesto is not None and contador.consultas > presupuesto:
+            mensaje = (
+                f'La vista {match.url_name} ejecutó {contador.consultas} consultas '
+                f'(presupuesto: {presupuesto})'
+            )
+            if getattr(settings, 'PRESUPUESTO_CONSULTAS_ESTRICTO', False):
+                raise PresupuestoExcedido(mensaje)
+            logger.warning(mensaje)
+
+        return response
+
+
+class UsuarioActualMiddleware:
+    """
+    Agrega request.usuario: el Usuario de la sesión (o None), cargado de forma
+    perezosa la primera vez que se usa y como máximo una vez por request.
+    Debe ir después de SessionMiddleware.
+
+    En vistas async no se debe tocar request.usuario directamente: lo resuelve
+    @usuario_requerido en un hilo de BD (ver app/decorators.py).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.usuario = SimpleLazyObject(lambda: obtener_usuario_actual(request))
+        return self.get_response(request)
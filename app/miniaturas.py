@@ -0,0 +1,254 @@
+"""
+Miniaturas de imagen_producto en disco.
+
+imagen_producto es una URL (http/https) o una ruta bajo MEDIA_ROOT. El comando
+generar_miniaturas descarga o lee cada original una vez y escribe variantes
+redimensionadas a los anchos de MINIATURAS['ANCHOS'] (sin agrandar) en
+MEDIA_ROOT/miniaturas/, con el hash del contenido en el nombre:
+
+    miniaturas/3f/3f9a0c1d2e4b5a69-160.webp
+
+Como el nombre cambia si cambia la imagen, el servidor web puede servir
+/media/miniaturas/ con Cache-Control: public, max-age=31536000, immutable.
+
+manifiesto.json guarda, por cada imagen_producto, el hash, las dimensiones del
+original y los anchos generados. La etiqueta {% imagen_producto %} solo lee el
+manifiesto (nunca abre ni descarga imágenes durante el request) y arma
+<img srcset sizes loading="lazy">; si la imagen todavía no tiene variantes usa
+la URL original.
+
+Solo se descargan originales de los hosts de MINIATURAS['HOSTS'] (mismo
+formato que ALLOWED_HOSTS, '.ejemplo.com' incluye subdominios), sin seguir
+redirecciones a otro host y leyendo a lo sumo MINIATURAS['MAX_BYTES'].
+
+Pillow es opcional: sin él las páginas usan las URLs originales y el comando
+avisa que no puede generar.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import namedtuple
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.http.request import validate_host
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # dependencia opcional
+    Image = None
+
+DIRECTORIO = 'miniaturas'
+MINIATURAS_DEFECTO = {
+    'ANCHOS': (80, 160, 320, 640),
+    'FORMATO': 'WEBP',
+    'CALIDAD': 80,
+    # Hosts de los que se descargan originales remotos; vacío: solo rutas locales
+    'HOSTS': (),
+    # Límites para descargar originales remotos
+    'TIMEOUT': 10,
+    'MAX_BYTES': 15 * 1024 * 1024,
+}
+# Cada cuántos segundos se revisa si el manifiesto cambió en disco
+REVISION_MANIFIESTO = 5
+
+
+class ImagenNoDisponible(Exception):
+    """No se pudo leer o decodificar el original"""
+
+
+def config():
+    return {**MINIATURAS_DEFECTO, **getattr(settings, 'MINIATURAS', {})}
+
+
+def config_generacion():
+    """config() más las rutas de media, para pasar a generar() en otro proceso"""
+    return {**config(), 'MEDIA_ROOT': str(settings.MEDIA_ROOT), 'MEDIA_URL': settings.MEDIA_URL}
+
+
+def directorio():
+    return Path(settings.MEDIA_ROOT) / DIRECTORIO
+
+
+def ruta_manifiesto():
+    return directorio() / 'manifiesto.json'
+
+
+def extension(formato):
+    return {'WEBP': 'webp', 'JPEG': 'jpg'}[formato]
+
+
+def nombre_variante(entrada, ancho):
+    """Ruta relativa a MEDIA_ROOT de la variante de `ancho` px"""
+    digest = entrada['hash']
+    return f'{DIRECTORIO}/{digest[:2]}/{digest}-{ancho}.{extension(entrada["formato"])}'
+
+
+# --- Lectura (requests) -----------------------------------------------------------
+
+class _Manifiesto:
+    """Manifiesto en memoria; se recarga cuando cambia el archivo"""
+
+    def __init__(self):
+        self._entradas = {}
+        self._mtime = None
+        self._revisado = 0
+        self._lock = threading.Lock()
+
+    def entradas(self):
+        ahora = time.monotonic()
+        if ahora - self._revisado >= REVISION_MANIFIESTO:
+            with self._lock:
+                self._revisado = ahora
+                try:
+                    mtime = ruta_manifiesto().stat().st_mtime_ns
+                except FileNotFoundError:
+                    mtime = None
+                if mtime != self._mtime:
+                    self._entradas = leer_manifiesto() if mtime else {}
+                    self._mtime = mtime
+        return self._entradas
+
+    def version(self):
+        self.entradas()
+        return self._mtime or 0
+
+
+manifiesto = _Manifiesto()
+
+
+def leer_manifiesto():
+    try:
+        with open(ruta_manifiesto(), encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except FileNotFoundError:
+        return {}
+
+
+def escribir_manifiesto(entradas):
+    # Escritura atómica: los workers nunca leen un JSON a medias
+    ruta = ruta_manifiesto()
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=ruta.parent, delete=False, suffix='.tmp') as temporal:
+        json.dump(entradas, temporal, sort_keys=True)
+    os.replace(temporal.name, ruta)
+
+
+Variantes = namedtuple('Variantes', ['srcset', 'src', 'ancho', 'alto'])
+
+
+def variantes(origen, ancho_mostrado):
+    """
+    Variantes(srcset, src, ancho, alto) para `origen`, o None si no tiene
+    miniaturas. src es la menor variante que cubre ancho_mostrado; ancho y alto
+    son las dimensiones de src (para reservar el espacio y evitar saltos).
+    """
+    entrada = manifiesto.entradas().get(origen)
+    if not entrada or not entrada['anchos']:
+        return None
+    anchos = sorted(entrada['anchos'])
+    srcset = ', '.join(f'{settings.MEDIA_URL}{nombre_variante(entrada, ancho)} {ancho}w' for ancho in anchos)
+    ancho = next((ancho for ancho in anchos if ancho >= ancho_mostrado), anchos[-1])
+    alto = round(entrada['alto'] * ancho / entrada['ancho'])
+    return Variantes(srcset, f'{settings.MEDIA_URL}{nombre_variante(entrada, ancho)}', ancho, alto)
+
+
+# --- Generación (comando) -----------------------------------------------------------
+
+class _RedireccionMismoHost(urllib.request.HTTPRedirectHandler):
+    """Sigue redirecciones solo dentro del host del original"""
+
+    def __init__(self, host):
+        self.host = host
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        destino = urlsplit(newurl)
+        if destino.scheme not in ('http', 'https') or destino.hostname != self.host:
+            raise urllib.error.HTTPError(newurl, code, f'redirección a otro host: {newurl}', headers, fp)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def _descargar(origen, config):
+    host = urlsplit(origen).hostname
+    if not host or not validate_host(host, config['HOSTS']):
+        raise ImagenNoDisponible(f"{origen}: el host no está en MINIATURAS['HOSTS']")
+    abridor = urllib.request.build_opener(_RedireccionMismoHost(host))
+    try:
+        with abridor.open(origen, timeout=config['TIMEOUT']) as respuesta:
+            largo = respuesta.headers.get('Content-Length')
+            if largo and largo.isdigit() and int(largo) > config['MAX_BYTES']:
+                raise ImagenNoDisponible(f'{origen}: supera {config["MAX_BYTES"]} bytes')
+            datos = respuesta.read(config['MAX_BYTES'] + 1)
+    except (OSError, ValueError) as error:
+        raise ImagenNoDisponible(f'{origen}: {error}') from error
+    if len(datos) > config['MAX_BYTES']:
+        raise ImagenNoDisponible(f'{origen}: supera {config["MAX_BYTES"]} bytes')
+    return datos
+
+
+def _leer_original(origen, config):
+    if urlsplit(origen).scheme in ('http', 'https'):
+        return _descargar(origen, config)
+
+    # Ruta local: relativa a MEDIA_ROOT, con o sin el prefijo MEDIA_URL
+    relativa = origen.removeprefix(config['MEDIA_URL']).lstrip('/')
+    raiz = Path(config['MEDIA_ROOT']).resolve()
+    ruta = (raiz / relativa).resolve()
+    if raiz not in ruta.parents:
+        raise ImagenNoDisponible(f'{origen}: fuera de MEDIA_ROOT')
+    try:
+        return ruta.read_bytes()
+    except OSError as error:
+        raise ImagenNoDisponible(f'{origen}: {error}') from error
+
+
+def _guardar(imagen, ruta, formato, calidad):
+    if ruta.exists():
+        return
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    if formato == 'JPEG' and imagen.mode != 'RGB':
+        imagen = imagen.convert('RGB')
+    with tempfile.NamedTemporaryFile(dir=ruta.parent, delete=False, suffix='.tmp') as temporal:
+        imagen.save(temporal, formato, quality=calidad, optimize=True)
+    os.replace(temporal.name, ruta)
+
+
+def generar(origen, config):
+    """
+    Genera las variantes de `origen` y devuelve (origen, entrada del manifiesto).
+    Solo usa sus argumentos (config_generacion(), sin settings ni BD) para
+    poder ejecutarse en otro proceso.
+    """
+    datos = _leer_original(origen, config)
+    formato = config['FORMATO'].upper()
+    if formato == 'WEBP' and not features.check('webp'):
+        formato = 'JPEG'
+    digest = hashlib.sha256(datos).hexdigest()[:16]
+
+    try:
+        imagen = Image.open(io.BytesIO(datos))
+        # En JPEG, decodificar directamente a escala reducida
+        imagen.draft('RGB', (max(config['ANCHOS']), max(config['ANCHOS'])))
+        imagen = ImageOps.exif_transpose(imagen)
+        imagen.load()
+    except (OSError, Image.DecompressionBombError) as error:
+        raise ImagenNoDisponible(f'{origen}: {error}') from error
+    if imagen.mode not in ('RGB', 'RGBA'):
+        imagen = imagen.convert('RGBA' if 'A' in imagen.getbands() or 'transparency' in imagen.info else 'RGB')
+
+    ancho_original, alto_original = imagen.size
+    # Sin agrandar: los anchos mayores que el original se reemplazan por el original
+    anchos = sorted({min(ancho, ancho_original) for ancho in config['ANCHOS']})
+    entrada = {'hash': digest, 'ancho': ancho_original, 'alto': alto_original, 'formato': formato, 'anchos': anchos}
+    for ancho in anchos:
+        alto = max(1, round(alto_original * ancho / ancho_original))
+        variante = imagen if ancho == ancho_original else imagen.resize((ancho, alto), Image.LANCZOS)
+        _guardar(variante, Path(config['MEDIA_ROOT']) / nombre_variante(entrada, ancho), formato, config['CALIDAD'])
+    return origen, entrada
@@ -64,6 +64,23 @@ class Producto(models.Model):
     def __str__(self):
         return self.nombre_producto
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        producto = super().from_db(db, field_names, values)
+        # Categoría y activo originales, para ajustar el resumen de categorías al guardar (ver signals.py)
+        producto._estado_categoria = producto.estado_categoria()
+        return producto
+
+    def estado_categoria(self):
+        """
+        (categoria, activo), o None si no se conoce porque alguno de los campos
+        está diferido (no se fuerza una consulta para leerlo).
+        """
+        valores = self.__dict__
+        if 'categoria_producto' not in valores or 'activo_producto' not in valores:
+            return None
+        return (valores['categoria_producto'] or '', bool(valores['activo_producto']))
+
 # Modelo Carrito - coincide con T_Carrito
 class Carrito(models.Model):
     ESTADO_CHOICES = [
@@ -91,8 +108,8 @@ class Carrito(models.Model):
     def __str__(self):
         return f"Carrito {self.id_carrito} - {self.id_usuario}"
 
-# Modelo Pedido - coincide con T_Pedido (fusiona Pedido + DetallePedido + Pago)
-class Pedido(models.Model):
+# Columnas de T_Pedido, compartidas con el archivo T_PedidoArchivo
+class PedidoBase(models.Model):
     ESTADO_CHOICES = [
         ('pendiente', 'Pendiente'),
         ('pagado', 'Pagado'),
@@ -120,11 +137,55 @@ class Pedido(models.Model):
     fecha_pedido_pedido = models.DateTimeField(auto_now_add=True, db_column='fecha_pedido_pedido')
     estado_pedido = models.CharField(max_length=50, default='pendiente', choices=ESTADO_CHOICES, db_column='estado_pedido')
 
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return f"Pedido {self.id_pedido} - {self.id_usuario}"
+
+# Modelo Pedido - coincide con T_Pedido (fusiona Pedido + DetallePedido + Pago)
+class Pedido(PedidoBase):
     class Meta:
         managed = False
         db_table = 'SC_TiendaOline.T_Pedido'
         verbose_name = 'Pedido'
         verbose_name_plural = 'Pedidos'
 
+# Modelo PedidoArchivado - coincide con T_PedidoArchivo
+# Pedidos entregados hace más de PEDIDOS_DIAS_ARCHIVO días, movidos desde T_Pedido
+# por el comando archivar_pedidos. Conserva el id_pedido original y el subtotal
+# (aquí es una columna normal, no calculada).
+class PedidoArchivado(PedidoBase):
+    id_pedido = models.IntegerField(primary_key=True, db_column='id_pedido')
+    # El archivo es el historial que se conserva: borrar un usuario, dirección o
+    # producto con pedidos archivados se rechaza (ProtectedError) en vez de borrarlos
+    id_usuario = models.ForeignKey(Usuario, on_delete=models.PROTECT, db_column='id_usuario')
+    id_direccion = models.ForeignKey(Direccion, on_delete=models.PROTECT, db_column='id_direccion')
+    id_producto = models.ForeignKey(Producto, on_delete=models.PROTECT, db_column='id_producto')
+    fecha_pedido_pedido = models.DateTimeField(db_column='fecha_pedido_pedido')
+
+    class Meta:
+        managed = False
+        db_table = 'SC_TiendaOline.T_PedidoArchivo'
+        verbose_name = 'Pedido archivado'
+        verbose_name_plural = 'Pedidos archivados'
+
+# Modelo Reserva - coincide con T_Reserva (unidades apartadas por los carritos activos)
+# Una fila por (usuario, producto) con la cantidad total del carrito; vence después de
+# settings.RESERVA_MINUTOS y deja de contar aunque todavía no se haya borrado.
+class Reserva(models.Model):
+    id_reserva = models.AutoField(primary_key=True, db_column='id_reserva')
+    id_usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, db_column='id_usuario')
+    id_producto = models.ForeignKey(Producto, on_delete=models.CASCADE, db_column='id_producto')
+    cantidad_reserva = models.IntegerField(validators=[MinValueValidator(1)], db_column='cantidad_reserva')
+    vence_reserva = models.DateTimeField(db_column='vence_reserva')
+
+    class Meta:
+        managed = False
+        db_table = 'SC_TiendaOline.T_Reserva'
+        unique_together = [('id_usuario', 'id_producto')]
+        verbose_name = 'Reserva'
+        verbose_name_plural = 'Reservas'
+
     def __str__(self):
-        return f"Pedido {self.id_pedido} - {self.id_usuario}"
+        return f"Reserva {self.id_reserva} - {self.id_producto_id} x {self.cantidad_reserva}"
@@ -0,0 +1,100 @@
+import base64
+import datetime
+import decimal
+import json
+from collections import namedtuple
+
+from django.db.models import Q
+
+# Resultado de una página: los objetos, el cursor de la siguiente y si hay más
+PaginaKeyset = namedtuple('PaginaKeyset', ['items', 'siguiente_cursor', 'hay_mas'])
+
+TAMANO_PAGINA = 24
+TAMANO_PAGINA_MAXIMO = 100
+
+
+class _CursorEncoder(json.JSONEncoder):
+    # A diferencia de DjangoJSONEncoder conserva los microsegundos: el cursor debe ser exacto
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date)):
+            return o.isoformat()
+        if isinstance(o, decimal.Decimal):
+            return str(o)
+        return super().default(o)
+
+
+def codificar_cursor(valores):
+    """Convierte los valores de la clave de orden en un token seguro para URL"""
+    datos = json.dumps(valores, cls=_CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, cantidad):
+    """Devuelve la lista de valores del cursor, o None si es inválido"""
+    if not cursor:
+        return None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(valores, list) or len(valores) != cantidad:
+        return None
+    return valores
+
+
+def _filtro_despues_de(orden, valores):
+    """
+    Condición "fila después del cursor" para un orden de varias columnas:
+    (a > x) OR (a = x AND b > y) ... Usa el índice, nunca OFFSET.
+    """
+    condicion = Q()
+    for i, campo in enumerate(orden):
+        nombre = campo.lstrip('-')
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        parte = Q(**{f'{nombre}__{operador}': valores[i]})
+        for anterior, valor in zip(orden[:i], valores[:i]):
+            parte &= Q(**{anterior.lstrip('-'): valor})
+        condicion |= parte
+    return condicion
+
+
+def tamano_pagina(valor, defecto=TAMANO_PAGINA):
+    """Lee el tamaño de página de un parámetro GET, acotado a TAMANO_PAGINA_MAXIMO"""
+    try:
+        tamano = int(valor)
+    except (TypeError, ValueError):
+        return defecto
+    return max(1, min(tamano, TAMANO_PAGINA_MAXIMO))
+
+
+def valor_campo(fila, campo):
+    """Valor de `campo` en un objeto del modelo o en un dict de values()"""
+    return fila[campo] if isinstance(fila, dict) else getattr(fila, campo)
+
+
+def paginar_keyset(queryset, orden, cursor=None, tamano=TAMANO_PAGINA):
+    """
+    Pagina un queryset por clave (keyset/cursor) en lugar de OFFSET.
+
+    `orden` es la lista de campos de ordenamiento (con '-' para descendente);
+    el último debe ser único (normalmente la llave primaria) y ninguno puede ser nulo.
+    Se lee una fila extra para saber si hay otra página. Acepta querysets de
+    values(), que deben incluir los campos de `orden`.
+    """
+    queryset = queryset.order_by(*orden)
+    valores = decodificar_cursor(cursor, len(orden))
+    if valores is not None:
+        queryset = queryset.filter(_filtro_despues_de(orden, valores))
+
+    filas = list(queryset[:tamano + 1])
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+
+    siguiente_cursor = None
+    if hay_mas:
+        ultima = filas[-1]
+        siguiente_cursor = codificar_cursor([
+            valor_campo(ultima, campo.lstrip('-')) for campo in orden
+        ])
+    return PaginaKeyset(filas, siguiente_cursor, hay_mas)
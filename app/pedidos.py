@@ -0,0 +1,143 @@
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from .cache_catalogo import incrementar_version_catalogo
+from .models import Carrito, Pedido, Producto
+from .reservas import anotar_disponible, consumir, reservado
+from .sql import tabla
+
+# Productos por sentencia en el checkout: cada uno agrega unos 5 parámetros al
+# UPDATE de stock y SQL Server acepta como máximo 2100 por sentencia
+LOTE_PRODUCTOS = 300
+
+
+def _lotes(valores, tamano=LOTE_PRODUCTOS):
+    valores = list(valores)
+    for inicio in range(0, len(valores), tamano):
+        yield valores[inicio:inicio + tamano]
+
+
+class CheckoutError(Exception):
+    """Error al convertir el carrito en pedido; la transacción se revierte"""
+
+
+class StockInsuficienteError(CheckoutError):
+    """Uno o más productos no tienen stock para la cantidad solicitada"""
+
+    def __init__(self, productos):
+        self.productos = productos
+        if productos:
+            nombres = ', '.join(p.nombre_producto for p in productos)
+            super().__init__(f'No hay suficiente stock para {nombres}')
+        else:
+            super().__init__('No hay suficiente stock disponible')
+
+
+def _descontar_stock(cantidades, usuario_id):
+    """
+    Descuenta el stock con un UPDATE condicional por cada LOTE_PRODUCTOS productos:
+    SET stock = stock - cantidad WHERE stock - reservado por otros >= cantidad.
+    Las unidades reservadas por el propio usuario son las que se compran.
+    Devuelve el número de filas afectadas.
+
+    update() no dispara señales: al confirmar se cambia aquí la versión del
+    catálogo, para que las páginas en cache, los ETag de la API y el filtro
+    "con stock" muestren el stock nuevo.
+    """
+    reservado_otros = reservado(usuario_id)
+    ahora = timezone.now()
+    afectados = 0
+    for lote in _lotes(cantidades.items()):
+        condicion = Q()
+        casos = []
+        for producto_id, cantidad in lote:
+            condicion |= Q(id_producto=producto_id, stock_producto__gte=Value(cantidad) + reservado_otros)
+            casos.append(When(id_producto=producto_id, then=Value(cantidad)))
+
+        # fecha_actualizacion para que el catálogo en memoria vea el nuevo stock (ver catalogo_memoria)
+        afectados += Producto.objects.filter(condicion).update(
+            stock_producto=F('stock_producto') - Case(*casos, default=Value(0), output_field=IntegerField()),
+            fecha_actualizacion_producto=ahora,
+        )
+    if afectados:
+        transaction.on_commit(incrementar_version_catalogo)
+    return afectados
+
+
+def _productos_sin_stock(cantidades, usuario_id):
+    sin_stock = []
+    for lote in _lotes(cantidades):
+        productos = anotar_disponible(
+            Producto.objects.filter(id_producto__in=lote).only(
+                'id_producto', 'nombre_producto', 'stock_producto'
+            ),
+            usuario_id,
+        )
+        sin_stock.extend(p for p in productos if p.disponible_producto < cantidades[p.id_producto])
+    return sin_stock
+
+
+def confirmar_pedido(usuario, direccion, metodo_pago, referencia_transaccion, carritos):
+    """
+    Convierte los items del carrito en pedidos: un UPDATE de stock y un DELETE de
+    las reservas del usuario (que pasan a ser descuento de stock) por cada
+    LOTE_PRODUCTOS productos, un INSERT ... SELECT de las líneas del pedido y un
+    UPDATE del estado del carrito. Estos dos toman las líneas activas del usuario
+    sin listar sus ids, así que el número de parámetros no crece con el carrito.
+
+    La sobreventa se detecta por el número de filas afectadas en el UPDATE de stock;
+    si no coincide se lanza StockInsuficienteError y no se guarda nada. Si las
+    líneas activas ya no son las leídas (otra pestaña agregó o quitó una), el
+    número de filas del INSERT o del UPDATE del carrito no coincide y se lanza
+    CheckoutError.
+    """
+    cantidades = defaultdict(int)
+    for carrito in carritos:
+        cantidades[carrito.id_producto_id] += carrito.cantidad_carrito
+    lineas = len(carritos)
+
+    try:
+        with transaction.atomic():
+            if _descontar_stock(cantidades, usuario.id_usuario) != len(cantidades):
+                raise StockInsuficienteError([])
+
+            # subtotal_pedido es columna calculada en SQL Server, no se incluye en el INSERT.
+            # Descuento 0 por ahora, así que el monto total es el subtotal del carrito.
+            with connection.cursor() as cursor:
+                cursor.execute(f"""
+                    INSERT INTO {tabla(Pedido)}
+                    (id_usuario, id_direccion, id_producto, cantidad_pedido, precio_unitario_pedido,
+                     descuento_pedido, monto_total_pedido, metodo_pago_pedido, referencia_transaccion_pedido,
+                     fecha_pedido_pedido, estado_pedido)
+                    SELECT id_usuario, %s, id_producto, cantidad_carrito, precio_unitario_carrito,
+                           0, subtotal_carrito, %s, %s, %s, %s
+                    FROM {tabla(Carrito)}
+                    WHERE id_usuario = %s AND estado_carrito = %s
+                """, [
+                    direccion.id_direccion,
+                    metodo_pago,
+                    referencia_transaccion if referencia_transaccion else None,
+                    timezone.now(),
+                    'pendiente',
+                    usuario.id_usuario,
+                    'activo',
+                ])
+                insertados = cursor.rowcount
+
+            # Usar update() para evitar modificar subtotal_carrito (columna calculada)
+            convertidos = Carrito.objects.filter(
+                id_usuario=usuario.id_usuario,
+                estado_carrito='activo'
+            ).update(estado_carrito='convertido', fecha_actualizacion_carrito=timezone.now())
+
+            if insertados != lineas or convertidos != lineas:
+                raise CheckoutError('Tu carrito cambió mientras se procesaba el pedido, intenta de nuevo')
+
+            for lote in _lotes(cantidades):
+                consumir(usuario.id_usuario, lote)
+    except StockInsuficienteError:
+        # La transacción ya se revirtió; solo se consulta para informar qué productos fallaron
+        raise StockInsuficienteError(_productos_sin_stock(cantidades, usuario.id_usuario)) from None
@@ -0,0 +1,123 @@
+"""
+Presupuesto de consultas por vista.
+
+Cada vista declara cuántas consultas SQL puede ejecutar con @presupuesto_consultas(n)
+(o en settings.PRESUPUESTO_CONSULTAS = {'nombre_url': n}). El middleware
+PresupuestoConsultasMiddleware cuenta las consultas y el tiempo en BD de cada
+request, acumula estadísticas por nombre de URL y avisa cuando se excede el
+presupuesto. Con settings.PRESUPUESTO_CONSULTAS_ESTRICTO = True (pensado para
+las pruebas) se lanza PresupuestoExcedido y la prueba falla.
+
+El contador del request viaja en la ContextVar contador_actual, así que también
+cuenta las consultas que una vista async ejecuta en otros hilos (ver app/async_db.py).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+
+
+class PresupuestoExcedido(AssertionError):
+    """Una vista ejecutó más consultas de las declaradas"""
+
+
+def presupuesto_consultas(maximo):
+    """Declara el número máximo de consultas SQL que puede ejecutar una vista"""
+    def decorador(vista):
+        vista.presupuesto_consultas = maximo
+        return vista
+    return decorador
+
+
+def obtener_presupuesto(nombre_url, vista):
+    configurados = getattr(settings, 'PRESUPUESTO_CONSULTAS', {})
+    if nombre_url in configurados:
+        return configurados[nombre_url]
+    return getattr(vista, 'presupuesto_consultas', None)
+
+
+class ContadorConsultas:
+    """execute_wrapper que cuenta consultas y mide el tiempo en la BD"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_db = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo_db += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+# Contador del request en curso; sync_to_async lo copia a los hilos de BD
+contador_actual = ContextVar('contador_consultas', default=None)
+
+
+def contar_en_contexto(execute, sql, params, many, context):
+    """execute_wrapper permanente que delega en el contador del request actual"""
+    contador = contador_actual.get()
+    if contador is None:
+        return execute(sql, params, many, context)
+    return contador(execute, sql, params, many, context)
+
+
+def instalar_contador(conexion):
+    """Agrega contar_en_contexto a la conexión (una vez por hilo y alias)"""
+    if contar_en_contexto not in conexion.execute_wrappers:
+        conexion.execute_wrappers.append(contar_en_contexto)
+
+
+@contextmanager
+def contar_consultas():
+    """Cuenta las consultas ejecutadas dentro del bloque: with contar_consultas() as c: ..."""
+    contador = ContadorConsultas()
+    with connection.execute_wrapper(contador):
+        yield contador
+
+
+class _Estadisticas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_url = {}
+
+    def registrar(self, nombre_url, consultas, tiempo_db, presupuesto):
+        with self._lock:
+            datos = self._por_url.setdefault(nombre_url, {
+                'requests': 0,
+                'consultas_total': 0,
+                'consultas_max': 0,
+                'tiempo_db_total': 0.0,
+                'presupuesto': presupuesto,
+                'excedidos': 0,
+            })
+            datos['requests'] += 1
+            datos['consultas_total'] += consultas
+            datos['consultas_max'] = max(datos['consultas_max'], consultas)
+            datos['tiempo_db_total'] += tiempo_db
+            datos['presupuesto'] = presupuesto
+            if presupuesto is not None and consultas > presupuesto:
+                datos['excedidos'] += 1
+
+    def resumen(self):
+        """Copia de las estadísticas por nombre de URL, con promedios"""
+        with self._lock:
+            resultado = {}
+            for nombre_url, datos in self._por_url.items():
+                fila = dict(datos)
+                fila['consultas_promedio'] = datos['consultas_total'] / datos['requests']
+                fila['tiempo_db_promedio_ms'] = datos['tiempo_db_total'] * 1000 / datos['requests']
+                resultado[nombre_url] = fila
+            return resultado
+
+    def reiniciar(self):
+        with self._lock:
+            self._por_url.clear()
+
+
+estadisticas = _Estadisticas()
@@ -0,0 +1,147 @@
+"""
+Reservas de stock con vencimiento para los carritos.
+
+Al agregar o cambiar la cantidad de un producto en el carrito se aparta esa
+cantidad en T_Reserva (una fila por usuario y producto) por RESERVA_MINUTOS.
+Disponible = stock_producto - unidades reservadas por reservas vigentes; la
+comparación se hace dentro de la misma sentencia que escribe la reserva, así que
+el rechazo ocurre en el carrito y no después, en el checkout.
+
+Las reservas vencidas dejan de contar de inmediato (todas las consultas filtran
+por vence_reserva) y se borran por lotes con el comando liberar_reservas. El
+checkout descuenta el stock respetando las reservas de los demás usuarios y
+borra las propias en la misma transacción.
+
+El UPDATE de stock del checkout sigue siendo la verificación definitiva: dos
+reservas simultáneas del último par de unidades pueden pasar ambas, pero solo
+una de las compras.
+"""
+import contextlib
+import datetime
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Producto, Reserva
+from .sql import tabla
+
+RESERVA_MINUTOS_DEFECTO = 15
+
+
+def duracion_reserva():
+    return datetime.timedelta(minutes=getattr(settings, 'RESERVA_MINUTOS', RESERVA_MINUTOS_DEFECTO))
+
+
+def reservado(excluir_usuario_id=None, ahora=None):
+    """
+    Subquery con las unidades reservadas (vigentes) del producto de la consulta
+    externa; excluir_usuario_id omite las del propio usuario.
+    """
+    reservas = Reserva.objects.filter(
+        id_producto=OuterRef('id_producto'),
+        vence_reserva__gt=ahora or timezone.now(),
+    )
+    if excluir_usuario_id is not None:
+        reservas = reservas.exclude(id_usuario_id=excluir_usuario_id)
+    total = reservas.order_by().values('id_producto').annotate(total=Sum('cantidad_reserva')).values('total')
+    return Coalesce(Subquery(total, output_field=IntegerField()), Value(0))
+
+
+def anotar_disponible(productos, usuario_id=None, ahora=None):
+    """Agrega disponible_producto = stock - reservado por los demás usuarios"""
+    return productos.annotate(
+        disponible_producto=F('stock_producto') - reservado(usuario_id, ahora)
+    )
+
+
+def disponibles(producto_ids, usuario_id=None):
+    """{id_producto: unidades disponibles para usuario_id} en una sola consulta"""
+    return dict(
+        anotar_disponible(Producto.objects.filter(id_producto__in=list(producto_ids)), usuario_id)
+        .values_list('id_producto', 'disponible_producto')
+    )
+
+
+# Unidades libres del producto sin contar la reserva del propio usuario
+_DISPONIBLE = """
+    (SELECT p.stock_producto FROM {productos} p WHERE p.id_producto = %s)
+    - COALESCE((SELECT SUM(o.cantidad_reserva) FROM {reservas} o
+                WHERE o.id_producto = %s AND o.id_usuario <> %s AND o.vence_reserva > %s), 0)
+"""
+
+
+def reservar(usuario_id, producto_id, cantidad):
+    """
+    Fija la reserva del usuario para el producto en `cantidad` unidades (la
+    cantidad total del carrito) y renueva el vencimiento. Devuelve False, sin
+    modificar nada, si no hay suficientes unidades disponibles.
+    """
+    ahora = timezone.now()
+    vence = ahora + duracion_reserva()
+    disponible = _DISPONIBLE.format(productos=tabla(Producto), reservas=tabla(Reserva))
+    params_disponible = [producto_id, producto_id, usuario_id, ahora]
+
+    actualizar = f"""
+        UPDATE {tabla(Reserva)} SET cantidad_reserva = %s, vence_reserva = %s
+        WHERE id_usuario = %s AND id_producto = %s AND {disponible} >= %s
+    """
+    params_actualizar = [cantidad, vence, usuario_id, producto_id, *params_disponible, cantidad]
+
+    with connection.cursor() as cursor:
+        cursor.execute(actualizar, params_actualizar)
+        if cursor.rowcount:
+            return True
+        # Dentro de una transacción, un savepoint para que el IntegrityError solo revierta el INSERT
+        savepoint = transaction.atomic() if connection.in_atomic_block else contextlib.nullcontext()
+        try:
+            with savepoint:
+                cursor.execute(f"""
+                    INSERT INTO {tabla(Reserva)} (id_usuario, id_producto, cantidad_reserva, vence_reserva)
+                    SELECT %s, %s, %s, %s
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM {tabla(Reserva)} r WHERE r.id_usuario = %s AND r.id_producto = %s
+                    ) AND {disponible} >= %s
+                """, [usuario_id, producto_id, cantidad, vence, usuario_id, producto_id,
+                      *params_disponible, cantidad])
+                return cursor.rowcount > 0
+        except IntegrityError:
+            # Otra petición del mismo usuario insertó la reserva primero
+            cursor.execute(actualizar, params_actualizar)
+            return cursor.rowcount > 0
+
+
+def liberar(usuario_id, producto_id):
+    """Borra la reserva del usuario para el producto (item eliminado del carrito)"""
+    Reserva.objects.filter(id_usuario_id=usuario_id, id_producto_id=producto_id).delete()
+
+
+def renovar(usuario_id):
+    """Extiende el vencimiento de las reservas vigentes del usuario (al entrar al checkout)"""
+    ahora = timezone.now()
+    return Reserva.objects.filter(id_usuario_id=usuario_id, vence_reserva__gt=ahora).update(
+        vence_reserva=ahora + duracion_reserva()
+    )
+
+
+def consumir(usuario_id, producto_ids):
+    """Borra las reservas que el checkout convirtió en descuento de stock"""
+    return Reserva.objects.filter(id_usuario_id=usuario_id, id_producto_id__in=list(producto_ids)).delete()[0]
+
+
+def liberar_vencidas(lote=500, pausa=0):
+    """Borra las reservas vencidas en DELETE cortos por llave primaria; devuelve el total"""
+    ahora = timezone.now()
+    total = 0
+    while True:
+        ids = list(
+            Reserva.objects.filter(vence_reserva__lte=ahora).values_list('id_reserva', flat=True)[:lote]
+        )
+        if not ids:
+            return total
+        total += Reserva.objects.filter(id_reserva__in=ids, vence_reserva__lte=ahora).delete()[0]
+        if pausa:
+            time.sleep(pausa)
@@ -0,0 +1,108 @@
+"""
+Motor de sesiones con cache y escritura a la BD solo cuando hace falta.
+
+Uso: SESSION_ENGINE = 'app.sesiones' y SESSION_CACHE_ALIAS = 'sesiones'.
+
+La sesión completa vive en la cache configurada (LocMem en desarrollo, archivo
+o memcached con varios workers). En dbo.django_session solo se escribe cuando
+cambian las claves que deben sobrevivir a una pérdida de la cache
+(settings.SESION_CLAVES_PERSISTENTES, p. ej. usuario_id) o cuando la fila está
+por expirar. Las sesiones anónimas nunca tocan la BD.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+CLAVES_PERSISTENTES_DEFECTO = ('usuario_id', 'usuario_nombre', 'usuario_rol')
+
+
+def _claves_persistentes():
+    return getattr(settings, 'SESION_CLAVES_PERSISTENTES', CLAVES_PERSISTENTES_DEFECTO)
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = 'app.sesiones.'
+
+    @property
+    def _clave_estado_db(self):
+        # Huella de lo escrito en la BD y cuándo expira la fila
+        return self.cache_key + ':db'
+
+    @staticmethod
+    def _huella(datos):
+        persistentes = {k: datos[k] for k in _claves_persistentes() if k in datos}
+        if not persistentes:
+            return None
+        contenido = json.dumps(persistentes, sort_keys=True, default=str)
+        return hashlib.sha1(contenido.encode()).hexdigest()
+
+    def exists(self, session_key):
+        # Solo se usa al elegir una clave nueva: con 32 caracteres aleatorios basta
+        # la cache, sin el SELECT en la BD que haría cached_db para cada sesión anónima
+        return self.cache_key_prefix + session_key in self._cache
+
+    def load(self):
+        try:
+            datos = self._cache.get(self.cache_key)
+        except Exception:
+            datos = None
+        if datos is not None:
+            return datos
+
+        datos = super().load()
+        if datos:
+            # Vino de la BD: lo que hay en la BD es exactamente esto
+            self._recordar_estado_db(datos)
+        return datos
+
+    def _recordar_estado_db(self, datos):
+        estado = (self._huella(datos), time.time() + self.get_expiry_age())
+        self._cache.set(self._clave_estado_db, estado, self.get_expiry_age())
+
+    def _necesita_bd(self, datos, estado):
+        huella = self._huella(datos)
+        if estado is None:
+            # Nada escrito en la BD (o se perdió el registro): solo si hay datos persistentes
+            return huella is not None
+        huella_db, expira_db = estado
+        if huella != huella_db:
+            return True
+        # Renovar la fila antes de que expire, a mitad de su vida útil
+        return huella is not None and time.time() > expira_db - self.get_expiry_age() / 2
+
+    def _guardar_en_bd(self, must_create, estado):
+        if must_create or estado is None:
+            # Puede que la fila aún no exista (la sesión era solo de cache)
+            try:
+                super().save(must_create=True)
+                return
+            except CreateError:
+                if must_create:
+                    raise
+        super().save(must_create=False)
+
+    def save(self, must_create=False):
+        datos = self._get_session(no_load=must_create)
+        estado = None if must_create else self._cache.get(self._clave_estado_db)
+        if self._necesita_bd(datos, estado):
+            self._guardar_en_bd(must_create, estado)
+            self._recordar_estado_db(datos)
+            return
+
+        # Solo cache: must_create usa add() para no pisar una sesión existente
+        if must_create:
+            if not self._cache.add(self.cache_key, datos, self.get_expiry_age()):
+                raise CreateError
+        else:
+            self._cache.set(self.cache_key, datos, self.get_expiry_age())
+
+    def delete(self, session_key=None):
+        if session_key is None and self.session_key is None:
+            return
+        clave = self.cache_key_prefix + (session_key or self.session_key) + ':db'
+        super().delete(session_key)
+        self._cache.delete(clave)
@@ -0,0 +1,57 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import busqueda
+from .cache_catalogo import incrementar_version_catalogo
+from .categorias import ajustar_categorias, invalidar_categorias
+from .models import Producto, Usuario
+from .presupuesto import instalar_contador
+from .usuarios import invalidar_usuario
+
+
+@receiver(post_save, sender=Producto)
+def producto_guardado(sender, instance, created, update_fields, **kwargs):
+    """Mantiene índice de búsqueda, resumen de categorías y cache del catálogo al crear o editar"""
+    transaction.on_commit(lambda: busqueda.indexar_producto(instance))
+    transaction.on_commit(incrementar_version_catalogo)
+
+    if update_fields is not None and not update_fields & {'categoria_producto', 'activo_producto'}:
+        return
+    # El estado original lo guarda Producto.from_db; None si no vino de la BD o tenía campos diferidos
+    anterior = None if created else getattr(instance, '_estado_categoria', None)
+    nuevo = instance.estado_categoria()
+    instance._estado_categoria = nuevo
+    if not created and anterior is None:
+        # No se conocía el estado original
+        transaction.on_commit(invalidar_categorias)
+    else:
+        transaction.on_commit(lambda: ajustar_categorias(anterior, nuevo))
+
+
+@receiver(post_delete, sender=Producto)
+def producto_eliminado(sender, instance, **kwargs):
+    id_producto = instance.id_producto
+    transaction.on_commit(lambda: busqueda.eliminar_producto(id_producto))
+    transaction.on_commit(incrementar_version_catalogo)
+
+    anterior = instance.estado_categoria()
+    if anterior is None:
+        transaction.on_commit(invalidar_categorias)
+    else:
+        transaction.on_commit(lambda: ajustar_categorias(anterior, None))
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def usuario_modificado(sender, instance, **kwargs):
+    """Quita de la cache el usuario para que request.usuario no quede desactualizado"""
+    id_usuario = instance.id_usuario
+    transaction.on_commit(lambda: invalidar_usuario(id_usuario))
+
+
+@receiver(connection_created)
+def conexion_creada(sender, connection, **kwargs):
+    # Cada hilo tiene su propia conexión: contar también las de los hilos de BD async
+    instalar_contador(connection)
@@ -0,0 +1,13 @@
+from django.db import connection
+
+
+def tabla(modelo):
+    """
+    Nombre de tabla citado para usar en SQL directo.
+    En SQL Server 'SC_TiendaOline.T_Carrito' se convierte en [SC_TiendaOline].[T_Carrito];
+    en otros motores (SQLite local) se cita como un solo identificador, igual que el ORM.
+    """
+    nombre = modelo._meta.db_table
+    if connection.vendor == 'microsoft':
+        return '.'.join(f'[{parte}]' for parte in nombre.split('.'))
+    return connection.ops.quote_name(nombre)
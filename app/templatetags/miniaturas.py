@@ -0,0 +1,36 @@
+"""
+{% imagen_producto p.imagen_producto p.nombre_producto 300 class="product-img" %}
+
+<img> con srcset de las miniaturas generadas (ver app/miniaturas.py), sizes
+según el ancho mostrado y loading="lazy". Sin miniaturas usa la URL original,
+y sin imagen la imagen local de reemplazo.
+"""
+from django import template
+from django.forms.utils import flatatt
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from app import miniaturas
+
+register = template.Library()
+
+
+@register.simple_tag
+def imagen_producto(origen, alt='', ancho=300, sizes=None, **atributos):
+    """`ancho`: px CSS en que se muestra; `sizes` lo reemplaza si el ancho depende del viewport"""
+    atributos = {'alt': alt, 'loading': 'lazy', 'decoding': 'async', **atributos}
+    encontradas = miniaturas.variantes(origen, ancho) if origen else None
+    if encontradas:
+        atributos.update(
+            src=encontradas.src, srcset=encontradas.srcset, sizes=sizes or f'{ancho}px',
+            width=encontradas.ancho, height=encontradas.alto,
+        )
+    else:
+        atributos['src'] = origen or static('app/img/sin-imagen.svg')
+    return format_html('<img{}>', flatatt(atributos))
+
+
+@register.simple_tag
+def version_miniaturas():
+    """Cambia cada vez que se regenera el manifiesto; para las llaves de {% cache %}"""
+    return miniaturas.manifiesto.version()
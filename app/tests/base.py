@@ -0,0 +1,161 @@
+"""
+Base común de las pruebas.
+
+Las tablas de la tienda no son administradas por Django: se crean sobre la BD de
+pruebas SQLite con el mismo esquema que benchmark_tienda (de ahí TIENDA_DB=sqlite).
+Cada clase usa caches locales vacías en cada prueba, sin la instantánea del
+catálogo en memoria, y su propio índice de búsqueda en un directorio temporal.
+
+Ejecuta: TIENDA_DB=sqlite python manage.py test app
+"""
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .. import busqueda, catalogo_memoria
+from ..management.commands.benchmark_tienda import DDL_CARRITO, DDL_PEDIDO
+from ..models import Carrito, Direccion, Pedido, PedidoArchivado, Producto, Reserva, Usuario
+from ..sql import tabla
+
+CONTRASENA = 'presupuesto'
+CACHES_PRUEBA = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'pruebas-{alias}'}
+    for alias in ('default', 'compartida', 'sesiones')
+}
+MODELOS_TIENDA = (Usuario, Direccion, Producto, Reserva, PedidoArchivado)
+# Orden de borrado (las llaves foráneas primero)
+TABLAS_TIENDA = (Reserva, PedidoArchivado, Pedido, Carrito, Direccion, Producto, Usuario)
+
+solo_sqlite = unittest.skipUnless(
+    connection.vendor == 'sqlite', 'el esquema de prueba es el de SQLite (TIENDA_DB=sqlite)'
+)
+
+_hash_contrasena = None
+
+
+def crear_esquema():
+    """Crea las tablas de la tienda si faltan (fuera de una transacción: SQLite no lo permite)"""
+    existentes = set(connection.introspection.table_names())
+    with connection.schema_editor() as editor:
+        for modelo in MODELOS_TIENDA:
+            if modelo._meta.db_table not in existentes:
+                editor.create_model(modelo)
+    with connection.cursor() as cursor:
+        cursor.execute(DDL_CARRITO.format(tabla=tabla(Carrito)))
+        cursor.execute(DDL_PEDIDO.format(tabla=tabla(Pedido)))
+
+
+def vaciar_caches():
+    for alias in CACHES_PRUEBA:
+        caches[alias].clear()
+    catalogo_memoria.descartar()
+
+
+def insertar(modelo, filas):
+    """INSERT directo para Carrito y Pedido: el ORM también escribiría su subtotal, que es calculado"""
+    columnas = list(filas[0])
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {tabla(modelo)} ({", ".join(columnas)}) VALUES ({", ".join(["%s"] * len(columnas))})',
+            [[fila[columna] for columna in columnas] for fila in filas],
+        )
+
+
+def crear_usuario(email='cliente@pruebas.local', rol='cliente', **campos):
+    global _hash_contrasena
+    if _hash_contrasena is None:
+        # Hashear es lento a propósito: un solo hash para todas las pruebas
+        _hash_contrasena = make_password(CONTRASENA)
+    return Usuario.objects.create(**{
+        'nombre_usuario': 'Cliente', 'apellido_usuario': 'Pruebas', 'email_usuario': email,
+        'contraseña_usuario': _hash_contrasena, 'rol_usuario': rol, **campos,
+    })
+
+
+def crear_direccion(usuario):
+    return Direccion.objects.create(
+        id_usuario=usuario, provincia_direccion='San José', canton_direccion='Central',
+        distrito_direccion='Carmen', direccion_detallada_direccion='Casa', predeterminada_direccion=True,
+    )
+
+
+def crear_productos(cantidad, **campos):
+    """`cantidad` productos activos (PRUEBA-000...) en Audio, Vídeo y Hogar; `campos` pisa los valores"""
+    Producto.objects.bulk_create(
+        Producto(**{
+            'nombre_producto': f'Cámara {i}', 'descripcion_producto': 'cámara inalámbrica',
+            'categoria_producto': ['Audio', 'Vídeo', 'Hogar'][i % 3], 'precio_producto': 1000 * (i + 1),
+            'stock_producto': 50, 'codigo_producto': f'PRUEBA-{i:03d}', **campos,
+        })
+        for i in range(cantidad)
+    )
+    return list(Producto.objects.order_by('id_producto'))
+
+
+def agregar_al_carrito(usuario, producto, cantidad=1, **campos):
+    insertar(Carrito, [{
+        'id_usuario': usuario.id_usuario, 'id_producto': producto.id_producto, 'cantidad_carrito': cantidad,
+        'precio_unitario_carrito': producto.precio_producto, **campos,
+    }])
+
+
+def crear_pedidos(usuario, direccion, productos, dias, estado='entregado'):
+    """Un pedido por producto, con fecha de hace `dias[i]` días"""
+    ahora = timezone.now()
+    insertar(Pedido, [
+        {'id_usuario': usuario.id_usuario, 'id_direccion': direccion.id_direccion,
+         'id_producto': producto.id_producto, 'cantidad_pedido': 1, 'precio_unitario_pedido': 1000,
+         'monto_total_pedido': 1000, 'metodo_pago_pedido': 'tarjeta', 'estado_pedido': estado,
+         'fecha_pedido_pedido': ahora - datetime.timedelta(days=dia)}
+        for producto, dia in zip(productos, dias)
+    ])
+
+
+class _BaseTienda:
+    @classmethod
+    def setUpClass(cls):
+        crear_esquema()
+        directorio = tempfile.mkdtemp(prefix='tienda-pruebas-')
+        cls.addClassCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        cls.directorio = directorio
+        cls.enterClassContext(override_settings(
+            BUSQUEDA={'RUTA': os.path.join(directorio, 'busqueda.sqlite3')}, MEDIA_ROOT=directorio,
+        ))
+        busqueda._indice = None
+        cls.addClassCleanup(setattr, busqueda, '_indice', None)
+        super().setUpClass()
+
+    def setUp(self):
+        super().setUp()
+        vaciar_caches()
+
+
+@solo_sqlite
+@override_settings(CACHES=CACHES_PRUEBA)
+class TiendaTestCase(_BaseTienda, TestCase):
+    """Cada prueba corre en una transacción que se revierte al terminar"""
+
+
+@solo_sqlite
+@override_settings(CACHES=CACHES_PRUEBA)
+class TiendaTransactionTestCase(_BaseTienda, TransactionTestCase):
+    """
+    Para lo que no puede correr dentro de la transacción de TestCase (vistas
+    async, otros hilos, transaction.on_commit real): los datos se confirman y
+    las tablas de la tienda se vacían al terminar cada prueba.
+    """
+
+    def tearDown(self):
+        catalogo_memoria.descartar()
+        with connection.cursor() as cursor:
+            for modelo in TABLAS_TIENDA:
+                cursor.execute(f'DELETE FROM {tabla(modelo)}')
+        super().tearDown()
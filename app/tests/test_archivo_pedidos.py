@@ -0,0 +1,50 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from ..archivo_pedidos import archivar_pedidos, horizonte_archivo
+from ..models import Pedido, PedidoArchivado
+from .base import TiendaTestCase, crear_direccion, crear_pedidos, crear_productos, crear_usuario
+
+
+@override_settings(PEDIDOS_DIAS_ARCHIVO=365)
+class ArchivarPedidosTests(TiendaTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario()
+        cls.direccion = crear_direccion(cls.usuario)
+        cls.productos = crear_productos(6)
+        # Entregados: dos recientes y tres antiguos; uno antiguo sigue pendiente
+        crear_pedidos(cls.usuario, cls.direccion, cls.productos[:5], [1, 300, 400, 500, 600])
+        crear_pedidos(cls.usuario, cls.direccion, cls.productos[5:], [700], estado='pendiente')
+
+    def test_mueve_los_entregados_antiguos_por_lotes(self):
+        originales = {
+            pedido['id_pedido']: pedido
+            for pedido in Pedido.objects.filter(fecha_pedido_pedido__lt=horizonte_archivo(), estado_pedido='entregado')
+            .values()
+        }
+        self.assertEqual(len(originales), 3)
+
+        with self.assertNumQueries(1 + 3 * 5 + 1):
+            # MAX del archivo; por lote: SELECT de ids, savepoint, INSERT ... SELECT, DELETE,
+            # release; más el SELECT final
+            movidos = archivar_pedidos(lote=1)
+        self.assertEqual(movidos, 3)
+
+        self.assertFalse(Pedido.objects.filter(id_pedido__in=originales).exists())
+        archivados = {pedido['id_pedido']: pedido for pedido in PedidoArchivado.objects.values()}
+        self.assertEqual(archivados, originales)
+        # Los recientes y los que siguen en curso quedan en T_Pedido
+        self.assertEqual(
+            sorted(Pedido.objects.values_list('estado_pedido', flat=True)), ['entregado', 'entregado', 'pendiente']
+        )
+        self.assertEqual(archivar_pedidos(), 0)
+
+    def test_comando(self):
+        salida = StringIO()
+        call_command('archivar_pedidos', '--pausa', '0', '--dias', '450', stdout=salida)
+        self.assertIn('[OK] 2 pedidos anteriores a', salida.getvalue())
+        self.assertEqual(PedidoArchivado.objects.count(), 2)
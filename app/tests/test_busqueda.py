@@ -0,0 +1,86 @@
+import os
+
+from django.test import override_settings
+from django.urls import reverse
+
+from .. import busqueda
+from ..busqueda import BusquedaNoDisponible, buscar_productos, reconstruir_indice
+from ..models import Producto
+from .base import TiendaTestCase
+
+
+def _producto(codigo, nombre, descripcion='', categoria='Audio', **campos):
+    return Producto.objects.create(
+        nombre_producto=nombre, descripcion_producto=descripcion, categoria_producto=categoria,
+        precio_producto=1000, stock_producto=5, codigo_producto=codigo, **campos,
+    )
+
+
+class BusquedaTests(TiendaTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.camara = _producto('B-1', 'Cámara Eléctrica', 'Resolución 4K')
+        cls.parlante = _producto('B-2', 'Parlante portátil', 'Incluye cámara de repuesto', 'Vídeo')
+        cls.teclado = _producto('B-3', 'Teclado inalámbrico', 'Español')
+        cls.inactivo = _producto('B-4', 'Cámara vieja', activo_producto=False)
+
+    def setUp(self):
+        super().setUp()
+        reconstruir_indice()
+
+    def ids(self, texto, **kwargs):
+        return [p.id_producto for p in buscar_productos(texto, **kwargs).items]
+
+    def test_sin_tildes_ni_mayusculas(self):
+        self.assertIn(self.camara.id_producto, self.ids('camara electrica'))
+        self.assertEqual(self.ids('ESPAÑOL'), [self.teclado.id_producto])
+        self.assertEqual(self.ids('espanol'), [self.teclado.id_producto])
+
+    def test_prefijo(self):
+        self.assertEqual(self.ids('inalam'), [self.teclado.id_producto])
+        self.assertEqual(self.ids('tec inal'), [self.teclado.id_producto])
+
+    def test_el_nombre_pesa_mas_que_la_descripcion(self):
+        self.assertEqual(self.ids('camara'), [self.camara.id_producto, self.parlante.id_producto])
+
+    def test_filtra_por_categoria_y_omite_inactivos(self):
+        self.assertEqual(self.ids('camara', categoria='Vídeo'), [self.parlante.id_producto])
+        self.assertNotIn(self.inactivo.id_producto, self.ids('vieja'))
+
+    def test_paginas_por_cursor(self):
+        primera = buscar_productos('camara', tamano=1)
+        self.assertTrue(primera.hay_mas)
+        segunda = buscar_productos('camara', cursor=primera.siguiente_cursor, tamano=1)
+        self.assertFalse(segunda.hay_mas)
+        self.assertEqual(
+            [p.id_producto for p in primera.items + segunda.items], [self.camara.id_producto, self.parlante.id_producto]
+        )
+
+    def test_las_senales_actualizan_el_indice(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo = _producto('B-5', 'Lámpara de escritorio')
+        self.assertEqual(self.ids('lampara'), [nuevo.id_producto])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo.activo_producto = False
+            nuevo.save()
+        self.assertEqual(self.ids('lampara'), [])
+
+    def test_indice_sin_reconstruir(self):
+        ruta = os.path.join(self.directorio, 'sin-reconstruir.sqlite3')
+        busqueda._indice = None
+        try:
+            with override_settings(BUSQUEDA={'RUTA': ruta}):
+                # Las señales agregan productos, pero el índice sigue sin el catálogo completo
+                busqueda.indexar_producto(self.camara)
+                with self.assertRaises(BusquedaNoDisponible):
+                    buscar_productos('camara')
+
+                # La vista usa la búsqueda por LIKE
+                with self.assertLogs('app.views', 'WARNING'):
+                    respuesta = self.client.get(reverse('home'), {'busqueda': 'Teclado'})
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual([p.id_producto for p in respuesta.context['productos']], [self.teclado.id_producto])
+        finally:
+            busqueda._indice = None
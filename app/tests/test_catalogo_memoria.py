@@ -0,0 +1,169 @@
+import datetime
+import random
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from .. import catalogo_memoria, facetas
+from ..catalogo_memoria import Instantanea
+from ..cache_catalogo import incrementar_version_catalogo
+from ..models import Producto
+from .base import TiendaTestCase, crear_productos
+
+CATEGORIAS = ['Audio', 'Vídeo', 'Hogar', None]
+
+
+def fila(id_producto, precio, categoria='Audio', stock=1, activo=True, fecha=None):
+    fecha = fecha or datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    return (id_producto, f'Producto {id_producto}', '', categoria, Decimal(precio), stock, '', fecha, activo)
+
+
+def estructuras(instantanea):
+    """Lo que arma Instantanea y sus bitmaps de facetas, para comparar"""
+    indice = facetas.indice(instantanea)
+    bitmaps = [
+        (b.orden, b.todos, b.categorias, {clave: bitmap for clave, bitmap in b.rangos.items() if bitmap}, b.con_stock)
+        for b in (indice.por_id, indice.por_precio)
+    ]
+    return instantanea.ids, instantanea.por_precio, instantanea.por_categoria, bitmaps
+
+
+class InstantaneaTests(SimpleTestCase):
+
+    def test_los_cambios_corrigen_los_indices_de_la_anterior(self):
+        azar = random.Random(24)
+        fecha = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        filas = {i: fila(i, azar.choice([500, 20000, 20000, 90000]), azar.choice(CATEGORIAS)) for i in range(1, 200)}
+        instantanea = Instantanea.desde_filas(filas.values(), version=1)
+        facetas.indice(instantanea)
+
+        for version in range(2, 40):
+            anterior = instantanea
+            congelada = estructuras(anterior)
+            cambios = []
+            for id_producto in azar.sample(range(1, 230), azar.randint(1, 8)):
+                fecha += datetime.timedelta(seconds=1)
+                nueva = fila(
+                    id_producto, azar.choice([500, 20000, 90000, 300000]), azar.choice(CATEGORIAS),
+                    stock=azar.choice([0, 3]), activo=azar.random() > 0.2, fecha=fecha,
+                )
+                filas[id_producto] = nueva
+                cambios.append(nueva)
+            instantanea = anterior.con_cambios(cambios, version)
+
+            self.assertIsNot(instantanea, anterior)
+            self.assertIsNotNone(instantanea.facetas)
+            # Igual que armarla de cero, y la anterior no cambió
+            self.assertEqual(estructuras(instantanea), estructuras(Instantanea.desde_filas(filas.values())))
+            self.assertEqual(estructuras(anterior), congelada)
+            self.assertEqual(anterior.version, version - 1)
+
+    def test_sin_cambios_comparte_todo(self):
+        original = fila(1, 500)
+        anterior = Instantanea.desde_filas([original], version=1)
+        nueva = anterior.con_cambios([original], version=2)
+        self.assertEqual((anterior.version, nueva.version), (1, 2))
+        self.assertIs(nueva.productos, anterior.productos)
+        self.assertIs(nueva.por_precio, anterior.por_precio)
+
+    def test_muchos_cambios_la_arman_de_nuevo(self):
+        anterior = Instantanea.desde_filas([fila(i, 500) for i in range(100)])
+        facetas.indice(anterior)
+        fecha = timezone.now()
+        nueva = anterior.con_cambios([fila(i, 700, fecha=fecha) for i in range(catalogo_memoria.PARCHE_MAXIMO + 1)], 2)
+        self.assertIsNone(nueva.facetas)
+        self.assertEqual(estructuras(nueva), estructuras(Instantanea.desde_filas(
+            [fila(i, 700 if i <= catalogo_memoria.PARCHE_MAXIMO else 500) for i in range(100)]
+        )))
+
+    def test_sin_productos(self):
+        anterior = Instantanea.desde_filas([fila(i, 500 * i, CATEGORIAS[i % 3]) for i in range(1, 7)])
+        facetas.indice(anterior)
+        nueva = anterior.sin_productos({2, 5, 99})
+        self.assertEqual(nueva.ids, [1, 3, 4, 6])
+        self.assertEqual(
+            estructuras(nueva),
+            estructuras(Instantanea.desde_filas([fila(i, 500 * i, CATEGORIAS[i % 3]) for i in (1, 3, 4, 6)])),
+        )
+        self.assertEqual(len(anterior.ids), 6)
+
+
+@override_settings(CATALOGO_MEMORIA={'REVISION': 0})
+class SincronizacionTests(TiendaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.productos = crear_productos(6)
+        self.inicial = catalogo_memoria.vigente()
+        facetas.indice(self.inicial)
+
+    def test_aplica_los_cambios_por_fecha(self):
+        producto = self.productos[0]
+        producto.precio_producto = 90000
+        producto.categoria_producto = 'Hogar'
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.save()
+        with mock.patch.object(catalogo_memoria, '_cargar') as cargar, self.assertNumQueries(2):
+            # Filas por fecha y COUNT de activos
+            actual = catalogo_memoria.vigente()
+        cargar.assert_not_called()
+
+        self.assertEqual(actual.productos[producto.id_producto].precio_producto, 90000)
+        self.assertEqual(actual.por_precio[-1], producto.id_producto)
+        self.assertEqual(actual.categorias(), [('Audio', 1), ('Hogar', 3), ('Vídeo', 2)])
+        self.assertIsNotNone(actual.facetas)
+        self.assertEqual(self.inicial.productos[producto.id_producto].precio_producto, 1000)
+
+    def test_detecta_los_borrados(self):
+        borrado = self.productos[2].id_producto
+        with self.captureOnCommitCallbacks(execute=True):
+            self.productos[2].delete()
+        with mock.patch.object(catalogo_memoria, '_cargar') as cargar, \
+                mock.patch.object(catalogo_memoria, '_recargar_en_segundo_plano') as recargar, \
+                self.assertNumQueries(3):
+            # Filas por fecha, COUNT de activos e ids activos
+            actual = catalogo_memoria.vigente()
+        cargar.assert_not_called()
+        recargar.assert_not_called()
+        self.assertNotIn(borrado, actual.ids)
+        self.assertEqual(len(actual.productos), 5)
+        self.assertIn(borrado, self.inicial.ids)
+
+    def test_activos_sin_fecha_nueva_piden_una_recarga(self):
+        # Un UPDATE masivo que reactiva un producto no mueve fecha_actualizacion_producto
+        Producto.objects.filter(pk=self.productos[1].pk).update(activo_producto=False)
+        catalogo_memoria.descartar()
+        catalogo_memoria.vigente()
+        Producto.objects.filter(pk=self.productos[1].pk).update(
+            activo_producto=True, fecha_actualizacion_producto=timezone.now() - datetime.timedelta(days=1)
+        )
+        incrementar_version_catalogo()
+        with mock.patch.object(catalogo_memoria, '_recargar_en_segundo_plano') as recargar:
+            catalogo_memoria.vigente()
+        recargar.assert_called_once()
+        catalogo_memoria.recargar()
+        self.assertEqual(
+            sorted(catalogo_memoria.vigente().productos),
+            sorted(Producto.objects.filter(activo_producto=True).values_list('id_producto', flat=True)),
+        )
+
+    def test_la_recarga_periodica_no_bloquea_el_request(self):
+        with override_settings(CATALOGO_MEMORIA={'REVISION': 0, 'RESINCRONIZACION': 0}), \
+                mock.patch.object(catalogo_memoria, '_cargar') as cargar, \
+                mock.patch.object(catalogo_memoria, '_recargar_en_segundo_plano') as recargar:
+            self.assertIsNotNone(catalogo_memoria.vigente())
+        cargar.assert_not_called()
+        recargar.assert_called_once()
+
+    def test_una_recarga_previa_a_descartar_no_se_instala(self):
+        cargar = catalogo_memoria._cargar
+
+        def descarta_mientras_carga(version):
+            catalogo_memoria.descartar()
+            return cargar(version)
+
+        with mock.patch.object(catalogo_memoria, '_cargar', descarta_mientras_carga):
+            catalogo_memoria.recargar()
+        self.assertIsNone(catalogo_memoria._instantanea)
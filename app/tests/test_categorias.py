@@ -0,0 +1,87 @@
+from django.core.cache import caches
+
+from ..categorias import CLAVE_CATEGORIAS, clave_conteo, obtener_categorias
+from ..models import Producto
+from .base import TiendaTestCase, crear_productos
+
+
+class CategoriasTests(TiendaTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # 7 productos: Audio 3, Vídeo 2, Hogar 2
+        cls.productos = crear_productos(7)
+
+    def guardar(self, producto, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.save(**kwargs)
+
+    def assertCategorias(self, esperadas, consultas=0):
+        """El resumen es el esperado y sale de la cache (o con `consultas` al recalcularlo)"""
+        with self.assertNumQueries(consultas):
+            self.assertEqual(obtener_categorias(), sorted(esperadas.items()))
+
+    def test_se_calcula_una_vez(self):
+        self.assertCategorias({'Audio': 3, 'Vídeo': 2, 'Hogar': 2}, consultas=1)
+        self.assertCategorias({'Audio': 3, 'Vídeo': 2, 'Hogar': 2})
+
+    def test_altas_bajas_y_cambios_ajustan_los_contadores(self):
+        obtener_categorias()
+        producto = Producto.objects.get(pk=self.productos[0].pk)
+
+        producto.categoria_producto = 'Vídeo'
+        self.guardar(producto)
+        self.assertCategorias({'Audio': 2, 'Vídeo': 3, 'Hogar': 2})
+
+        producto.activo_producto = False
+        self.guardar(producto)
+        self.assertCategorias({'Audio': 2, 'Vídeo': 2, 'Hogar': 2})
+
+        self.guardar(Producto(nombre_producto='Nuevo', categoria_producto='Hogar', precio_producto=1))
+        self.assertCategorias({'Audio': 2, 'Vídeo': 2, 'Hogar': 3})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.get(pk=self.productos[1].pk).delete()
+        self.assertCategorias({'Audio': 2, 'Vídeo': 1, 'Hogar': 3})
+
+    def test_guardar_otros_campos_no_toca_el_resumen(self):
+        obtener_categorias()
+        producto = Producto.objects.get(pk=self.productos[0].pk)
+        producto.stock_producto = 1
+        self.guardar(producto, update_fields=['stock_producto'])
+        self.guardar(producto)
+        self.assertCategorias({'Audio': 3, 'Vídeo': 2, 'Hogar': 2})
+
+    def test_categoria_nueva_recalcula(self):
+        obtener_categorias()
+        producto = Producto.objects.get(pk=self.productos[0].pk)
+        producto.categoria_producto = 'Juegos'
+        self.guardar(producto)
+        self.assertCategorias({'Audio': 2, 'Vídeo': 2, 'Hogar': 2, 'Juegos': 1}, consultas=1)
+
+    def test_estado_original_desconocido_recalcula(self):
+        obtener_categorias()
+        # Sin categoría en el SELECT, o armado a mano: no se sabe qué había antes
+        diferido = Producto.objects.only('id_producto', 'nombre_producto').get(pk=self.productos[0].pk)
+        diferido.categoria_producto = 'Hogar'
+        self.guardar(diferido, update_fields=['categoria_producto'])
+        self.assertCategorias({'Audio': 2, 'Vídeo': 2, 'Hogar': 3}, consultas=1)
+
+        original = self.productos[1]
+        self.guardar(Producto(
+            id_producto=original.id_producto, nombre_producto=original.nombre_producto, categoria_producto='Audio',
+            precio_producto=original.precio_producto, fecha_creacion_producto=original.fecha_creacion_producto,
+        ))
+        self.assertCategorias({'Audio': 3, 'Vídeo': 1, 'Hogar': 3}, consultas=1)
+
+    def test_contador_desalojado_recalcula(self):
+        obtener_categorias()
+        caches['compartida'].delete(clave_conteo('Audio'))
+        self.assertCategorias({'Audio': 3, 'Vídeo': 2, 'Hogar': 2}, consultas=1)
+
+        caches['compartida'].delete(clave_conteo('Audio'))
+        producto = Producto.objects.get(pk=self.productos[0].pk)
+        producto.activo_producto = False
+        self.guardar(producto)
+        self.assertIsNone(caches['compartida'].get(CLAVE_CATEGORIAS))
+        self.assertCategorias({'Audio': 2, 'Vídeo': 2, 'Hogar': 2}, consultas=1)
@@ -0,0 +1,81 @@
+import csv
+import datetime
+import io
+import json
+import os
+
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+from ..admin import ProductoAdmin
+from ..exportacion import bloques_csv, respuesta_exportacion
+from ..models import Pedido, Producto
+from .base import TiendaTestCase, crear_direccion, crear_pedidos, crear_productos, crear_usuario
+
+
+class ExportacionTests(TiendaTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario()
+        cls.direccion = crear_direccion(cls.usuario)
+        cls.productos = crear_productos(3)
+        crear_pedidos(cls.usuario, cls.direccion, cls.productos, [0, 10, 20])
+
+    def exportar(self, *args):
+        salida, errores = io.StringIO(), io.StringIO()
+        call_command('exportar', *args, stdout=salida, stderr=errores)
+        return salida.getvalue(), errores.getvalue()
+
+    def test_pedidos_csv_con_rango_de_fechas(self):
+        hoy = timezone.localdate()
+        ruta = os.path.join(self.directorio, 'pedidos.csv')
+        salida, _ = self.exportar(
+            'pedidos', '--desde', str(hoy - datetime.timedelta(days=15)),
+            '--hasta', str(hoy - datetime.timedelta(days=5)), '--salida', ruta,
+        )
+        self.assertIn('[OK] 1 pedidos exportados', salida)
+
+        with open(ruta, encoding='utf-8', newline='') as archivo:
+            filas = list(csv.DictReader(archivo))
+        self.assertEqual(len(filas), 1)
+        fila = filas[0]
+        self.assertEqual(fila['email_usuario'], self.usuario.email_usuario)
+        self.assertEqual(fila['provincia'], 'San José')
+        self.assertEqual(fila['codigo_producto'], self.productos[1].codigo_producto)
+        self.assertEqual(float(fila['subtotal']), 1000)
+
+    def test_productos_jsonl_por_la_salida_estandar(self):
+        salida, errores = self.exportar('productos', '--formato', 'jsonl')
+        productos = [json.loads(linea) for linea in salida.splitlines()]
+        self.assertEqual([p['codigo_producto'] for p in productos], [p.codigo_producto for p in self.productos])
+        self.assertEqual(productos[0]['nombre_producto'], 'Cámara 0')
+        self.assertEqual(productos[0]['precio_producto'], '1000.00')
+        self.assertIn('3 productos exportados', errores)
+
+    def test_fechas_invalidas(self):
+        with self.assertRaises(CommandError):
+            self.exportar('pedidos', '--desde', '2025-13-01')
+        with self.assertRaises(CommandError):
+            self.exportar('pedidos', '--desde', '2025-02-01', '--hasta', '2025-01-01')
+
+    def test_csv_por_bloques(self):
+        filas = [(i, f'texto, con "comillas"\ny salto {i}') for i in range(5)]
+        partes = list(bloques_csv(['id', 'texto'], iter(filas), tamano=2))
+        self.assertEqual(len(partes), 3)
+        leidas = list(csv.reader(io.StringIO(''.join(partes))))
+        self.assertEqual(leidas[0], ['id', 'texto'])
+        self.assertEqual(leidas[1:], [[str(i), texto] for i, texto in filas])
+
+    def test_respuesta_en_streaming(self):
+        respuesta = respuesta_exportacion('pedidos', 'jsonl', Pedido.objects.filter(id_producto=self.productos[0]))
+        self.assertTrue(respuesta.streaming)
+        self.assertRegex(respuesta['Content-Disposition'], r'attachment; filename="pedidos_\d{8}\.jsonl"')
+        pedidos = [json.loads(linea) for linea in b''.join(respuesta.streaming_content).decode().splitlines()]
+        self.assertEqual([p['id_producto'] for p in pedidos], [self.productos[0].id_producto])
+
+    def test_admin_exporta_los_seleccionados(self):
+        acciones = {accion.__name__: accion for accion in ProductoAdmin.actions}
+        respuesta = acciones['exportar_csv'](None, None, Producto.objects.filter(pk=self.productos[2].pk))
+        filas = list(csv.DictReader(io.StringIO(b''.join(respuesta.streaming_content).decode())))
+        self.assertEqual([fila['id_producto'] for fila in filas], [str(self.productos[2].pk)])
@@ -0,0 +1,125 @@
+from django.http import QueryDict
+from django.test import override_settings
+from django.urls import reverse
+
+from .. import catalogo_memoria, facetas
+from ..busqueda import buscar_coincidencias, reconstruir_indice
+from ..models import Producto
+from .base import TiendaTestCase, crear_productos, vaciar_caches
+
+RANGOS = (10000, 50000)
+
+
+def filtros(consulta=''):
+    return facetas.leer_filtros(QueryDict(consulta))
+
+
+@override_settings(FACETAS_RANGOS_PRECIO=RANGOS)
+class FacetasTests(TiendaTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Cámaras (coinciden con "camara") de 5.000 a 60.000, una de cada tres sin stock
+        crear_productos(12)
+        for producto in Producto.objects.all():
+            producto.precio_producto *= 5
+            producto.stock_producto = 0 if producto.id_producto % 3 == 0 else 4
+            producto.save()
+        Producto.objects.create(
+            nombre_producto='Lámpara', descripcion_producto='de escritorio', categoria_producto='Hogar',
+            precio_producto=20000, stock_producto=3, codigo_producto='LAMPARA',
+        )
+        Producto.objects.create(
+            nombre_producto='Cámara retirada', categoria_producto='Audio', precio_producto=1000,
+            stock_producto=1, codigo_producto='RETIRADA', activo_producto=False,
+        )
+
+    def setUp(self):
+        super().setUp()
+        reconstruir_indice()
+
+    def esperadas(self, consulta, busqueda=None):
+        """Facetas calculadas a mano sobre los productos activos"""
+        elegidos = filtros(consulta)
+        productos = list(Producto.objects.filter(activo_producto=True))
+        if busqueda:
+            productos = [p for p in productos if 'mara' in p.nombre_producto]
+        rangos = facetas.rangos_precio()
+
+        def rango(producto):
+            return next(r.clave for r in rangos if (r.hasta is None or producto.precio_producto < r.hasta)
+                        and (r.desde is None or producto.precio_producto >= r.desde))
+
+        def pasa(producto, sin):
+            return (
+                (sin == 'categorias' or not elegidos.categorias or producto.categoria_producto in elegidos.categorias)
+                and (sin == 'rangos' or not elegidos.rangos or rango(producto) in elegidos.rangos)
+                and (sin == 'stock' or not elegidos.con_stock or producto.stock_producto > 0)
+            )
+
+        return facetas.Facetas(
+            categorias=[
+                (categoria, sum(p.categoria_producto == categoria and pasa(p, 'categorias') for p in productos),
+                 categoria in elegidos.categorias)
+                for categoria in ('Audio', 'Hogar', 'Vídeo')
+            ],
+            rangos=[(r, sum(rango(p) == r.clave and pasa(p, 'rangos') for p in productos), r.clave in elegidos.rangos)
+                    for r in rangos],
+            con_stock=(sum(p.stock_producto > 0 and pasa(p, 'stock') for p in productos), elegidos.con_stock),
+            orden=elegidos.orden,
+            total=sum(pasa(p, None) for p in productos),
+        )
+
+    CONSULTAS = [
+        '',
+        'categoria=Audio',
+        'categoria=Audio&categoria=Hogar&stock=1',
+        'precio=10000-50000&stock=1',
+        'categoria=Vídeo&precio=-10000&precio=50000-',
+    ]
+
+    def test_conteos_con_filtros_combinados(self):
+        indice = facetas.indice(catalogo_memoria.vigente())
+        activos = Producto.objects.filter(activo_producto=True)
+        coincidencias = buscar_coincidencias('camara')
+        con_busqueda = activos.filter(id_producto__in=[id_producto for id_producto, _ in coincidencias])
+        for consulta in self.CONSULTAS:
+            with self.subTest(consulta=consulta):
+                esperadas = self.esperadas(consulta)
+                self.assertEqual(indice.facetas(filtros(consulta)), esperadas)
+                self.assertEqual(facetas.facetas_bd(filtros(consulta), activos), esperadas)
+
+                esperadas = self.esperadas(consulta, busqueda='camara')
+                self.assertEqual(indice.facetas(filtros(consulta), coincidencias), esperadas)
+                self.assertEqual(facetas.facetas_bd(filtros(consulta), con_busqueda), esperadas)
+
+    def recorrer(self, params):
+        """(ids de todas las páginas, facetas de la primera) siguiendo siguiente_query"""
+        respuesta = self.client.get(reverse('home'), params)
+        panel = respuesta.context['facetas']
+        ids = [p.id_producto for p in respuesta.context['productos']]
+        while respuesta.context['siguiente_query']:
+            respuesta = self.client.get(f'{reverse("home")}?{respuesta.context["siguiente_query"]}')
+            ids += [p.id_producto for p in respuesta.context['productos']]
+        return ids, panel
+
+    def test_busqueda_con_facetas_en_memoria_y_en_la_bd(self):
+        relevancia = [id_producto for id_producto, _ in buscar_coincidencias('camara')]
+        for consulta in ['categoria=Audio&stock=1', 'precio=10000-50000', 'categoria=Hogar&orden=-precio']:
+            params = QueryDict(consulta, mutable=True)
+            params.update({'busqueda': 'camara', 'tamano': '2'})
+            elegidos = filtros(consulta)
+            esperados = set(facetas.filtrar(Producto.objects.filter(activo_producto=True), elegidos)
+                            .filter(nombre_producto__contains='mara').values_list('id_producto', flat=True))
+            with self.subTest(consulta=consulta):
+                ids, panel = self.recorrer(params)
+                if elegidos.orden:
+                    self.assertEqual(ids, sorted(esperados, key=lambda i: -Producto.objects.get(pk=i).precio_producto))
+                else:
+                    self.assertEqual(ids, [i for i in relevancia if i in esperados])
+                self.assertEqual(panel, self.esperadas(consulta, busqueda='camara'))
+
+                vaciar_caches()
+                with override_settings(CATALOGO_MEMORIA={'ACTIVO': False}):
+                    self.assertEqual(self.recorrer(params), (ids, panel))
+                vaciar_caches()
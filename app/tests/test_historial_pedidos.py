@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import override_settings
+
+from .. import archivo_pedidos
+from ..archivo_pedidos import CLAVE_LIMITE_ARCHIVO, archivar_pedidos, limite_archivo
+from ..historial_pedidos import Filtros, paginar_historial
+from ..models import Pedido, PedidoArchivado
+from .base import TiendaTestCase, crear_direccion, crear_pedidos, crear_productos, crear_usuario
+
+SIN_FILTROS = Filtros(None, None, None)
+
+
+def ultimo_archivado():
+    return PedidoArchivado.objects.order_by('-fecha_pedido_pedido').values_list('fecha_pedido_pedido', flat=True)[0]
+
+
+@override_settings(PEDIDOS_DIAS_ARCHIVO=365)
+class HistorialPedidosTests(TiendaTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario()
+        cls.direccion = crear_direccion(cls.usuario)
+        cls.productos = crear_productos(6)
+        crear_pedidos(cls.usuario, cls.direccion, cls.productos, [10, 20, 30, 400, 500, 600])
+        cls.orden = list(
+            Pedido.objects.order_by('-fecha_pedido_pedido', '-id_pedido').values_list('id_pedido', flat=True)
+        )
+
+    def recorrer(self, tamano, filtros=SIN_FILTROS):
+        ids, cursor = [], None
+        while True:
+            pagina = paginar_historial(self.usuario, filtros, cursor, tamano=tamano)
+            ids += [pedido.id_pedido for pedido in pagina.items]
+            if not pagina.hay_mas:
+                return ids
+            cursor = pagina.siguiente_cursor
+
+    def test_mezcla_recientes_y_archivados(self):
+        self.assertEqual(archivar_pedidos(), 3)
+        for tamano in (1, 2, 4, 10):
+            with self.subTest(tamano=tamano):
+                self.assertEqual(self.recorrer(tamano), self.orden)
+        # Un estado que no se archiva no consulta el archivo
+        self.assertEqual(self.recorrer(2, Filtros('pendiente', None, None)), [])
+
+    def test_no_consulta_el_archivo_si_la_pagina_es_posterior(self):
+        archivar_pedidos()
+        limite_archivo()
+        with self.assertNumQueries(1):
+            pagina = paginar_historial(self.usuario, SIN_FILTROS, tamano=2)
+        self.assertEqual([pedido.id_pedido for pedido in pagina.items], self.orden[:2])
+        # La página llega hasta el archivo: segunda consulta para mezclarlo
+        with self.assertNumQueries(2):
+            paginar_historial(self.usuario, SIN_FILTROS, pagina.siguiente_cursor, tamano=2)
+
+    def test_archivo_vacio(self):
+        self.assertIsNone(limite_archivo())
+        with self.assertNumQueries(1):
+            self.assertEqual(len(paginar_historial(self.usuario, SIN_FILTROS, tamano=10).items), 6)
+
+    def test_subir_los_dias_de_archivo_no_oculta_pedidos(self):
+        archivar_pedidos()
+        # Con un horizonte más lejano que lo ya archivado, el límite sigue siendo el real
+        with override_settings(PEDIDOS_DIAS_ARCHIVO=550):
+            self.assertEqual(self.recorrer(2), self.orden)
+            self.assertEqual(self.recorrer(3), self.orden)
+
+    def test_el_limite_sigue_al_archivo(self):
+        self.assertIsNone(limite_archivo())
+        archivar_pedidos()
+        self.assertEqual(limite_archivo(), ultimo_archivado())
+        # Desalojado de la cache, se recalcula desde T_PedidoArchivo
+        caches['compartida'].delete(CLAVE_LIMITE_ARCHIVO)
+        with self.assertNumQueries(1):
+            limite = limite_archivo()
+        self.assertEqual(limite, ultimo_archivado())
+
+    def test_el_limite_es_una_cota_mientras_se_archiva(self):
+        mover_lote = archivo_pedidos._mover_lote
+        vistos = []
+
+        def mover_y_leer(archivables, ids):
+            movidos = mover_lote(archivables, ids)
+            vistos.append((limite_archivo(), ultimo_archivado()))
+            return movidos
+
+        with mock.patch.object(archivo_pedidos, '_mover_lote', mover_y_leer):
+            archivar_pedidos(lote=1)
+        self.assertEqual(len(vistos), 3)
+        # Ninguna lectura durante el archivado ve un límite menor que lo ya movido
+        for limite, ultimo in vistos:
+            self.assertGreaterEqual(limite, ultimo)
+        self.assertEqual(limite_archivo(), ultimo_archivado())
@@ -0,0 +1,105 @@
+import json
+import os
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+
+from ..management.commands import importar_productos
+from ..models import Producto
+from .base import TiendaTestCase, crear_productos
+
+
+class ImportarProductosTests(TiendaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        crear_productos(2)
+
+    def feed(self, *lineas, nombre='feed.csv'):
+        ruta = os.path.join(self.directorio, nombre)
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write('\n'.join(lineas) + '\n')
+        self.addCleanup(lambda: os.path.exists(ruta) and os.remove(ruta))
+        return ruta
+
+    def importar(self, ruta, *args):
+        salida, errores = StringIO(), StringIO()
+        call_command('importar_productos', ruta, *args, stdout=salida, stderr=errores)
+        return salida.getvalue()
+
+    def test_crea_actualiza_y_rechaza(self):
+        ruta = self.feed(
+            'sku,nombre,precio,stock,categoria',
+            'PRUEBA-000,,1500,,',          # solo precio: el resto no se toca
+            'PRUEBA-001,Cámara 1,2000,50,Vídeo',  # igual a lo guardado
+            'NUEVO-1,Lámpara,"12,50",3,Hogar',
+            'NUEVO-2,,100,1,Hogar',        # nuevo sin nombre
+            'NUEVO-3,Malo,100,-1,Hogar',   # stock negativo
+        )
+        salida = self.importar(ruta, '--lote', '2')
+
+        self.assertIn('1 insertados, 1 actualizados, 1 sin cambios, 2 rechazados', salida)
+        actualizado = Producto.objects.get(codigo_producto='PRUEBA-000')
+        self.assertEqual((actualizado.precio_producto, actualizado.nombre_producto), (Decimal('1500'), 'Cámara 0'))
+        nuevo = Producto.objects.get(codigo_producto='NUEVO-1')
+        self.assertEqual((nuevo.precio_producto, nuevo.stock_producto), (Decimal('12.50'), 3))
+        self.assertFalse(Producto.objects.filter(codigo_producto__in=['NUEVO-2', 'NUEVO-3']).exists())
+        self.assertFalse(os.path.exists(ruta + '.checkpoint.json'))
+
+    def test_jsonl(self):
+        ruta = self.feed(
+            json.dumps({'codigo': 'NUEVO-1', 'nombre': 'Lámpara', 'precio': 10, 'activo': 'no'}),
+            '{roto',
+            nombre='feed.jsonl',
+        )
+        self.assertIn('1 insertados, 0 actualizados, 0 sin cambios, 1 rechazados', self.importar(ruta))
+        self.assertFalse(Producto.objects.get(codigo_producto='NUEVO-1').activo_producto)
+
+    def test_simular_no_escribe_ni_cuenta_dos_veces_un_nuevo(self):
+        ruta = self.feed(
+            'codigo,nombre,precio',
+            'NUEVO-1,Lámpara,10',
+            'PRUEBA-000,Cambiado,1000',
+            'NUEVO-1,Lámpara,10',       # en otro lote: ya contado como nuevo
+            'NUEVO-1,Lámpara,11',
+        )
+        salida = self.importar(ruta, '--simular', '--lote', '1')
+
+        self.assertIn('[SIMULACIÓN] 1 insertados, 2 actualizados, 1 sin cambios, 0 rechazados', salida)
+        self.assertFalse(Producto.objects.filter(codigo_producto='NUEVO-1').exists())
+        self.assertEqual(Producto.objects.get(codigo_producto='PRUEBA-000').nombre_producto, 'Cámara 0')
+        self.assertFalse(os.path.exists(ruta + '.checkpoint.json'))
+
+    def test_reanuda_desde_el_checkpoint(self):
+        ruta = self.feed('codigo,nombre,precio', *(f'NUEVO-{i},Producto {i},{i + 1}' for i in range(5)))
+        aplicar_lote = importar_productos.aplicar_lote
+        llamadas = []
+
+        def falla_en_el_segundo_lote(*args, **kwargs):
+            llamadas.append(args)
+            if len(llamadas) == 2:
+                raise RuntimeError('se cayó la conexión')
+            return aplicar_lote(*args, **kwargs)
+
+        with mock.patch.object(importar_productos, 'aplicar_lote', falla_en_el_segundo_lote):
+            with self.assertRaises(RuntimeError):
+                self.importar(ruta, '--lote', '2')
+        with open(ruta + '.checkpoint.json', encoding='utf-8') as archivo:
+            self.assertEqual(json.load(archivo)['filas'], 2)
+        self.assertEqual(Producto.objects.filter(codigo_producto__startswith='NUEVO-').count(), 2)
+
+        salida = self.importar(ruta, '--lote', '2', '--reanudar')
+        self.assertIn('5 insertados', salida)
+        self.assertEqual(Producto.objects.filter(codigo_producto__startswith='NUEVO-').count(), 5)
+        self.assertFalse(os.path.exists(ruta + '.checkpoint.json'))
+
+    def test_checkpoint_solo_al_confirmar_un_lote(self):
+        ruta = self.feed('codigo,nombre,precio', *(f'MALO-{i},Producto,-1' for i in range(5)), 'NUEVO-1,Uno,1')
+        guardadas = []
+        with mock.patch.object(importar_productos.Command, '_guardar_checkpoint',
+                               lambda comando, ruta, progreso, simular: guardadas.append(progreso['filas'])):
+            salida = self.importar(ruta, '--lote', '2')
+        self.assertIn('1 insertados, 0 actualizados, 0 sin cambios, 5 rechazados', salida)
+        self.assertEqual(guardadas, [2, 4, 6])
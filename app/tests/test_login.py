@@ -0,0 +1,114 @@
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, identify_hasher
+from django.core.management import call_command
+from django.core.management.base import SystemCheckError
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from ..contrasenas import verificar_contrasena
+from ..limites import ip_cliente
+from ..models import Usuario
+from .base import CONTRASENA, TiendaTestCase, crear_usuario
+
+LIMITES_PRUEBA = {'EMAIL': (2, 60), 'IP': (3, 60)}
+
+
+class IpClienteTests(SimpleTestCase):
+
+    def ip(self, remota, reenviada=None):
+        meta = {'REMOTE_ADDR': remota}
+        if reenviada is not None:
+            meta['HTTP_X_FORWARDED_FOR'] = reenviada
+        return ip_cliente(RequestFactory().get('/', **meta))
+
+    def test_sin_proxies_confiables_ignora_la_cabecera(self):
+        self.assertEqual(self.ip('203.0.113.7', '198.51.100.1'), '203.0.113.7')
+
+    @override_settings(LIMITE_INTENTOS={'PROXIES_CONFIABLES': ['10.0.0.0/24', '192.0.2.1']})
+    def test_detras_de_proxies_confiables(self):
+        self.assertEqual(self.ip('10.0.0.5', '198.51.100.1'), '198.51.100.1')
+        # Lo que el cliente antepone a la cabecera no cuenta; los saltos confiables se saltan
+        self.assertEqual(self.ip('10.0.0.5', '1.2.3.4, 198.51.100.1, 192.0.2.1'), '198.51.100.1')
+        self.assertEqual(self.ip('10.0.0.5', '10.0.0.9, 10.0.0.8'), '10.0.0.9')
+        self.assertEqual(self.ip('10.0.0.5'), '10.0.0.5')
+        # Un cliente directo no puede elegir su IP con la cabecera
+        self.assertEqual(self.ip('203.0.113.7', '198.51.100.1'), '203.0.113.7')
+
+    @override_settings(LIMITE_INTENTOS={'PROXIES_CONFIABLES': ['10.0.0.300']})
+    def test_check_rechaza_redes_invalidas(self):
+        with self.assertRaisesMessage(SystemCheckError, 'app.E002'):
+            call_command('check')
+
+
+@override_settings(LIMITE_INTENTOS=LIMITES_PRUEBA)
+class LoginTests(TiendaTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario()
+
+    def login(self, email, contrasena='incorrecta', ip='203.0.113.7'):
+        return self.client.post(
+            reverse('login'), {'email_usuario': email, 'contraseña_usuario': contrasena}, REMOTE_ADDR=ip
+        )
+
+    def test_limite_por_email_y_por_ip(self):
+        for _ in range(2):
+            self.assertEqual(self.login(self.usuario.email_usuario).status_code, 200)
+        respuesta = self.login(self.usuario.email_usuario)
+        self.assertEqual(respuesta.status_code, 429)
+        # Hashear en los intentos anteriores puede llevar más de un segundo: el bucket ya se recargó algo
+        self.assertIn(int(respuesta['Retry-After']), range(50, 61))
+        # El email bloqueado no gastó el token de la IP: queda uno para otro email
+        self.assertEqual(self.login('otro@pruebas.local').status_code, 200)
+        self.assertEqual(self.login('otro@pruebas.local').status_code, 429)
+        # Desde otra IP el email sigue bloqueado
+        self.assertEqual(self.login(self.usuario.email_usuario, CONTRASENA, ip='198.51.100.1').status_code, 429)
+
+    @override_settings(LIMITE_INTENTOS={**LIMITES_PRUEBA, 'PROXIES_CONFIABLES': ['10.0.0.1']})
+    def test_limite_por_ip_detras_del_proxy(self):
+        for i in range(3):
+            self.login(f'cliente{i}@pruebas.local', ip='10.0.0.1')
+        # Sin X-Forwarded-For todos comparten el bucket del proxy
+        self.assertEqual(self.login('cliente9@pruebas.local', ip='10.0.0.1').status_code, 429)
+        respuesta = self.client.post(
+            reverse('login'), {'email_usuario': self.usuario.email_usuario, 'contraseña_usuario': CONTRASENA},
+            REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='198.51.100.1',
+        )
+        self.assertRedirects(respuesta, reverse('home'), fetch_redirect_response=False)
+
+    def test_limite_del_registro(self):
+        datos = {
+            'nombre_usuario': 'Otro', 'apellido_usuario': 'Cliente',
+            'email_usuario': self.usuario.email_usuario, 'contraseña_usuario': 'secreta',
+        }
+        for _ in range(3):
+            self.assertEqual(self.client.post(reverse('registro'), datos).status_code, 200)
+        respuesta = self.client.post(reverse('registro'), {**datos, 'email_usuario': 'nuevo@pruebas.local'})
+        self.assertEqual(respuesta.status_code, 429)
+        self.assertFalse(Usuario.objects.filter(email_usuario='nuevo@pruebas.local').exists())
+
+    def test_actualiza_el_hash_al_iniciar_sesion(self):
+        viejo = PBKDF2PasswordHasher().encode(CONTRASENA, 'salpruebas', iterations=1000)
+        Usuario.objects.filter(pk=self.usuario.pk).update(contraseña_usuario=viejo)
+
+        self.assertEqual(self.login(self.usuario.email_usuario).status_code, 200)
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.contraseña_usuario, viejo)
+
+        respuesta = self.login(self.usuario.email_usuario, CONTRASENA)
+        self.assertRedirects(respuesta, reverse('home'), fetch_redirect_response=False)
+        self.usuario.refresh_from_db()
+        nuevo = self.usuario.contraseña_usuario
+        self.assertNotEqual(nuevo, viejo)
+        self.assertTrue(check_password(CONTRASENA, nuevo))
+        self.assertFalse(identify_hasher(nuevo).must_update(nuevo))
+
+    def test_verificar_contrasena(self):
+        actual = self.usuario.contraseña_usuario
+        self.assertEqual(verificar_contrasena(CONTRASENA, actual), (True, None))
+        self.assertEqual(verificar_contrasena('incorrecta', actual), (False, None))
+        viejo = PBKDF2PasswordHasher().encode(CONTRASENA, 'salpruebas', iterations=1000)
+        # Con la contraseña incorrecta no se rehashea
+        self.assertEqual(verificar_contrasena('incorrecta', viejo), (False, None))
+        valida, nuevo = verificar_contrasena(CONTRASENA, viejo)
+        self.assertTrue(valida and check_password(CONTRASENA, nuevo))
@@ -0,0 +1,116 @@
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
+
+from .. import miniaturas
+from ..management.commands import generar_miniaturas
+from .base import TiendaTestCase, crear_productos
+
+
+def png(ancho=400, alto=200):
+    salida = io.BytesIO()
+    Image.new('RGB', (ancho, alto), 'teal').save(salida, 'PNG')
+    return salida.getvalue()
+
+
+class _Originales(BaseHTTPRequestHandler):
+    """/img.png, /mismo (redirige a /img.png), /otro (redirige a otro host) y /grande"""
+
+    def do_GET(self):
+        puerto = self.server.server_address[1]
+        if self.path in ('/mismo', '/otro'):
+            host = '127.0.0.1' if self.path == '/mismo' else 'localhost'
+            self.send_response(302)
+            self.send_header('Location', f'http://{host}:{puerto}/img.png')
+            self.end_headers()
+            return
+        cuerpo = png() if self.path == '/img.png' else b'x' * 4096
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class MiniaturasTests(TiendaTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        servidor = ThreadingHTTPServer(('127.0.0.1', 0), _Originales)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        cls.addClassCleanup(servidor.server_close)
+        cls.addClassCleanup(servidor.shutdown)
+        cls.base = f'http://127.0.0.1:{servidor.server_address[1]}'
+
+    def config(self, **cambios):
+        return {**miniaturas.config_generacion(), 'HOSTS': ['127.0.0.1'], 'MAX_BYTES': 2048, **cambios}
+
+    def local(self, nombre, datos):
+        ruta = Path(self.directorio) / 'productos' / nombre
+        ruta.parent.mkdir(exist_ok=True)
+        ruta.write_bytes(datos)
+        return f'productos/{nombre}'
+
+    def test_variantes_de_una_imagen_local(self):
+        origen, entrada = miniaturas.generar(self.local('a.png', png()), self.config())
+        self.assertEqual((entrada['ancho'], entrada['alto'], entrada['anchos']), (400, 200, [80, 160, 320, 400]))
+        for ancho in entrada['anchos']:
+            with Image.open(Path(self.directorio) / miniaturas.nombre_variante(entrada, ancho)) as variante:
+                self.assertEqual(variante.size, (ancho, ancho // 2))
+        with self.assertRaises(miniaturas.ImagenNoDisponible):
+            miniaturas.generar('../fuera.png', self.config())
+
+    def test_descarga_solo_de_hosts_permitidos(self):
+        _, entrada = miniaturas.generar(f'{self.base}/img.png', self.config(MAX_BYTES=1024 * 1024))
+        self.assertEqual(entrada['ancho'], 400)
+        with mock.patch('urllib.request.build_opener') as build_opener:
+            with self.assertRaisesMessage(miniaturas.ImagenNoDisponible, "MINIATURAS['HOSTS']"):
+                miniaturas.generar(f'{self.base}/img.png', self.config(HOSTS=[]))
+            with self.assertRaisesMessage(miniaturas.ImagenNoDisponible, "MINIATURAS['HOSTS']"):
+                miniaturas.generar(f'{self.base}/img.png'.replace('127.0.0.1', 'localhost'), self.config())
+        build_opener.assert_not_called()
+
+    def test_redirecciones(self):
+        _, entrada = miniaturas.generar(f'{self.base}/mismo', self.config(MAX_BYTES=1024 * 1024))
+        self.assertEqual(entrada['ancho'], 400)
+        with self.assertRaisesMessage(miniaturas.ImagenNoDisponible, 'redirección a otro host'):
+            miniaturas.generar(f'{self.base}/otro', self.config(HOSTS=['127.0.0.1', 'localhost']))
+
+    def test_tamano_maximo(self):
+        with self.assertRaisesMessage(miniaturas.ImagenNoDisponible, 'supera 2048 bytes'):
+            miniaturas.generar(f'{self.base}/grande', self.config())
+
+    def test_el_comando_sigue_tras_un_error(self):
+        buena, rota = crear_productos(2)
+        buena.imagen_producto = self.local('buena.png', png())
+        buena.save()
+        rota.imagen_producto = self.local('rota.png', png())
+        rota.save()
+        generar = miniaturas.generar
+
+        def falla_con_rota(origen, config):
+            if origen.endswith('rota.png'):
+                raise RuntimeError('imagen inesperada')
+            return generar(origen, config)
+
+        salida = StringIO()
+        # En hilos, para que el reemplazo de generar llegue a los trabajos
+        with mock.patch.object(generar_miniaturas, 'ProcessPoolExecutor', ThreadPoolExecutor), \
+                mock.patch.object(miniaturas, 'generar', falla_con_rota), \
+                override_settings(MINIATURAS={'HOSTS': []}), \
+                self.assertLogs(generar_miniaturas.__name__, 'ERROR') as registros:
+            call_command('generar_miniaturas', '--procesos', '1', stdout=salida)
+        self.assertIn('1 imágenes procesadas, 1 con error', salida.getvalue())
+        self.assertIn('rota.png', registros.output[0])
+        self.assertEqual(list(miniaturas.leer_manifiesto()), [buena.imagen_producto])
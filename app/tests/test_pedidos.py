@@ -0,0 +1,97 @@
+import functools
+from unittest import mock
+
+from .. import pedidos
+from ..cache_catalogo import version_catalogo
+from ..models import Carrito, Pedido, Producto, Reserva
+from ..pedidos import CheckoutError, StockInsuficienteError, confirmar_pedido
+from ..reservas import duracion_reserva, reservar
+from .base import TiendaTestCase, agregar_al_carrito, crear_direccion, crear_productos, crear_usuario
+
+
+class ConfirmarPedidoTests(TiendaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.usuario = crear_usuario()
+        self.direccion = crear_direccion(self.usuario)
+        self.productos = crear_productos(4, stock_producto=5)
+
+    def carritos(self):
+        return list(Carrito.objects.filter(id_usuario=self.usuario, estado_carrito='activo'))
+
+    def confirmar(self, carritos=None):
+        return confirmar_pedido(
+            self.usuario, self.direccion, 'tarjeta', 'REF', self.carritos() if carritos is None else carritos
+        )
+
+    def stock(self):
+        return dict(Producto.objects.values_list('id_producto', 'stock_producto'))
+
+    def test_convierte_el_carrito_y_descuenta_stock(self):
+        for producto in self.productos[:3]:
+            agregar_al_carrito(self.usuario, producto, 2)
+        reservar(self.usuario.id_usuario, self.productos[0].id_producto, 2)
+
+        # El UPDATE de stock va en varias sentencias cuando hay más productos que el lote
+        with mock.patch.object(pedidos, '_lotes', functools.partial(pedidos._lotes, tamano=2)):
+            self.confirmar()
+
+        stock = self.stock()
+        self.assertEqual([stock[p.id_producto] for p in self.productos], [3, 3, 3, 5])
+        self.assertEqual(Pedido.objects.filter(id_usuario=self.usuario, estado_pedido='pendiente').count(), 3)
+        self.assertFalse(self.carritos())
+        # La reserva propia pasó a ser descuento de stock
+        self.assertFalse(Reserva.objects.exists())
+
+    def test_cambia_la_version_del_catalogo_al_confirmar(self):
+        agregar_al_carrito(self.usuario, self.productos[0])
+        version = version_catalogo()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.confirmar()
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(version_catalogo(), version)
+
+    def test_sobreventa_no_guarda_nada(self):
+        agregar_al_carrito(self.usuario, self.productos[0], 2)
+        agregar_al_carrito(self.usuario, self.productos[1], 6)
+        stock = self.stock()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(StockInsuficienteError) as error:
+                self.confirmar()
+
+        self.assertEqual([p.id_producto for p in error.exception.productos], [self.productos[1].id_producto])
+        self.assertEqual(self.stock(), stock)
+        self.assertFalse(Pedido.objects.exists())
+        self.assertEqual(len(self.carritos()), 2)
+        self.assertEqual(callbacks, [])
+
+    def test_respeta_las_reservas_de_otros(self):
+        otro = crear_usuario('otro@pruebas.local')
+        self.assertTrue(reservar(otro.id_usuario, self.productos[0].id_producto, 4))
+        agregar_al_carrito(self.usuario, self.productos[0], 2)
+
+        with self.assertRaises(StockInsuficienteError) as error:
+            self.confirmar()
+        self.assertEqual(error.exception.productos[0].disponible_producto, 1)
+
+        # Vencida, la reserva ya no aparta unidades
+        Reserva.objects.update(vence_reserva=Reserva.objects.get().vence_reserva - 2 * duracion_reserva())
+        self.confirmar()
+        self.assertEqual(self.stock()[self.productos[0].id_producto], 3)
+
+    def test_carrito_cambiado_durante_el_checkout(self):
+        agregar_al_carrito(self.usuario, self.productos[0])
+        carritos = self.carritos()
+        # Otra pestaña agregó una línea después de leer el carrito
+        agregar_al_carrito(self.usuario, self.productos[1])
+        stock = self.stock()
+
+        with self.assertRaises(CheckoutError) as error:
+            self.confirmar(carritos)
+
+        self.assertNotIsInstance(error.exception, StockInsuficienteError)
+        self.assertEqual(self.stock(), stock)
+        self.assertFalse(Pedido.objects.exists())
+        self.assertEqual(len(self.carritos()), 2)
@@ -0,0 +1,143 @@
+import threading
+
+from django.db import OperationalError
+from django.test import SimpleTestCase
+
+from ..backends.pool import PoolConexiones
+
+
+class _Cursor:
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def execute(self, sql):
+        self.conexion.esperar('verificar')
+        if self.conexion.rota:
+            raise OperationalError('conexión perdida')
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+
+class ConexionFalsa:
+    """Conexión DB-API mínima; `bloquear` detiene rollback o SELECT 1 hasta `liberar`"""
+
+    def __init__(self):
+        self.rota = False
+        self.cerrada = False
+        self.bloquear = None
+        self.bloqueada = threading.Event()
+        self.liberar = threading.Event()
+
+    def esperar(self, operacion):
+        if self.bloquear == operacion:
+            self.bloqueada.set()
+            self.liberar.wait(5)
+
+    def rollback(self):
+        self.esperar('rollback')
+        if self.rota:
+            raise OperationalError('conexión perdida')
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def close(self):
+        self.cerrada = True
+
+
+class PoolConexionesTests(SimpleTestCase):
+
+    def crear_pool(self, **config):
+        return PoolConexiones('pruebas', ConexionFalsa, {'ESPERA_MAXIMA': 0.05, **config})
+
+    def en_hilo(self, funcion, *args):
+        hilo = threading.Thread(target=funcion, args=args, daemon=True)
+        hilo.start()
+        return hilo
+
+    def test_reutiliza_la_ultima_devuelta(self):
+        pool = self.crear_pool()
+        primera, segunda = pool.tomar(), pool.tomar()
+        pool.devolver(primera)
+        pool.devolver(segunda)
+        self.assertIs(pool.tomar(), segunda)
+        datos = pool.estadisticas()
+        self.assertEqual((datos['creadas'], datos['reutilizadas'], datos['en_uso'], datos['libres']), (2, 1, 1, 1))
+
+    def test_agotado_y_espera(self):
+        pool = self.crear_pool(TAMANO_MAXIMO=1)
+        conexion = pool.tomar()
+        with self.assertRaises(OperationalError):
+            pool.tomar()
+        self.assertEqual(pool.estadisticas()['agotado'], 1)
+
+        pool.config['ESPERA_MAXIMA'] = 5
+        temporizador = threading.Timer(0.05, pool.devolver, [conexion])
+        temporizador.start()
+        self.assertIs(pool.tomar(), conexion)
+        temporizador.join()
+
+    def test_rotas_y_vencidas_se_cierran(self):
+        pool = self.crear_pool(VERIFICAR_TRAS=0)
+        rota, vencida, verificada = pool.tomar(), pool.tomar(), pool.tomar()
+        rota.rota = True
+        pool.devolver(rota)
+        pool.devolver(verificada)
+        verificada.rota = True
+        pool.config['VIDA_MAXIMA'] = 0
+        pool.devolver(vencida)
+        pool.config['VIDA_MAXIMA'] = 1800
+
+        # La libre no pasa el SELECT 1: se descarta y se abre otra
+        nueva = pool.tomar()
+        self.assertNotIn(nueva, (rota, vencida, verificada))
+        self.assertTrue(rota.cerrada and vencida.cerrada and verificada.cerrada)
+        datos = pool.estadisticas()
+        self.assertEqual((datos['rotas'], datos['expiradas'], datos['en_uso'], datos['libres']), (2, 1, 1, 0))
+
+    def test_inactivas_se_cierran_al_tomar(self):
+        pool = self.crear_pool(TIEMPO_INACTIVO=0)
+        conexion = pool.tomar()
+        pool.devolver(conexion)
+        self.assertIsNot(pool.tomar(), conexion)
+        self.assertTrue(conexion.cerrada)
+
+    def test_rollback_lento_no_bloquea_el_pool(self):
+        pool = self.crear_pool(TAMANO_MAXIMO=2)
+        lenta = pool.tomar()
+        lenta.bloquear = 'rollback'
+        devolviendo = self.en_hilo(pool.devolver, lenta)
+        self.assertTrue(lenta.bloqueada.wait(5))
+
+        # Mientras el rollback sigue, la conexión ocupa su cupo pero el pool responde
+        otra = pool.tomar()
+        self.assertEqual(pool.estadisticas()['en_uso'], 2)
+        with self.assertRaises(OperationalError):
+            pool.tomar()
+        pool.devolver(otra)
+        self.assertTrue(devolviendo.is_alive())
+
+        lenta.liberar.set()
+        devolviendo.join(5)
+        self.assertEqual(pool.estadisticas()['libres'], 2)
+
+    def test_verificacion_lenta_no_bloquea_el_pool(self):
+        pool = self.crear_pool(VERIFICAR_TRAS=0)
+        lenta, otra = pool.tomar(), pool.tomar()
+        pool.devolver(lenta)
+        lenta.bloquear = 'verificar'
+        tomadas = []
+        tomando = self.en_hilo(lambda: tomadas.append(pool.tomar()))
+        self.assertTrue(lenta.bloqueada.wait(5))
+
+        pool.devolver(otra)
+        self.assertIs(pool.tomar(), otra)
+        self.assertTrue(tomando.is_alive())
+
+        lenta.liberar.set()
+        tomando.join(5)
+        self.assertEqual(tomadas, [lenta])
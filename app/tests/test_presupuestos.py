@@ -0,0 +1,216 @@
+"""
+Presupuestos de consultas de todas las rutas con PRESUPUESTO_CONSULTAS_ESTRICTO:
+una vista que ejecuta más consultas de las declaradas lanza PresupuestoExcedido
+y la prueba falla.
+
+Cada request se hace con las caches vacías (el peor caso: usuario, resumen del
+carrito, categorías y versión del catálogo salen de la BD) y sin la instantánea
+del catálogo en memoria. La cache de sesiones se conserva, como entre los
+requests de un worker.
+"""
+import datetime
+
+from django.core.cache import caches
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import busqueda, catalogo_memoria, views_async
+from ..models import Carrito, PedidoArchivado, Producto
+from ..presupuesto import obtener_presupuesto
+from ..urls import urlpatterns
+from ..urls_async import urlpatterns as urlpatterns_async
+from .base import (
+    CONTRASENA, TiendaTestCase, TiendaTransactionTestCase, agregar_al_carrito, crear_direccion,
+    crear_pedidos, crear_productos, crear_usuario,
+)
+
+
+def _sembrar():
+    """Cliente con dirección, carrito y pedidos (también archivados), admin y catálogo"""
+    cliente = crear_usuario()
+    admin = crear_usuario('admin@pruebas.local', rol='admin', nombre_usuario='Admin')
+    direccion = crear_direccion(cliente)
+    productos = crear_productos(40)
+    for producto in productos[:3]:
+        agregar_al_carrito(cliente, producto)
+    crear_pedidos(cliente, direccion, productos[:12], range(12))
+
+    ahora = timezone.now()
+    PedidoArchivado.objects.bulk_create(
+        PedidoArchivado(
+            id_pedido=100000 + i, id_usuario=cliente, id_direccion=direccion, id_producto=productos[0],
+            cantidad_pedido=1, precio_unitario_pedido=1000, subtotal_pedido=1000, monto_total_pedido=1000,
+            metodo_pago_pedido='tarjeta', estado_pedido='entregado',
+            fecha_pedido_pedido=ahora - datetime.timedelta(days=800 + i),
+        )
+        for i in range(5)
+    )
+    busqueda.reconstruir_indice()
+    return cliente, admin, direccion, productos
+
+
+class _Presupuestos:
+    """Requests medidos con las caches vacías y comprobación de la cobertura de rutas"""
+
+    def setUp(self):
+        super().setUp()
+        self.cubiertas = set()
+
+    def en_frio(self):
+        for alias in ('default', 'compartida'):
+            caches[alias].clear()
+        catalogo_memoria.descartar()
+
+    def medir(self, respuesta, *estados):
+        """Anota la ruta del request; PresupuestoExcedido ya habría hecho fallar la prueba"""
+        nombre = respuesta.resolver_match.url_name
+        self.cubiertas.add(nombre)
+        self.assertIsNotNone(
+            obtener_presupuesto(nombre, respuesta.resolver_match.func), f'{nombre} no declara presupuesto'
+        )
+        if estados:
+            self.assertIn(respuesta.status_code, estados, nombre)
+        return respuesta
+
+    def assertCubiertas(self, patrones):
+        nombres = {patron.name for patron in patrones if patron.name}
+        self.assertEqual(sorted(nombres - self.cubiertas), [], 'rutas sin request en la prueba')
+
+
+@override_settings(PRESUPUESTO_CONSULTAS_ESTRICTO=True)
+class PresupuestoConsultasTests(_Presupuestos, TiendaTestCase):
+    """Todas las rutas de app/urls.py dentro de su presupuesto"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente, cls.admin, cls.direccion, cls.productos = _sembrar()
+
+    def setUp(self):
+        super().setUp()
+        self.en_frio()
+
+    def iniciar_sesion(self, usuario):
+        self.medir(self.client.post(reverse('login'), {
+            'email_usuario': usuario.email_usuario, 'contraseña_usuario': CONTRASENA,
+        }), 302)
+
+    def get(self, nombre, *args, estados=(200,), **params):
+        self.en_frio()
+        return self.medir(self.client.get(reverse(nombre, args=args), params), *estados)
+
+    def post(self, nombre, *args, datos=None, estados=(302,)):
+        self.en_frio()
+        return self.medir(self.client.post(reverse(nombre, args=args), datos or {}), *estados)
+
+    def test_rutas(self):
+        producto = self.productos[5]
+
+        # Anónimo: catálogo, API pública, registro y login
+        self.get('home')
+        self.get('home', categoria='Audio')
+        self.get('home', categoria=['Audio', 'Vídeo'], precio='-10000', stock='1', orden='precio')
+        self.get('home', busqueda='camara')
+        # Vaciar la cache cambiaría la versión del catálogo y con ella el ETag
+        pagina = self.get('home', tamano='10')
+        self.medir(self.client.get(reverse('home'), {'tamano': '10'}, HTTP_IF_NONE_MATCH=pagina['ETag']), 304)
+        self.get('productos_mas', categoria='Audio')
+        self.get('api_productos', fields='id,nombre,precio')
+        self.get('api_productos', busqueda='camara')
+        self.get('api_categorias')
+        self.get('registro')
+        self.post('registro', datos={
+            'nombre_usuario': 'Nuevo', 'apellido_usuario': 'Pruebas',
+            'email_usuario': 'nuevo@pruebas.local', 'contraseña_usuario': CONTRASENA,
+        })
+        self.get('logout', estados=(302,))
+        self.get('login')
+        self.post('login', datos={'email_usuario': self.cliente.email_usuario, 'contraseña_usuario': 'mala'},
+                  estados=(200,))
+
+        # Cliente: perfil, carrito, checkout e historial
+        self.iniciar_sesion(self.cliente)
+        self.get('perfil')
+        self.get('agregar_direccion')
+        self.post('agregar_direccion', datos={
+            'provincia_direccion': 'Heredia', 'canton_direccion': 'Central',
+            'distrito_direccion': 'Mercedes', 'direccion_detallada_direccion': 'Oficina',
+        })
+        self.get('ver_carrito')
+        self.get('api_carrito')
+        self.post('agregar_al_carrito', producto.id_producto, datos={'cantidad': 2})
+        carrito = Carrito.objects.get(id_usuario=self.cliente, id_producto=producto, estado_carrito='activo')
+        self.post('actualizar_carrito', carrito.id_carrito, datos={'cantidad': 3})
+        self.get('eliminar_del_carrito', carrito.id_carrito, estados=(302,))
+        self.get('checkout')
+        self.post('checkout', datos={
+            'direccion_id': self.direccion.id_direccion, 'metodo_pago': 'tarjeta', 'referencia_transaccion': 'PRUEBA',
+        })
+        self.assertFalse(Carrito.objects.filter(id_usuario=self.cliente, estado_carrito='activo').exists())
+
+        siguiente = self.get('mis_pedidos', tamano='5').context['siguiente_query']
+        while siguiente:
+            self.en_frio()
+            respuesta = self.medir(self.client.get(f'{reverse("mis_pedidos")}?{siguiente}'), 200)
+            siguiente = respuesta.context['siguiente_query']
+        self.get('mis_pedidos', estado='entregado')
+        self.get('api_pedidos')
+        self.get('logout', estados=(302,))
+
+        # Admin: CRUD de productos (el producto con pedidos archivados no se borra)
+        self.iniciar_sesion(self.admin)
+        self.get('listar_productos')
+        self.get('crear_producto')
+        self.post('crear_producto', datos={
+            'nombre_producto': 'Nuevo', 'categoria_producto': 'Audio', 'precio_producto': '100.00',
+            'stock_producto': 10, 'codigo_producto': 'PRUEBA-NUEVO', 'activo_producto': 'on',
+        })
+        self.get('editar_producto', producto.id_producto)
+        self.post('editar_producto', producto.id_producto, datos={
+            'nombre_producto': 'Editado', 'categoria_producto': 'Audio', 'precio_producto': '150.00',
+            'stock_producto': 5, 'codigo_producto': producto.codigo_producto, 'activo_producto': 'on',
+        })
+        nuevo = Producto.objects.get(codigo_producto='PRUEBA-NUEVO')
+        self.get('eliminar_producto', nuevo.id_producto)
+        self.post('eliminar_producto', nuevo.id_producto)
+        self.post('eliminar_producto', self.productos[0].id_producto)
+        self.assertTrue(Producto.objects.filter(id_producto=self.productos[0].id_producto).exists())
+
+        self.assertCubiertas(urlpatterns)
+
+
+@override_settings(PRESUPUESTO_CONSULTAS_ESTRICTO=True, ROOT_URLCONF='ec.urls_asgi')
+class PresupuestoConsultasAsyncTests(_Presupuestos, TiendaTransactionTestCase):
+    """
+    Variantes async de app/urls_async.py. Sus consultas corren en el pool de hilos
+    de app/async_db.py, que no ve la transacción de TestCase.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.cliente_tienda = _sembrar()[0]
+        self.en_frio()
+
+    async def aget(self, cliente, ruta, **params):
+        self.en_frio()
+        return self.medir(await cliente.get(ruta, params), 200)
+
+    async def test_rutas_async(self):
+        anonimo = AsyncClient()
+        await self.aget(anonimo, reverse('home'))
+        await self.aget(anonimo, reverse('home'), categoria=['Audio', 'Vídeo'], precio='-10000', stock='1')
+        await self.aget(anonimo, reverse('home'), busqueda='camara')
+
+        cliente = AsyncClient()
+        respuesta = await cliente.post(reverse('login'), {
+            'email_usuario': self.cliente_tienda.email_usuario, 'contraseña_usuario': CONTRASENA,
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        await self.aget(cliente, reverse('perfil'))
+        await self.aget(cliente, reverse('ver_carrito'))
+        await self.aget(cliente, reverse('mis_pedidos'))
+        await self.aget(cliente, reverse('mis_pedidos'), tamano='5', estado='entregado')
+
+        self.assertCubiertas(
+            patron for patron in urlpatterns_async if patron.callback.__module__ == views_async.__name__
+        )
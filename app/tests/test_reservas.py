@@ -0,0 +1,84 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Carrito, Reserva
+from ..reservas import disponibles, duracion_reserva, liberar, liberar_vencidas, renovar, reservar
+from .base import CONTRASENA, TiendaTestCase, crear_productos, crear_usuario
+
+
+class ReservasTests(TiendaTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = crear_usuario('ana@pruebas.local')
+        cls.luis = crear_usuario('luis@pruebas.local')
+        cls.producto, cls.otro = crear_productos(2, stock_producto=5)
+
+    def vencer(self, usuario):
+        Reserva.objects.filter(id_usuario=usuario).update(vence_reserva=timezone.now() - datetime.timedelta(seconds=1))
+
+    def disponible(self, usuario=None):
+        return disponibles([self.producto.id_producto], usuario and usuario.id_usuario)[self.producto.id_producto]
+
+    def test_reserva_y_cambia_la_cantidad(self):
+        self.assertTrue(reservar(self.ana.id_usuario, self.producto.id_producto, 2))
+        self.assertTrue(reservar(self.ana.id_usuario, self.producto.id_producto, 5))
+        reserva = Reserva.objects.get()
+        self.assertEqual(reserva.cantidad_reserva, 5)
+        self.assertGreater(reserva.vence_reserva, timezone.now() + duracion_reserva() - datetime.timedelta(minutes=1))
+        # Las unidades propias siguen disponibles para su dueño
+        self.assertEqual((self.disponible(), self.disponible(self.ana)), (0, 5))
+
+    def test_conflicto_con_otro_carrito(self):
+        self.assertTrue(reservar(self.ana.id_usuario, self.producto.id_producto, 3))
+        self.assertFalse(reservar(self.luis.id_usuario, self.producto.id_producto, 3))
+        self.assertTrue(reservar(self.luis.id_usuario, self.producto.id_producto, 2))
+        # Subir la cantidad sin unidades libres no modifica la reserva existente
+        self.assertFalse(reservar(self.luis.id_usuario, self.producto.id_producto, 3))
+        self.assertEqual(Reserva.objects.get(id_usuario=self.luis).cantidad_reserva, 2)
+        # Otro producto no se ve afectado
+        self.assertTrue(reservar(self.luis.id_usuario, self.otro.id_producto, 5))
+
+    def test_las_vencidas_no_cuentan(self):
+        self.assertTrue(reservar(self.ana.id_usuario, self.producto.id_producto, 5))
+        self.vencer(self.ana)
+        self.assertEqual(self.disponible(), 5)
+        self.assertTrue(reservar(self.luis.id_usuario, self.producto.id_producto, 5))
+        # renovar solo extiende las vigentes
+        self.assertEqual(renovar(self.ana.id_usuario), 0)
+        self.assertEqual(renovar(self.luis.id_usuario), 1)
+
+    def test_liberar(self):
+        reservar(self.ana.id_usuario, self.producto.id_producto, 1)
+        reservar(self.ana.id_usuario, self.otro.id_producto, 1)
+        liberar(self.ana.id_usuario, self.producto.id_producto)
+        self.assertEqual(list(Reserva.objects.values_list('id_producto', flat=True)), [self.otro.id_producto])
+
+    def test_liberar_vencidas_por_lotes(self):
+        reservar(self.ana.id_usuario, self.producto.id_producto, 1)
+        reservar(self.ana.id_usuario, self.otro.id_producto, 1)
+        reservar(self.luis.id_usuario, self.producto.id_producto, 1)
+        self.vencer(self.ana)
+
+        self.assertEqual(liberar_vencidas(lote=1), 2)
+        self.assertEqual(list(Reserva.objects.values_list('id_usuario', flat=True)), [self.luis.id_usuario])
+        salida = StringIO()
+        call_command('liberar_reservas', '--pausa', '0', stdout=salida)
+        self.assertIn('0 reservas vencidas liberadas', salida.getvalue())
+
+    def test_el_carrito_rechaza_unidades_reservadas_por_otro(self):
+        self.assertTrue(reservar(self.luis.id_usuario, self.producto.id_producto, 4))
+        self.client.post(reverse('login'), {'email_usuario': self.ana.email_usuario, 'contraseña_usuario': CONTRASENA})
+
+        agregar = reverse('agregar_al_carrito', args=[self.producto.id_producto])
+        respuesta = self.client.post(agregar, {'cantidad': 2}, follow=True)
+        self.assertContains(respuesta, 'No hay suficiente stock disponible')
+        self.assertFalse(Carrito.objects.filter(id_usuario=self.ana).exists())
+
+        self.client.post(agregar, {'cantidad': 1})
+        self.assertEqual(Carrito.objects.get(id_usuario=self.ana).cantidad_carrito, 1)
+        self.assertEqual(Reserva.objects.get(id_usuario=self.ana).cantidad_reserva, 1)
@@ -0,0 +1,78 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..sesiones import SessionStore
+from .base import TiendaTestCase
+
+
+@override_settings(SESSION_ENGINE='app.sesiones', SESSION_CACHE_ALIAS='sesiones')
+class SesionesTests(TiendaTestCase):
+
+    def nueva(self, **datos):
+        sesion = SessionStore()
+        sesion.update(datos)
+        sesion.save()
+        return sesion
+
+    def filas(self):
+        return Session.objects.count()
+
+    def escrituras(self, sesion):
+        """Guarda la sesión y devuelve cuántos INSERT/UPDATE hizo en la BD"""
+        with CaptureQueriesContext(connection) as consultas:
+            sesion.save()
+        return sum(consulta['sql'].startswith(('INSERT', 'UPDATE')) for consulta in consultas)
+
+    def test_sesion_anonima_no_toca_la_bd(self):
+        with self.assertNumQueries(0):
+            sesion = self.nueva(ultima_busqueda='camara')
+            sesion['ultima_busqueda'] = 'parlante'
+            sesion.save()
+            self.assertEqual(SessionStore(sesion.session_key)['ultima_busqueda'], 'parlante')
+        self.assertEqual(self.filas(), 0)
+
+    def test_escribe_solo_cuando_cambian_las_claves_persistentes(self):
+        sesion = self.nueva(usuario_id=1, usuario_rol='cliente')
+        self.assertEqual(self.filas(), 1)
+
+        with self.assertNumQueries(0):
+            sesion['carrito_visto'] = True
+            sesion.save()
+
+        sesion['usuario_rol'] = 'admin'
+        self.assertEqual(self.escrituras(sesion), 1)
+        self.assertEqual(Session.objects.get().get_decoded()['usuario_rol'], 'admin')
+
+    def test_sobrevive_a_la_perdida_de_la_cache(self):
+        sesion = self.nueva(usuario_id=7, ultima_busqueda='camara')
+        caches['sesiones'].clear()
+
+        recuperada = SessionStore(sesion.session_key)
+        self.assertEqual(recuperada['usuario_id'], 7)
+        # Lo recuperado de la BD ya está en la BD: guardar sin cambios no vuelve a escribir
+        recuperada.load()
+        with self.assertNumQueries(0):
+            recuperada['ultima_busqueda'] = 'parlante'
+            recuperada.save()
+
+    def test_renueva_la_fila_a_mitad_de_su_vida(self):
+        sesion = self.nueva(usuario_id=1)
+        huella, _ = caches['sesiones'].get(sesion._clave_estado_db)
+        caches['sesiones'].set(sesion._clave_estado_db, (huella, time.time() + sesion.get_expiry_age() / 2 - 1))
+
+        self.assertEqual(self.escrituras(sesion), 1)
+        with self.assertNumQueries(0):
+            sesion.save()
+
+    def test_cerrar_sesion_borra_cache_y_bd(self):
+        sesion = self.nueva(usuario_id=1)
+        clave = sesion.session_key
+        sesion.flush()
+        self.assertEqual(self.filas(), 0)
+        self.assertIsNone(caches['sesiones'].get(SessionStore.cache_key_prefix + clave + ':db'))
+        self.assertFalse(SessionStore().exists(clave))
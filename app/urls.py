@@ -1,9 +1,10 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     # Vistas principales
     path("", views.home, name='home'),
+    path("productos/mas/", views.productos_mas, name='productos_mas'),
     
     # Autenticación
     path("registro/", views.registro, name='registro'),
@@ -22,6 +23,12 @@ urlpatterns = [
     path("checkout/", views.checkout, name='checkout'),
     path("mis-pedidos/", views.mis_pedidos, name='mis_pedidos'),
     
+    # API JSON de solo lectura (app móvil)
+    path("api/productos/", api.productos, name='api_productos'),
+    path("api/categorias/", api.categorias, name='api_categorias'),
+    path("api/carrito/", api.carrito, name='api_carrito'),
+    path("api/pedidos/", api.pedidos, name='api_pedidos'),
+    
     # CRUD Productos (Admin)
     path("admin/productos/", views.listar_productos, name='listar_productos'),
     path("admin/productos/crear/", views.crear_producto, name='crear_producto'),
@@ -0,0 +1,15 @@
+"""
+Rutas para ASGI: las vistas de lectura con variante async se registran antes
+que las de app/urls.py, con la misma ruta y el mismo nombre.
+"""
+from django.urls import path
+
+from . import views_async
+from .urls import urlpatterns as urlpatterns_sync
+
+urlpatterns = [
+    path("", views_async.home, name='home'),
+    path("perfil/", views_async.perfil, name='perfil'),
+    path("carrito/", views_async.ver_carrito, name='ver_carrito'),
+    path("mis-pedidos/", views_async.mis_pedidos, name='mis_pedidos'),
+] + urlpatterns_sync
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Usuario
+
+
+def _ttl():
+    # Segundos que se conserva el usuario en cache; 0 desactiva la cache
+    return getattr(settings, 'USUARIO_ACTUAL_CACHE_TTL', 60)
+
+
+def _clave_usuario(usuario_id):
+    return f'usuario:{usuario_id}'
+
+
+def obtener_usuario(usuario_id):
+    """
+    Usuario activo o inactivo por id (None si no existe), desde cache si es posible.
+    Está en la cache compartida: al desactivar o editar un usuario la señal lo
+    invalida para todos los workers. La contraseña no se carga: nunca se guarda
+    el hash en la cache.
+    """
+    ttl = _ttl()
+    clave = _clave_usuario(usuario_id)
+    if ttl:
+        usuario = caches['compartida'].get(clave)
+        if usuario is not None:
+            return usuario
+
+    usuario = Usuario.objects.defer('contraseña_usuario').filter(id_usuario=usuario_id).first()
+    if usuario is not None and ttl:
+        caches['compartida'].set(clave, usuario, ttl)
+    return usuario
+
+
+def invalidar_usuario(usuario_id):
+    caches['compartida'].delete(_clave_usuario(usuario_id))
+
+
+def obtener_usuario_actual(request):
+    """Usuario de la sesión del request, resuelto como máximo una vez por request"""
+    if not hasattr(request, '_usuario_actual'):
+        usuario_id = request.session.get('usuario_id') if hasattr(request, 'session') else None
+        request._usuario_actual = obtener_usuario(usuario_id) if usuario_id else None
+    return request._usuario_actual
@@ -1,34 +1,119 @@
+import logging
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db.models import Sum, F, Q
-from django.db import transaction
-from django.contrib.auth.hashers import make_password, check_password
+from django.db.models import Sum, F, Q, ProtectedError
+from django.utils import timezone
 from .models import Producto, Usuario, Direccion, Carrito, Pedido
+from .historial_pedidos import TAMANO_HISTORIAL, leer_filtros, paginar_historial
+from .carrito import invalidar_resumen_carrito
+from .reservas import liberar, renovar, reservado, reservar
+from .pedidos import confirmar_pedido, CheckoutError
+from .paginacion import paginar_keyset, tamano_pagina
+from .busqueda import buscar_coincidencias, BusquedaNoDisponible
+from . import catalogo_memoria, facetas
+from .cache_catalogo import cache_pagina_catalogo
+from .presupuesto import presupuesto_consultas
+from .decorators import usuario_requerido
+from .contrasenas import PoolContrasenasLleno, hashear_contrasena, verificar_contrasena
+from .limites import consumir_intento, ip_cliente
+from .sql import tabla
 
-def home(request):
-    """Vista principal - muestra todos los productos activos"""
-    productos = Producto.objects.filter(activo_producto=True)
-    
-    # Filtro por categoría si se proporciona
-    categoria = request.GET.get('categoria')
-    if categoria:
-        productos = productos.filter(categoria_producto=categoria)
-    
-    # Búsqueda si se proporciona
+logger = logging.getLogger(__name__)
+
+def _catalogo(request, con_facetas=False):
+    """
+    (página, siguiente_query, facetas) del catálogo, por cursor y sin OFFSET.
+    Las facetas (categorías, precio, stock y orden) se aplican también a la
+    búsqueda: sobre sus coincidencias en el índice, que sin orden elegido
+    mantienen la relevancia. Página y conteos salen de la instantánea en
+    memoria (catalogo_memoria) cuando está al día y si no de la BD; `facetas`
+    es None si no se piden.
+    """
+    cursor = request.GET.get('cursor')
+    tamano = tamano_pagina(request.GET.get('tamano'))
     busqueda = request.GET.get('busqueda')
+    filtros = facetas.leer_filtros(request.GET)
+    
+    coincidencias = None
     if busqueda:
-        productos = productos.filter(
-            Q(nombre_producto__icontains=busqueda) |
-            Q(descripcion_producto__icontains=busqueda)
-        )
+        try:
+            coincidencias = buscar_coincidencias(busqueda)
+        except BusquedaNoDisponible:
+            logger.warning('Índice de búsqueda no disponible, se usa búsqueda por LIKE')
+    
+    panel = None
+    # Sin índice la búsqueda es un LIKE: solo en la BD
+    instantanea = catalogo_memoria.vigente() if coincidencias is not None or not busqueda else None
+    if instantanea is not None:
+        indice = facetas.indice(instantanea)
+        pagina = indice.pagina(filtros, cursor, tamano, coincidencias)
+        if con_facetas:
+            panel = indice.facetas(filtros, coincidencias)
+    else:
+        productos = Producto.objects.filter(activo_producto=True)
+        if coincidencias is not None:
+            productos = productos.filter(id_producto__in=[id_producto for id_producto, _ in coincidencias])
+        elif busqueda:
+            productos = productos.filter(
+                Q(nombre_producto__icontains=busqueda) |
+                Q(descripcion_producto__icontains=busqueda)
+            )
+        if coincidencias is not None and not filtros.orden:
+            pagina = facetas.pagina_relevancia(facetas.filtrar(productos, filtros), coincidencias, cursor, tamano)
+        else:
+            pagina = paginar_keyset(
+                facetas.filtrar(productos, filtros), facetas.ORDENES[filtros.orden],
+                cursor=cursor if facetas.leer_cursor(cursor, filtros.orden) else None,
+                tamano=tamano,
+            )
+        if con_facetas:
+            panel = facetas.facetas_bd(filtros, productos)
+    
+    siguiente_query = ''
+    if pagina.hay_mas:
+        params = request.GET.copy()
+        params['cursor'] = pagina.siguiente_cursor
+        siguiente_query = params.urlencode()
+    
+    return pagina, siguiente_query, panel
+
+@presupuesto_consultas(5)
+@cache_pagina_catalogo
+def home(request):
+    """Vista principal - muestra los productos activos paginados por cursor"""
+    return render(request, 'app/index.html', contexto_home(request))
+
+def contexto_home(request):
+    """Contexto de index.html; compartido con la variante async (views_async.py)"""
+    # Con las opciones de las facetas y sus conteos, también durante una búsqueda
+    pagina, siguiente_query, panel = _catalogo(request, con_facetas=True)
+    ordenes = facetas.ETIQUETAS_ORDEN
+    if request.GET.get('busqueda'):
+        # Sin orden elegido, la búsqueda ordena por relevancia
+        ordenes = (('', 'Relevancia'), *ordenes[1:])
     
-    categorias = Producto.objects.values_list('categoria_producto', flat=True).distinct().exclude(categoria_producto__isnull=True)
+    return {
+        'productos': pagina.items,
+        'facetas': panel,
+        'ordenes': ordenes,
+        'siguiente_query': siguiente_query,
+    }
+
+@presupuesto_consultas(4)
+@cache_pagina_catalogo
+def productos_mas(request):
+    """Fragmento HTML con la siguiente página de productos ("cargar más")"""
+    pagina, siguiente_query, _ = _catalogo(request)
     
-    return render(request, 'app/index.html', {
-        'productos': productos,
-        'categorias': categorias,
+    response = render(request, 'app/includes/productos_cards.html', {
+        'productos': pagina.items,
     })
+    # El cliente usa este encabezado para pedir la siguiente página (vacío = no hay más)
+    response['X-Siguiente-Query'] = siguiente_query
+    return response
 
+@presupuesto_consultas(8)
+@usuario_requerido('Debes iniciar sesión para agregar productos al carrito')
 def agregar_al_carrito(request, producto_id):
     """Agrega un producto al carrito"""
     if request.method == 'POST':
@@ -43,18 +128,7 @@ def agregar_al_carrito(request, producto_id):
             messages.error(request, 'No hay suficiente stock disponible')
             return redirect('home')
         
-        # Obtener o crear usuario (simplificado - en producción usar autenticación real)
-        usuario_id = request.session.get('usuario_id')
-        if not usuario_id:
-            # Crear usuario temporal o redirigir a login
-            messages.error(request, 'Debes iniciar sesión para agregar productos al carrito')
-            return redirect('home')
-        
-        try:
-            usuario = Usuario.objects.get(id_usuario=usuario_id)
-        except Usuario.DoesNotExist:
-            messages.error(request, 'Usuario no encontrado')
-            return redirect('home')
+        usuario = request.usuario
         
         # Verificar si ya existe el producto en el carrito activo
         carrito_existente = Carrito.objects.filter(
@@ -63,15 +137,20 @@ def agregar_al_carrito(request, producto_id):
             estado_carrito='activo'
         ).first()
         
+        nueva_cantidad = carrito_existente.cantidad_carrito + cantidad if carrito_existente else cantidad
+        # Aparta las unidades por RESERVA_MINUTOS; falla si otros carritos ya las reservaron
+        if nueva_cantidad > producto.stock_producto or not reservar(
+            usuario.id_usuario, producto.id_producto, nueva_cantidad
+        ):
+            messages.error(request, 'No hay suficiente stock disponible')
+            return redirect('home')
+        
         if carrito_existente:
-            nueva_cantidad = carrito_existente.cantidad_carrito + cantidad
-            if nueva_cantidad > producto.stock_producto:
-                messages.error(request, 'No hay suficiente stock disponible')
-                return redirect('home')
-            
-            # Usar update() para evitar que Django intente modificar subtotal_carrito (columna calculada)
+            # Usar update() para evitar que Django intente modificar subtotal_carrito (columna calculada);
+            # update() no aplica auto_now y limpiar_carritos usa la fecha para detectar abandono
             Carrito.objects.filter(id_carrito=carrito_existente.id_carrito).update(
-                cantidad_carrito=nueva_cantidad
+                cantidad_carrito=nueva_cantidad,
+                fecha_actualizacion_carrito=timezone.now(),
             )
             messages.success(request, f'Cantidad actualizada en el carrito')
         else:
@@ -80,8 +159,8 @@ def agregar_al_carrito(request, producto_id):
             from django.db import connection
             with connection.cursor() as cursor:
                 # Usar %s como placeholder (Django lo convertirá a ? para SQL Server)
-                cursor.execute("""
-                    INSERT INTO [SC_TiendaOline].[T_Carrito] 
+                cursor.execute(f"""
+                    INSERT INTO {tabla(Carrito)} 
                     (id_usuario, id_producto, cantidad_carrito, precio_unitario_carrito, estado_carrito)
                     VALUES (%s, %s, %s, %s, %s)
                 """, [
@@ -93,78 +172,88 @@ def agregar_al_carrito(request, producto_id):
                 ])
             messages.success(request, f'{producto.nombre_producto} agregado al carrito')
         
+        invalidar_resumen_carrito(usuario.id_usuario)
         return redirect('ver_carrito')
     
     return redirect('home')
 
+@presupuesto_consultas(4)
+@usuario_requerido('Debes iniciar sesión para ver tu carrito')
 def ver_carrito(request):
     """Muestra el contenido del carrito"""
-    usuario_id = request.session.get('usuario_id')
-    if not usuario_id:
-        messages.info(request, 'Debes iniciar sesión para ver tu carrito')
-        return redirect('home')
-    
-    try:
-        usuario = Usuario.objects.get(id_usuario=usuario_id)
-    except Usuario.DoesNotExist:
-        messages.error(request, 'Usuario no encontrado')
-        return redirect('home')
-    
-    carritos = Carrito.objects.filter(id_usuario=usuario, estado_carrito='activo')
-    total = sum(float(carrito.subtotal_carrito) for carrito in carritos)
+    return render(request, 'app/carrito.html', contexto_carrito(request.usuario))
+
+def contexto_carrito(usuario):
+    # select_related: el template usa los datos del producto de cada item;
+    # disponible_producto descuenta lo que reservaron otros carritos (misma consulta)
+    carritos = list(
+        Carrito.objects.filter(id_usuario=usuario, estado_carrito='activo').select_related('id_producto')
+        .annotate(disponible_producto=F('id_producto__stock_producto') - reservado(usuario.id_usuario))
+    )
+    total = sum(carrito.subtotal_carrito for carrito in carritos)
     
-    return render(request, 'app/carrito.html', {
+    return {
         'carritos': carritos,
         'total': total,
-    })
+    }
 
+@presupuesto_consultas(6)
 def actualizar_carrito(request, carrito_id):
     """Actualiza la cantidad de un item en el carrito"""
     if request.method == 'POST':
-        carrito = get_object_or_404(Carrito, id_carrito=carrito_id, estado_carrito='activo')
+        carrito = get_object_or_404(
+            Carrito.objects.select_related('id_producto'),
+            id_carrito=carrito_id,
+            estado_carrito='activo'
+        )
         nueva_cantidad = int(request.POST.get('cantidad', 1))
         
         if nueva_cantidad <= 0:
             carrito.delete()
+            liberar(carrito.id_usuario_id, carrito.id_producto_id)
             messages.success(request, 'Producto eliminado del carrito')
         else:
-            if nueva_cantidad > carrito.id_producto.stock_producto:
+            if nueva_cantidad > carrito.id_producto.stock_producto or not reservar(
+                carrito.id_usuario_id, carrito.id_producto_id, nueva_cantidad
+            ):
                 messages.error(request, 'No hay suficiente stock disponible')
                 return redirect('ver_carrito')
             
             # Usar update() para evitar que Django intente modificar subtotal_carrito (columna calculada)
             Carrito.objects.filter(id_carrito=carrito.id_carrito).update(
-                cantidad_carrito=nueva_cantidad
+                cantidad_carrito=nueva_cantidad,
+                fecha_actualizacion_carrito=timezone.now(),
             )
             messages.success(request, 'Carrito actualizado')
         
+        invalidar_resumen_carrito(carrito.id_usuario_id)
         return redirect('ver_carrito')
     
     return redirect('ver_carrito')
 
+@presupuesto_consultas(6)
 def eliminar_del_carrito(request, carrito_id):
     """Elimina un item del carrito"""
     carrito = get_object_or_404(Carrito, id_carrito=carrito_id, estado_carrito='activo')
     carrito.delete()
+    liberar(carrito.id_usuario_id, carrito.id_producto_id)
+    invalidar_resumen_carrito(carrito.id_usuario_id)
     messages.success(request, 'Producto eliminado del carrito')
     return redirect('ver_carrito')
 
+@presupuesto_consultas(10)
+@usuario_requerido('Debes iniciar sesión para realizar un pedido')
 def checkout(request):
     """Proceso de checkout"""
-    usuario_id = request.session.get('usuario_id')
-    if not usuario_id:
-        messages.info(request, 'Debes iniciar sesión para realizar un pedido')
-        return redirect('home')
-    
-    try:
-        usuario = Usuario.objects.get(id_usuario=usuario_id)
-    except Usuario.DoesNotExist:
-        messages.error(request, 'Usuario no encontrado')
-        return redirect('home')
+    usuario = request.usuario
     
-    carritos = Carrito.objects.filter(id_usuario=usuario, estado_carrito='activo')
+    # Se carga una sola vez con los productos; se reutiliza para validar, mostrar y confirmar
+    carritos = list(
+        Carrito.objects.filter(id_usuario=usuario, estado_carrito='activo').select_related('id_producto')
+    )
+    total = sum(carrito.subtotal_carrito for carrito in carritos)
     
-    if not carritos.exists():
+    if not carritos:
         messages.info(request, 'Tu carrito está vacío')
         return redirect('ver_carrito')
     
@@ -180,7 +269,7 @@ def checkout(request):
             return render(request, 'app/checkout.html', {
                 'carritos': carritos,
                 'direcciones': direcciones,
-                'total': sum(float(carrito.subtotal_carrito) for carrito in carritos),
+                'total': total,
             })
         
         try:
@@ -190,60 +279,23 @@ def checkout(request):
             return render(request, 'app/checkout.html', {
                 'carritos': carritos,
                 'direcciones': direcciones,
-                'total': sum(float(carrito.subtotal_carrito) for carrito in carritos),
+                'total': total,
             })
         
-        # Crear pedidos para cada item del carrito
-        with transaction.atomic():
-            for carrito in carritos:
-                # Verificar stock
-                if carrito.cantidad_carrito > carrito.id_producto.stock_producto:
-                    messages.error(request, f'No hay suficiente stock para {carrito.id_producto.nombre_producto}')
-                    return redirect('ver_carrito')
-                
-                # Calcular totales
-                subtotal = float(carrito.subtotal_carrito)
-                descuento = 0  # Puede ser calculado según reglas de negocio
-                monto_total = subtotal - descuento
-                
-                # Crear pedido usando SQL directo para evitar incluir subtotal_pedido (columna calculada)
-                from django.db import connection
-                from django.utils import timezone
-                with connection.cursor() as cursor:
-                    # Usar timezone.now() para la fecha (Django lo convertirá al formato correcto)
-                    cursor.execute("""
-                        INSERT INTO [SC_TiendaOline].[T_Pedido] 
-                        (id_usuario, id_direccion, id_producto, cantidad_pedido, precio_unitario_pedido, 
-                         descuento_pedido, monto_total_pedido, metodo_pago_pedido, referencia_transaccion_pedido, 
-                         fecha_pedido_pedido, estado_pedido)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """, [
-                        usuario.id_usuario,
-                        direccion.id_direccion,
-                        carrito.id_producto.id_producto,
-                        carrito.cantidad_carrito,
-                        carrito.precio_unitario_carrito,
-                        descuento,
-                        monto_total,
-                        metodo_pago,
-                        referencia_transaccion if referencia_transaccion else None,
-                        timezone.now(),
-                        'pendiente'
-                    ])
-                
-                # Actualizar stock
-                carrito.id_producto.stock_producto -= carrito.cantidad_carrito
-                carrito.id_producto.save()
-                
-                # Marcar carrito como convertido (usar update() para evitar modificar subtotal_carrito)
-                Carrito.objects.filter(id_carrito=carrito.id_carrito).update(
-                    estado_carrito='convertido'
-                )
-            
-            messages.success(request, 'Pedido realizado exitosamente')
-            return redirect('mis_pedidos')
+        # Crear los pedidos de todo el carrito; el número de sentencias es constante
+        # hasta pedidos.LOTE_PRODUCTOS productos distintos (el presupuesto cubre ese caso)
+        try:
+            confirmar_pedido(usuario, direccion, metodo_pago, referencia_transaccion, carritos)
+        except CheckoutError as e:
+            messages.error(request, str(e))
+            return redirect('ver_carrito')
+        
+        invalidar_resumen_carrito(usuario.id_usuario)
+        messages.success(request, 'Pedido realizado exitosamente')
+        return redirect('mis_pedidos')
     
-    total = sum(float(carrito.subtotal_carrito) for carrito in carritos)
+    # Mientras completa el pago, las unidades del carrito siguen apartadas
+    renovar(usuario.id_usuario)
     
     return render(request, 'app/checkout.html', {
         'carritos': carritos,
@@ -251,31 +303,48 @@ def checkout(request):
         'total': total,
     })
 
+@presupuesto_consultas(5)
+@usuario_requerido('Debes iniciar sesión para ver tus pedidos')
 def mis_pedidos(request):
-    """Muestra los pedidos del usuario"""
-    usuario_id = request.session.get('usuario_id')
-    if not usuario_id:
-        messages.info(request, 'Debes iniciar sesión para ver tus pedidos')
-        return redirect('home')
+    """Muestra los pedidos del usuario, paginados por cursor y con filtros"""
+    return render(request, 'app/mis_pedidos.html', contexto_mis_pedidos(request.usuario, request.GET))
+
+def contexto_mis_pedidos(usuario, params):
+    filtros = leer_filtros(params)
+    pagina = paginar_historial(
+        usuario, filtros, params.get('cursor'), tamano_pagina(params.get('tamano'), TAMANO_HISTORIAL)
+    )
     
-    try:
-        usuario = Usuario.objects.get(id_usuario=usuario_id)
-    except Usuario.DoesNotExist:
-        messages.error(request, 'Usuario no encontrado')
-        return redirect('home')
+    siguiente_query = ''
+    if pagina.hay_mas:
+        siguiente = params.copy()
+        siguiente['cursor'] = pagina.siguiente_cursor
+        siguiente_query = siguiente.urlencode()
     
-    pedidos = Pedido.objects.filter(id_usuario=usuario).order_by('-fecha_pedido_pedido')
+    # Enlace a la primera página con los mismos filtros (None si ya se está en ella)
+    primera_query = None
+    if params.get('cursor'):
+        primera = params.copy()
+        del primera['cursor']
+        primera_query = primera.urlencode()
     
-    return render(request, 'app/mis_pedidos.html', {
-        'pedidos': pedidos,
-    })
+    return {
+        'pedidos': pagina.items,
+        'filtros': filtros,
+        'filtrado': any(filtros),
+        'estados': Pedido.ESTADO_CHOICES,
+        'siguiente_query': siguiente_query,
+        'primera_query': primera_query,
+    }
 
 # Vistas CRUD para Productos (Admin)
+@presupuesto_consultas(3)
 def listar_productos(request):
     """Lista todos los productos (admin)"""
     productos = Producto.objects.all()
     return render(request, 'app/admin/productos_list.html', {'productos': productos})
 
+@presupuesto_consultas(5)
 def crear_producto(request):
     """Crea un nuevo producto (admin)"""
     if request.method == 'POST':
@@ -297,6 +366,7 @@ def crear_producto(request):
     
     return render(request, 'app/admin/productos_form.html', {'accion': 'Crear'})
 
+@presupuesto_consultas(5)
 def editar_producto(request, producto_id):
     """Edita un producto existente (admin)"""
     producto = get_object_or_404(Producto, id_producto=producto_id)
@@ -322,18 +392,25 @@ def editar_producto(request, producto_id):
         'accion': 'Editar'
     })
 
+@presupuesto_consultas(7)
 def eliminar_producto(request, producto_id):
     """Elimina un producto (admin)"""
     producto = get_object_or_404(Producto, id_producto=producto_id)
     
     if request.method == 'POST':
-        producto.delete()
+        try:
+            producto.delete()
+        except ProtectedError:
+            # Los pedidos archivados no se borran en cascada (ver PedidoArchivado)
+            messages.error(request, 'El producto tiene pedidos archivados y no se puede eliminar; desactívalo en su lugar')
+            return redirect('listar_productos')
         messages.success(request, 'Producto eliminado exitosamente')
         return redirect('listar_productos')
     
     return render(request, 'app/admin/productos_confirm_delete.html', {'producto': producto})
 
 # Vistas de Autenticación
+@presupuesto_consultas(6)
 def registro(request):
     """Registro de nuevos usuarios"""
     if request.method == 'POST':
@@ -347,17 +424,26 @@ def registro(request):
             messages.error(request, 'Por favor completa todos los campos requeridos')
             return render(request, 'app/registro.html')
         
+        limite = consumir_intento('registro', ip_cliente(request))
+        if not limite.permitido:
+            return _demasiados_intentos(request, 'app/registro.html', limite.reintentar)
+        
         # Verificar si el email ya existe
         if Usuario.objects.filter(email_usuario=email).exists():
             messages.error(request, 'Este email ya está registrado')
             return render(request, 'app/registro.html')
         
+        try:
+            contraseña = hashear_contrasena(password)
+        except PoolContrasenasLleno:
+            return _demasiados_intentos(request, 'app/registro.html', 1)
+        
         try:
             usuario = Usuario.objects.create(
                 nombre_usuario=nombre,
                 apellido_usuario=apellido,
                 email_usuario=email,
-                contraseña_usuario=make_password(password),
+                contraseña_usuario=contraseña,
                 telefono_usuario=telefono,
                 rol_usuario='cliente',
                 activo_usuario=True
@@ -369,6 +455,14 @@ def registro(request):
     
     return render(request, 'app/registro.html')
 
+def _demasiados_intentos(request, plantilla, reintentar):
+    """429 con Retry-After: límite de intentos agotado o pool de hash lleno"""
+    messages.error(request, f'Demasiados intentos. Intenta de nuevo en {reintentar} segundos')
+    response = render(request, plantilla, status=429)
+    response['Retry-After'] = str(reintentar)
+    return response
+
+@presupuesto_consultas(7)
 def login(request):
     """Inicio de sesión"""
     if request.method == 'POST':
@@ -379,9 +473,21 @@ def login(request):
             messages.error(request, 'Por favor completa todos los campos')
             return render(request, 'app/login.html')
         
+        # Por IP y por email, antes de consultar la BD o hashear
+        limite = consumir_intento('login', ip_cliente(request), email)
+        if not limite.permitido:
+            return _demasiados_intentos(request, 'app/login.html', limite.reintentar)
+        
         try:
             usuario = Usuario.objects.get(email_usuario=email, activo_usuario=True)
-            if check_password(password, usuario.contraseña_usuario):
+            try:
+                valida, hash_nuevo = verificar_contrasena(password, usuario.contraseña_usuario)
+            except PoolContrasenasLleno:
+                return _demasiados_intentos(request, 'app/login.html', 1)
+            if valida:
+                if hash_nuevo:
+                    # El hash se creó con otro hasher o parámetros: se guarda el actual
+                    Usuario.objects.filter(id_usuario=usuario.id_usuario).update(contraseña_usuario=hash_nuevo)
                 request.session['usuario_id'] = usuario.id_usuario
                 request.session['usuario_nombre'] = f"{usuario.nombre_usuario} {usuario.apellido_usuario}"
                 request.session['usuario_rol'] = usuario.rol_usuario
@@ -394,43 +500,32 @@ def login(request):
     
     return render(request, 'app/login.html')
 
+@presupuesto_consultas(3)
 def logout(request):
     """Cerrar sesión"""
     request.session.flush()
     messages.success(request, 'Sesión cerrada exitosamente')
     return redirect('home')
 
+@presupuesto_consultas(4)
+@usuario_requerido('Debes iniciar sesión para ver tu perfil', redirigir_a='login')
 def perfil(request):
     """Perfil del usuario"""
-    usuario_id = request.session.get('usuario_id')
-    if not usuario_id:
-        messages.info(request, 'Debes iniciar sesión para ver tu perfil')
-        return redirect('login')
-    
-    try:
-        usuario = Usuario.objects.get(id_usuario=usuario_id)
-        direcciones = Direccion.objects.filter(id_usuario=usuario)
-    except Usuario.DoesNotExist:
-        messages.error(request, 'Usuario no encontrado')
-        return redirect('home')
+    return render(request, 'app/perfil.html', contexto_perfil(request.usuario))
+
+def contexto_perfil(usuario):
+    direcciones = list(Direccion.objects.filter(id_usuario=usuario))
     
-    return render(request, 'app/perfil.html', {
+    return {
         'usuario': usuario,
         'direcciones': direcciones,
-    })
+    }
 
+@presupuesto_consultas(7)
+@usuario_requerido('Debes iniciar sesión', redirigir_a='login')
 def agregar_direccion(request):
     """Agregar una nueva dirección"""
-    usuario_id = request.session.get('usuario_id')
-    if not usuario_id:
-        messages.info(request, 'Debes iniciar sesión')
-        return redirect('login')
-    
-    try:
-        usuario = Usuario.objects.get(id_usuario=usuario_id)
-    except Usuario.DoesNotExist:
-        messages.error(request, 'Usuario no encontrado')
-        return redirect('home')
+    usuario = request.usuario
     
     if request.method == 'POST':
         provincia = request.POST.get('provincia_direccion', '')
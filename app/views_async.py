@@ -0,0 +1,62 @@
+"""
+Variantes async de las vistas de lectura más usadas, servidas con ASGI
+(ec/asgi.py + ec/urls_asgi.py). Comparten el contexto con las vistas sync de
+app/views.py; todo lo que toca la BD, la cache o la sesión se ejecuta en el
+pool de hilos de app/async_db.py.
+"""
+from decimal import Decimal
+
+from django.shortcuts import render
+
+from . import views
+from .async_db import en_hilo_db
+from .cache_catalogo import cache_pagina_catalogo
+from .carrito import obtener_resumen_carrito
+from .decorators import usuario_requerido
+from .presupuesto import presupuesto_consultas
+
+
+def _contexto_carrito_base(request):
+    """
+    cart_count/cart_total ya evaluados: en el event loop el template no puede
+    consultar la BD, así que reemplazan a los valores perezosos de cart_context.
+    """
+    usuario_id = request.session.get('usuario_id')
+    if not usuario_id:
+        return {'cart_count': 0, 'cart_total': Decimal('0.00')}
+    resumen = obtener_resumen_carrito(usuario_id)
+    return {'cart_count': resumen['cantidad'], 'cart_total': resumen['total']}
+
+
+async def _render(request, plantilla, contexto_vista, *args):
+    contexto = await en_hilo_db(contexto_vista)(*args)
+    contexto.update(await en_hilo_db(_contexto_carrito_base)(request))
+    return render(request, plantilla, contexto)
+
+
+@presupuesto_consultas(5)
+@cache_pagina_catalogo
+async def home(request):
+    """Vista principal (async)"""
+    return await _render(request, 'app/index.html', views.contexto_home, request)
+
+
+@presupuesto_consultas(4)
+@usuario_requerido('Debes iniciar sesión para ver tu carrito')
+async def ver_carrito(request):
+    """Contenido del carrito (async)"""
+    return await _render(request, 'app/carrito.html', views.contexto_carrito, request.usuario)
+
+
+@presupuesto_consultas(5)
+@usuario_requerido('Debes iniciar sesión para ver tus pedidos')
+async def mis_pedidos(request):
+    """Pedidos del usuario (async)"""
+    return await _render(request, 'app/mis_pedidos.html', views.contexto_mis_pedidos, request.usuario, request.GET)
+
+
+@presupuesto_consultas(4)
+@usuario_requerido('Debes iniciar sesión para ver tu perfil', redirigir_a='login')
+async def perfil(request):
+    """Perfil del usuario (async)"""
+    return await _render(request, 'app/perfil.html', views.contexto_perfil, request.usuario)
@@ -0,0 +1,23 @@
+-- Índice para sincronizar el catálogo en memoria (ver app/catalogo_memoria.py):
+-- cada worker busca cada pocos segundos los productos con
+-- fecha_actualizacion_producto posterior a su marca
+-- Ejecuta este script en SQL Server Management Studio
+-- Verificar con: python manage.py verificar_tablas_django
+
+USE DB_TiendaOnline
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_T_Producto_fecha_actualizacion'
+               AND object_id = OBJECT_ID('SC_TiendaOline.T_Producto'))
+BEGIN
+    -- Sin INCLUDE: casi siempre no devuelve filas y las pocas que cambian se leen de la tabla base
+    CREATE INDEX IX_T_Producto_fecha_actualizacion
+        ON SC_TiendaOline.T_Producto(fecha_actualizacion_producto)
+
+    PRINT 'Índice IX_T_Producto_fecha_actualizacion creado exitosamente'
+END
+ELSE
+BEGIN
+    PRINT 'El índice IX_T_Producto_fecha_actualizacion ya existe'
+END
+GO
@@ -0,0 +1,24 @@
+-- Índice para el historial de pedidos por usuario (mis_pedidos, ver app/historial_pedidos.py)
+-- Ejecuta este script en SQL Server Management Studio
+-- Verificar con: python manage.py verificar_tablas_django
+
+USE DB_TiendaOnline
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_T_Pedido_usuario_fecha'
+               AND object_id = OBJECT_ID('SC_TiendaOline.T_Pedido'))
+BEGIN
+    -- Clave por usuario y fecha (id_pedido va implícito como clave del índice agrupado);
+    -- INCLUDE con las columnas que muestra la página para no leer la tabla base
+    CREATE INDEX IX_T_Pedido_usuario_fecha
+        ON SC_TiendaOline.T_Pedido(id_usuario, fecha_pedido_pedido)
+        INCLUDE (estado_pedido, id_producto, id_direccion, cantidad_pedido,
+                 monto_total_pedido, metodo_pago_pedido, referencia_transaccion_pedido)
+
+    PRINT 'Índice IX_T_Pedido_usuario_fecha creado exitosamente'
+END
+ELSE
+BEGIN
+    PRINT 'El índice IX_T_Pedido_usuario_fecha ya existe'
+END
+GO
@@ -0,0 +1,57 @@
+-- Script para crear la tabla de archivo de pedidos (ver app/archivo_pedidos.py)
+-- Ejecuta este script en SQL Server Management Studio
+-- Mismas columnas que T_Pedido; id_pedido conserva el valor original (sin IDENTITY)
+-- y subtotal_pedido es una columna normal con el valor copiado.
+-- Las llaves foráneas son sin cascada (NO ACTION, on_delete=PROTECT en el modelo):
+-- borrar un usuario, dirección o producto con pedidos archivados falla en lugar
+-- de borrar el historial.
+
+USE DB_TiendaOnline
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'T_PedidoArchivo' AND schema_id = SCHEMA_ID('SC_TiendaOline'))
+BEGIN
+    CREATE TABLE SC_TiendaOline.T_PedidoArchivo (
+        id_pedido INT NOT NULL PRIMARY KEY,
+        id_usuario INT NOT NULL
+            CONSTRAINT FK_T_PedidoArchivo_usuario REFERENCES SC_TiendaOline.T_Usuario(id_usuario),
+        id_direccion INT NOT NULL
+            CONSTRAINT FK_T_PedidoArchivo_direccion REFERENCES SC_TiendaOline.T__Direccion(id_direccion),
+        id_producto INT NOT NULL
+            CONSTRAINT FK_T_PedidoArchivo_producto REFERENCES SC_TiendaOline.T_Producto(id_producto),
+        cantidad_pedido INT NOT NULL,
+        precio_unitario_pedido DECIMAL(10, 2) NOT NULL,
+        subtotal_pedido DECIMAL(10, 2) NOT NULL,
+        descuento_pedido DECIMAL(10, 2) NOT NULL DEFAULT 0,
+        monto_total_pedido DECIMAL(10, 2) NOT NULL,
+        metodo_pago_pedido NVARCHAR(50) NOT NULL,
+        referencia_transaccion_pedido NVARCHAR(100) NULL,
+        fecha_pedido_pedido DATETIME2 NOT NULL,
+        estado_pedido NVARCHAR(50) NOT NULL
+    ) WITH (DATA_COMPRESSION = PAGE)
+
+    -- Historial de un usuario ordenado por fecha: mis_pedidos lee el archivo cuando
+    -- la página pasa de horizonte_archivo() (ver app/historial_pedidos.py)
+    CREATE INDEX IX_T_PedidoArchivo_usuario_fecha
+        ON SC_TiendaOline.T_PedidoArchivo(id_usuario, fecha_pedido_pedido DESC)
+        WITH (DATA_COMPRESSION = PAGE)
+
+    PRINT 'Tabla T_PedidoArchivo creada exitosamente en schema SC_TiendaOline'
+END
+ELSE
+BEGIN
+    PRINT 'La tabla T_PedidoArchivo ya existe en schema SC_TiendaOline'
+END
+GO
+
+-- Tablas creadas con una versión anterior de este script (sin llaves foráneas)
+IF NOT EXISTS (SELECT * FROM sys.foreign_keys WHERE name = 'FK_T_PedidoArchivo_producto')
+BEGIN
+    ALTER TABLE SC_TiendaOline.T_PedidoArchivo ADD
+        CONSTRAINT FK_T_PedidoArchivo_usuario FOREIGN KEY (id_usuario) REFERENCES SC_TiendaOline.T_Usuario(id_usuario),
+        CONSTRAINT FK_T_PedidoArchivo_direccion FOREIGN KEY (id_direccion) REFERENCES SC_TiendaOline.T__Direccion(id_direccion),
+        CONSTRAINT FK_T_PedidoArchivo_producto FOREIGN KEY (id_producto) REFERENCES SC_TiendaOline.T_Producto(id_producto)
+
+    PRINT 'Llaves foráneas de T_PedidoArchivo creadas'
+END
+GO
@@ -0,0 +1,31 @@
+-- Script para crear la tabla de reservas de stock de los carritos (ver app/reservas.py)
+-- Ejecuta este script en SQL Server Management Studio
+
+USE DB_TiendaOnline
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'T_Reserva' AND schema_id = SCHEMA_ID('SC_TiendaOline'))
+BEGIN
+    CREATE TABLE SC_TiendaOline.T_Reserva (
+        id_reserva INT IDENTITY(1,1) PRIMARY KEY,
+        id_usuario INT NOT NULL REFERENCES SC_TiendaOline.T_Usuario(id_usuario) ON DELETE CASCADE,
+        id_producto INT NOT NULL REFERENCES SC_TiendaOline.T_Producto(id_producto) ON DELETE CASCADE,
+        cantidad_reserva INT NOT NULL CHECK (cantidad_reserva > 0),
+        vence_reserva DATETIME2 NOT NULL,
+        CONSTRAINT UQ_T_Reserva_usuario_producto UNIQUE (id_usuario, id_producto)
+    )
+
+    -- Suma de unidades reservadas por producto sin leer la tabla base
+    CREATE INDEX IX_T_Reserva_producto_vence ON SC_TiendaOline.T_Reserva(id_producto, vence_reserva)
+        INCLUDE (cantidad_reserva, id_usuario)
+
+    -- Limpieza por lotes de las reservas vencidas (liberar_reservas)
+    CREATE INDEX IX_T_Reserva_vence ON SC_TiendaOline.T_Reserva(vence_reserva)
+
+    PRINT 'Tabla T_Reserva creada exitosamente en schema SC_TiendaOline'
+END
+ELSE
+BEGIN
+    PRINT 'La tabla T_Reserva ya existe en schema SC_TiendaOline'
+END
+GO
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ec.settings')
+# Rutas con las variantes async de las vistas de lectura (ec/urls_asgi.py)
+os.environ.setdefault('TIENDA_ASGI', '1')
 
 application = get_asgi_application()
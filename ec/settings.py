@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,7 +43,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'app.middleware.PresupuestoConsultasMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'app.middleware.UsuarioActualMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -50,7 +53,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'ec.urls'
+# Con ASGI (ec/asgi.py) las vistas de lectura usan sus variantes async
+ROOT_URLCONF = 'ec.urls_asgi' if os.environ.get('TIENDA_ASGI') else 'ec.urls'
 
 TEMPLATES = [
     {
@@ -74,9 +78,19 @@ WSGI_APPLICATION = 'ec.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Conexiones con pool (ver app/backends/pool.py). CONN_MAX_AGE = 0 hace que Django
+# devuelva la conexión al pool al terminar cada request en lugar de cerrarla.
+POOL_CONEXIONES = {
+    'TAMANO_MAXIMO': 10,
+    'ESPERA_MAXIMA': 5.0,
+    'TIEMPO_INACTIVO': 300,
+    'VIDA_MAXIMA': 1800,
+    'VERIFICAR_TRAS': 30,
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'mssql',
+        'ENGINE': 'app.backends.mssql',
         'NAME': 'DB_TiendaOnline',
         'HOST': 'localhost\\SQLEXPRESS01',  # instancia incluida en HOST
         'PORT': '',  # vacío, se usa puerto dinámico
@@ -85,9 +99,24 @@ DATABASES = {
             'trusted_connection': 'yes',  # usa Windows Authentication
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",  # No aplica a SQL Server, pero puede ayudar
         },
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': True,
+        'POOL': POOL_CONEXIONES,
     }
 }
 
+# TIENDA_DB=sqlite usa una base SQLite local (desarrollo, benchmarks)
+if os.environ.get('TIENDA_DB') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'app.backends.sqlite3',
+            'NAME': os.environ.get('TIENDA_SQLITE', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': True,
+            'POOL': POOL_CONEXIONES,
+        }
+    }
+
 # Configurar el schema por defecto para las tablas de Django
 # Django buscará las tablas en el schema 'dbo' por defecto
 
@@ -99,6 +128,61 @@ DATABASES = {
 
 
 
+# Cache
+# 'default' es local a cada proceso (LRU): con varios workers cada uno tiene la
+# suya, así que solo guarda lo que puede quedar distinto entre workers sin
+# mostrar datos viejos (p. ej. las páginas del catálogo, cuya clave lleva la
+# versión compartida). Lo que se invalida al escribir va en 'compartida'
+# (versión y marca del catálogo, resúmenes del carrito y de categorías, usuario
+# de la sesión) y las sesiones en 'sesiones'. Ambas se eligen con
+# TIENDA_CACHE_COMPARTIDA y TIENDA_CACHE_SESIONES:
+#   archivo   -> FileBasedCache compartida entre workers de la misma máquina (por defecto)
+#   memcached -> PyMemcacheCache en TIENDA_MEMCACHED (host:puerto), para varias máquinas
+#   local     -> LocMemCache: solo desarrollo con un único proceso; con varios
+#                workers una escritura o un logout en uno no se ve en los demás.
+#                Con DEBUG=False `manage.py check` lo rechaza (ver app/checks.py)
+
+
+def _cache(tipo, nombre):
+    return {
+        'local': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': nombre,
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+        'archivo': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'cache' / nombre,
+            'OPTIONS': {'MAX_ENTRIES': 50000},
+        },
+        'memcached': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': os.environ.get('TIENDA_MEMCACHED', '127.0.0.1:11211'),
+            'KEY_PREFIX': nombre,
+        },
+    }[tipo]
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tienda',
+    },
+    'compartida': _cache(os.environ.get('TIENDA_CACHE_COMPARTIDA', 'archivo'), 'compartida'),
+    'sesiones': _cache(os.environ.get('TIENDA_CACHE_SESIONES', 'archivo'), 'sesiones'),
+}
+
+# Sesiones en cache; solo se escriben en dbo.django_session cuando cambian
+# las claves persistentes (ver app/sesiones.py).
+# Purgar sesiones expiradas: python manage.py purgar_sesiones
+SESSION_ENGINE = 'app.sesiones'
+SESSION_CACHE_ALIAS = 'sesiones'
+SESION_CLAVES_PERSISTENTES = ('usuario_id', 'usuario_nombre', 'usuario_rol')
+
+# Mensajes flash en una cookie firmada en lugar de la sesión
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -139,11 +223,98 @@ STATICFILES_DIRS = [
     BASE_DIR / 'app' / 'static',
 ]
 
+# Nombres con hash del contenido + variantes .gz/.br (ver app/estaticos.py).
+# Construir: python manage.py construir_estaticos
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'app.estaticos.AlmacenEstaticos'},
+}
+# KB gzip máximos de estáticos por página que acepta construir_estaticos --verificar
+ESTATICOS_LIMITE_KB = 30
+
 # Media files (User uploaded files)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Miniaturas de imagen_producto en MEDIA_ROOT/miniaturas (ver app/miniaturas.py).
+# Generar: python manage.py generar_miniaturas
+# HOSTS: de dónde se pueden descargar originales remotos (como ALLOWED_HOSTS,
+# separados por coma en TIENDA_MINIATURAS_HOSTS); vacío, solo rutas locales
+MINIATURAS = {
+    'ANCHOS': (80, 160, 320, 640),
+    'FORMATO': 'WEBP',
+    'CALIDAD': 80,
+    'HOSTS': [host.strip() for host in os.environ.get('TIENDA_MINIATURAS_HOSTS', '').split(',') if host.strip()],
+}
+
+# Instantánea en memoria del catálogo, una por worker (ver app/catalogo_memoria.py).
+# Segundos entre revisiones por fecha_actualizacion_producto, entre recargas
+# completas en un hilo de fondo (detectan cambios hechos sin señales, como UPDATE o DELETE masivos)
+# y máximos sin poder sincronizar
+# antes de volver a la BD. Medir memoria: python manage.py medir_catalogo_memoria
+CATALOGO_MEMORIA = {
+    'ACTIVO': True,
+    'REVISION': 2,
+    'RESINCRONIZACION': 300,
+    'MAXIMA_ANTIGUEDAD': 60,
+}
+
+# Límites de los rangos de precio de las facetas del catálogo, en colones (ver app/facetas.py)
+FACETAS_RANGOS_PRECIO = (10000, 50000, 100000, 250000, 500000)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Presupuesto de consultas SQL por vista (ver app/presupuesto.py)
+# Los presupuestos se declaran en cada vista con @presupuesto_consultas(n);
+# aquí se pueden sobrescribir por nombre de URL.
+PRESUPUESTO_CONSULTAS = {}
+# True en las pruebas: exceder el presupuesto lanza PresupuestoExcedido
+PRESUPUESTO_CONSULTAS_ESTRICTO = False
+
+# Segundos que request.usuario se conserva en la cache compartida (0 = sin cache, ver app/usuarios.py)
+USUARIO_ACTUAL_CACHE_TTL = 60
+
+# Hilos para las consultas de las vistas async (ver app/async_db.py); con el pool
+# de conexiones acotan las conexiones abiertas por cada proceso ASGI
+ASYNC_DB_HILOS = int(os.environ.get('TIENDA_ASYNC_DB_HILOS', 8))
+
+# Hash de contraseñas de login/registro en un pool propio (ver app/contrasenas.py):
+# hilos por proceso y trabajos en espera; con la cola llena se responde 429
+CONTRASENAS = {'HILOS': 2, 'COLA': 8}
+
+# Límite de intentos de login/registro por token bucket (ver app/limites.py):
+# (capacidad, segundos por token) por email y por IP, en una cache compartida.
+# Detrás de un balanceador o proxy inverso, sus IPs o redes (separadas por coma en
+# TIENDA_PROXIES_CONFIABLES) para tomar la IP del cliente de X-Forwarded-For
+LIMITE_INTENTOS = {
+    'CACHE': 'sesiones',
+    'EMAIL': (5, 60),
+    'IP': (20, 3),
+    'PROXIES_CONFIABLES': [
+        red.strip() for red in os.environ.get('TIENDA_PROXIES_CONFIABLES', '').split(',') if red.strip()
+    ],
+}
+
+# Minutos que el carrito aparta las unidades de cada producto (ver app/reservas.py)
+# Liberar las vencidas con: python manage.py liberar_reservas
+RESERVA_MINUTOS = int(os.environ.get('TIENDA_RESERVA_MINUTOS', 15))
+
+# Limpieza de T_Carrito (ver python manage.py limpiar_carritos): días sin cambios para
+# cancelar un carrito activo y días que se conservan los convertidos o cancelados
+CARRITO_DIAS_ABANDONO = 30
+CARRITO_DIAS_RETENCION = 90
+
+# Días tras los cuales los pedidos entregados pasan a T_PedidoArchivo
+# (ver app/archivo_pedidos.py y python manage.py archivar_pedidos)
+PEDIDOS_DIAS_ARCHIVO = 365
+
+# Índice de búsqueda de productos (ver app/busqueda.py)
+# Reconstruir con: python manage.py reconstruir_indice_busqueda
+BUSQUEDA = {
+    'RUTA': BASE_DIR / 'busqueda.sqlite3',
+    # Coincidencias (por relevancia) sobre las que se aplican y cuentan las facetas
+    'MAX_COINCIDENCIAS': 1000,
+}
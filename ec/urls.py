@@ -20,8 +20,9 @@ from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    # Antes del admin de Django: su catch-all de admin/ ocultaría admin/productos/
     path("", include("app.urls")),
+    path('admin/', admin.site.urls),
 ]
 
 # Servir archivos de media en desarrollo
@@ -0,0 +1,20 @@
+"""
+URL configuration for ec project served with ASGI (ec/asgi.py).
+
+Same routes as ec/urls.py; the read-heavy views resolve to their async
+variants from app/urls_async.py.
+"""
+from django.contrib import admin
+from django.urls import path, include
+from django.conf import settings
+from django.conf.urls.static import static
+
+urlpatterns = [
+    # Antes del admin de Django: su catch-all de admin/ ocultaría admin/productos/
+    path("", include("app.urls_async")),
+    path('admin/', admin.site.urls),
+]
+
+# Servir archivos de media en desarrollo
+if settings.DEBUG:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)